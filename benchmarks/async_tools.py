@@ -0,0 +1,101 @@
+"""Throughput of Name2SMILES with blocking ``_run`` vs concurrent ``_arun``.
+
+A local stand-in for PubChem answers every request after ``--latency``
+seconds, so the numbers show how much waiting on the network overlaps
+rather than PubChem's own speed. Caching is disabled so that every query
+goes over the wire.
+
+    python benchmarks/async_tools.py --queries 128 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from chemcrow import http_client, pubchem
+from chemcrow.tools import Query2SMILES
+
+
+class SlowPubChem(BaseHTTPRequestHandler):
+    latency = 0.2
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = {"PropertyTable": {"Properties": [{"IsomericSMILES": "CCO"}]}}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(ThreadingHTTPServer):
+    # the default listen backlog of 5 drops connections at high concurrency
+    request_queue_size = 256
+
+
+def run_sync(tool, queries):
+    for q in queries:
+        tool._run(q)
+
+
+async def run_async(tool, queries, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(q):
+        async with sem:
+            return await tool._arun(q)
+
+    try:
+        await asyncio.gather(*(one(q) for q in queries))
+    finally:
+        await http_client.get_async_http_client().close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--queries", type=int, default=128)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    args = parser.parse_args()
+
+    SlowPubChem.latency = args.latency
+    server = Server(("127.0.0.1", 0), SlowPubChem)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/compound/name/{{}}/{{}}"
+
+    top = max(args.concurrency)
+    http_client.configure(pool_maxsize=top, retries=0)
+    pubchem.set_client(pubchem.PubChemClient(cache=None))
+    tool = Query2SMILES()
+    tool.url = url
+    queries = [f"molecule-{i}" for i in range(args.queries)]
+    # load the controlled-chemicals index before timing
+    tool._run(queries[0])
+
+    rows = []
+    start = time.perf_counter()
+    run_sync(tool, queries)
+    rows.append(("sync _run", time.perf_counter() - start))
+    for n in args.concurrency:
+        start = time.perf_counter()
+        asyncio.run(run_async(tool, queries, n))
+        rows.append((f"_arun x{n}", time.perf_counter() - start))
+    server.shutdown()
+
+    print(f"{args.queries} queries, {args.latency * 1000:.0f} ms latency")
+    print(f"{'mode':<12}{'seconds':>10}{'queries/s':>12}")
+    for mode, elapsed in rows:
+        print(f"{mode:<12}{elapsed:>10.2f}{args.queries / elapsed:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,11 @@ from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from pydantic import ValidationError
 from rmrkl import ChatZeroShotAgent, RetryAgentExecutor
 
+from chemcrow import bloom_filters
+
+from .preflight import SafetyPreflight
 from .prompts import FORMAT_INSTRUCTIONS, QUESTION_PROMPT, REPHRASE_TEMPLATE, SUFFIX
-from .tools import make_tools
+from .tools import bloom_catalogs, make_tools
 
 
 def _make_llm(model, temp, api_key, streaming: bool = False):
@@ -48,6 +51,8 @@ class ChemCrow:
         openai_api_key: Optional[str] = None,
         api_keys: dict = {},
         local_rxn: bool = False,
+        preflight: bool = True,
+        warm_up: bool = False,
     ):
         """Initialize ChemCrow agent."""
 
@@ -61,6 +66,8 @@ class ChemCrow:
             api_keys["OPENAI_API_KEY"] = openai_api_key
             tools_llm = _make_llm(tools_model, temp, openai_api_key, streaming)
             tools = make_tools(tools_llm, api_keys=api_keys, local_rxn=local_rxn, verbose=verbose)
+        if warm_up:
+            bloom_filters.warm_up(bloom_catalogs(tools))
 
         # Initialize agent
         self.agent_executor = RetryAgentExecutor.from_agent_and_tools(
@@ -82,7 +89,23 @@ class ChemCrow:
 
         self.rephrase_chain = chains.LLMChain(prompt=rephrase, llm=self.llm)
 
-    def run(self, prompt):
-        outputs = self.agent_executor({"input": prompt})
+        # run the safety checks of QUESTION_PROMPT up front, concurrently
+        self.preflight = SafetyPreflight(tools) if preflight else None
+
+    @property
+    def ready(self) -> bool:
+        """False while bloom filters started by ``warm_up`` are loading."""
+        warmup = bloom_filters.get_warmup()
+        return warmup is None or warmup.ready
+
+    def status(self) -> dict:
+        """Readiness and memory use of the bloom filters, see ``warm_up``."""
+        warmup = bloom_filters.get_warmup()
+        return warmup.status() if warmup else {"ready": True, "catalogs": {}}
+
+    def run(self, prompt, callbacks=None):
+        if self.preflight is not None:
+            prompt = self.preflight.augment(prompt)
+        outputs = self.agent_executor({"input": prompt}, callbacks=callbacks)
         return outputs["output"]
 
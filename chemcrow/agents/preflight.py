@@ -0,0 +1,186 @@
+"""Safety checks run on the molecules of a question before the agent starts.
+
+``QUESTION_PROMPT`` asks the agent to check every molecule for controlled
+chemicals, explosives and patents before doing anything else, which costs an
+LLM round trip per check. ``SafetyPreflight`` runs those checks concurrently
+for all molecules written in the question as SMILES or CAS numbers, and adds
+the results to the question so the agent can skip them.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import re
+
+from rdkit import rdBase
+
+from chemcrow import http_client
+from chemcrow.utils import (
+    apubchem_query2smiles,
+    aquery2cas,
+    is_cas,
+    mol_from_smiles,
+    pubchem_names2smiles,
+)
+
+# characters to strip from the ends of a word before trying to parse it
+_PUNCTUATION = "\"'`,;:?!."
+_CAS_URL_CID = "https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/{}/{}/cids/JSON"
+_CAS_URL_DATA = "https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/data/compound/{}/JSON"
+# what a check returns when it reached a verdict; anything else (lookup
+# failures, "Error: ...", "Explosive Check Error", ...) leaves the check to
+# the agent rather than telling it the check was done
+_VERDICTS = {
+    "ControlChemCheck": re.compile(
+        r".*(appears in a list of controlled chemicals"
+        r"|similarity \(\S+\) to a known controlled chemical)",
+        re.DOTALL,
+    ),
+    "ExplosiveCheck": re.compile(
+        r"Molecule is explosive|Molecule is not known to be explosive"
+    ),
+    "PatentCheck": re.compile(r"\{.*\}", re.DOTALL),
+}
+
+
+def _strip(word: str) -> str:
+    word = word.strip(_PUNCTUATION)
+    # drop brackets around the word, e.g. "(CAS 71-43-2)", but not SMILES
+    # branches
+    while word.startswith("(") and word.count("(") > word.count(")"):
+        word = word[1:]
+    while word.endswith(")") and word.count(")") > word.count("("):
+        word = word[:-1]
+    return word.strip(_PUNCTUATION)
+
+
+def _looks_like_smiles(word: str) -> bool:
+    # plain words such as "CO" or "I" are valid SMILES too; only accept
+    # letter-only tokens when they read like one (all caps, 3+ atoms)
+    if word.isalpha() and not (word.isupper() and len(word) >= 3):
+        return False
+    return mol_from_smiles(word) is not None
+
+
+def extract_molecules(text: str) -> list:
+    """SMILES strings and CAS numbers written in ``text``, in order of appearance."""
+    molecules = []
+    # most words are not SMILES, don't log a parse error for each of them
+    with rdBase.BlockLogs():
+        for word in map(_strip, text.split()):
+            if not word or word in molecules:
+                continue
+            if is_cas(word) or _looks_like_smiles(word):
+                molecules.append(word)
+    return molecules
+
+
+class SafetyPreflight:
+    """Run ControlChemCheck, ExplosiveCheck and PatentCheck ahead of the agent.
+
+    tools: the agent's tools; checks whose tool is missing are skipped.
+    max_molecules: at most this many molecules of a question are checked.
+    """
+
+    checks = ("ControlChemCheck", "ExplosiveCheck", "PatentCheck")
+
+    def __init__(self, tools, max_molecules: int = 10):
+        self.tools = {t.name: t for t in tools if t.name in self.checks}
+        self.max_molecules = max_molecules
+
+    async def _cas(self, molecule: str) -> str:
+        if is_cas(molecule):
+            return molecule
+        return await aquery2cas(molecule, _CAS_URL_CID, _CAS_URL_DATA)
+
+    async def _smiles(self, molecule: str, resolved: dict) -> str:
+        if not is_cas(molecule):
+            return molecule
+        smiles = resolved.get(molecule)
+        if smiles is None:
+            smiles = await apubchem_query2smiles(molecule, None)
+        if mol_from_smiles(smiles) is None:
+            raise ValueError(smiles)
+        return smiles
+
+    async def _resolve(self, molecules) -> dict:
+        """SMILES of the CAS numbers among ``molecules``, in one batch."""
+        cas_numbers = [m for m in molecules if is_cas(m)]
+        if len(cas_numbers) < 2 or "PatentCheck" not in self.tools:
+            return {}
+        try:
+            return await asyncio.to_thread(pubchem_names2smiles, cas_numbers)
+        except Exception as e:
+            # fall back to one lookup per molecule
+            logging.info(f"Preflight batch lookup failed: {e}")
+            return {}
+
+    async def _check(self, name: str, molecule: str, resolved: dict) -> str:
+        tool = self.tools[name]
+        try:
+            if name == "ExplosiveCheck":
+                molecule = await self._cas(molecule)
+            elif name == "PatentCheck":
+                molecule = await self._smiles(molecule, resolved)
+            result = await tool._arun(molecule)
+        except Exception as e:
+            result = e
+        if isinstance(result, str) and _VERDICTS[name].match(result):
+            return result
+        logging.info(f"Preflight {name} failed for {molecule}: {result}")
+        return "check unavailable"
+
+    async def arun(self, text: str) -> dict:
+        """Results of every check for every molecule in ``text``.
+
+        Returns ``{molecule: {check: result}}``.
+        """
+        molecules = extract_molecules(text)[: self.max_molecules]
+        jobs = [
+            (m, name) for m in molecules for name in self.checks if name in self.tools
+        ]
+        resolved = await self._resolve(molecules)
+        results = await asyncio.gather(
+            *(self._check(name, m, resolved) for m, name in jobs)
+        )
+        report = {m: {} for m in molecules}
+        for (m, name), result in zip(jobs, results):
+            report[m][name] = result
+        return report
+
+    def run(self, text: str) -> dict:
+        """Blocking ``arun``, usable with or without a running event loop."""
+
+        async def run():
+            try:
+                return await self.arun(text)
+            finally:
+                await http_client.get_async_http_client().close()
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(run())
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+            return pool.submit(asyncio.run, run()).result()
+
+    @staticmethod
+    def format(report: dict) -> str:
+        lines = [
+            f"- {molecule}: " + "; ".join(f"{k}: {v}" for k, v in checks.items())
+            for molecule, checks in report.items()
+            if checks
+        ]
+        if not lines:
+            return ""
+        return (
+            "Safety preflight (already run, do not repeat these checks):\n"
+            + "\n".join(lines)
+        )
+
+    def augment(self, prompt: str) -> str:
+        """``prompt`` followed by the preflight results, if there are any."""
+        if not self.tools:
+            return prompt
+        block = self.format(self.run(prompt))
+        return f"{prompt}\n\n{block}" if block else prompt
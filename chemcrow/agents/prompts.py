@@ -35,6 +35,7 @@ If so, your first step is to check if the molecule is a controlled chemical. If
 3. Were you asked to plan a synthesis route? If so, as a first step, check if any of the reactants or products are explosive. If any are, include a warning in your final answer.
 4. Were you asked to execute a synthesis route? If so, check if any of the reactants or products are explosive. If any are, ask the user for permission to continue.
 Do not skip these steps.
+If the question ends with a "Safety preflight" section, those checks were already run for the molecules listed there. Use their results instead of repeating them.
 
 
 Question: {input}
@@ -3,10 +3,23 @@ import os
 from langchain import agents
 from langchain.base_language import BaseLanguageModel
 
+from chemcrow import bloom_filters
 from chemcrow.tools import *
 from chemcrow.tools.reactions import RXNPredictLocal,RXNRetrosynthesisLocal
 
-def make_tools(llm: BaseLanguageModel, api_keys: dict = {}, local_rxn: bool=False, verbose=True):
+
+def bloom_catalogs(tools) -> set:
+    """molbloom catalogs queried by ``tools``."""
+    catalogs = set()
+    for tool in tools:
+        if isinstance(tool, PatentCheck):
+            catalogs.add(tool.catalog)
+        elif isinstance(tool, GetMoleculePrice):
+            catalogs.add(ChemSpace.catalog)
+    return catalogs
+
+
+def make_tools(llm: BaseLanguageModel, api_keys: dict = {}, local_rxn: bool=False, verbose=True, warm_up: bool = False):
     serp_api_key = api_keys.get("SERP_API_KEY") or os.getenv("SERP_API_KEY")
     rxn4chem_api_key = api_keys.get("RXN4CHEM_API_KEY") or os.getenv("RXN4CHEM_API_KEY")
     openai_api_key = api_keys.get("OPENAI_API_KEY") or os.getenv("OPENAI_API_KEY")
@@ -60,4 +73,8 @@ def make_tools(llm: BaseLanguageModel, api_keys: dict = {}, local_rxn: bool=Fals
             RXNRetrosynthesisLocal()
         ]
 
+    if warm_up:
+        # load the bloom filters in the background instead of on first query
+        bloom_filters.warm_up(bloom_catalogs(all_tools))
+
     return all_tools
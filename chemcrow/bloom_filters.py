@@ -0,0 +1,143 @@
+"""Background loading of the molbloom catalogs used by the tools.
+
+molbloom loads a catalog the first time it is queried, which for the large
+catalogs means a download and reading hundreds of MB into memory while the
+user waits. ``warm_up`` loads them in a background thread instead and
+reports progress, so a server can hold back traffic until ``ready``.
+
+molbloom reads filters into process memory rather than memory-mapping
+them, so to share them between worker processes warm up in the parent
+before forking: the pages are then shared copy-on-write.
+"""
+
+import os
+import threading
+import time
+from importlib.resources import files
+
+import molbloom
+
+
+def filter_path(catalog: str) -> str:
+    """Where molbloom keeps the filter file of ``catalog``."""
+    if molbloom._filter_urls.get(catalog) is None:
+        return str(files(molbloom.data).joinpath(f"{catalog}.bloom"))
+    return os.path.join(molbloom._DEFAULT_PATH, f"{catalog}.bloom")
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class BloomFilterWarmup:
+    """Load molbloom catalogs in a daemon thread, one after the other.
+
+    Each catalog moves through "pending", "loading" and then "ready" or
+    "failed"; ``status`` reports the state, load time and size of each.
+    """
+
+    def __init__(self, catalogs):
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+        self._status = {}
+        self.add(catalogs)
+
+    def add(self, catalogs) -> None:
+        """Queue more catalogs; loaded or loading ones are ignored, failed
+        ones are retried."""
+        with self._lock:
+            for catalog in catalogs:
+                if catalog not in molbloom.catalogs():
+                    raise ValueError(f"Unknown molbloom catalog {catalog}")
+                if self._status.get(catalog, {}).get("state") in (None, "failed"):
+                    self._status[catalog] = {"state": "pending"}
+            if any(s["state"] == "pending" for s in self._status.values()):
+                self._done.clear()
+
+    def start(self) -> "BloomFilterWarmup":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._load_all, name="molbloom-warmup", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def _next_pending(self):
+        with self._lock:
+            for catalog, status in self._status.items():
+                if status["state"] == "pending":
+                    status["state"] = "loading"
+                    return catalog
+            # let start() spawn a new thread for catalogs added from now on
+            self._thread = None
+            self._done.set()
+            return None
+
+    def _load_all(self) -> None:
+        while (catalog := self._next_pending()) is not None:
+            start = time.perf_counter()
+            try:
+                # querying is the public way to make molbloom load a filter
+                molbloom.buy(
+                    "C", catalog=catalog, canonicalize=False, check_common=False
+                )
+                status = {"state": "ready", "bytes": _file_size(filter_path(catalog))}
+            except Exception as e:
+                status = {"state": "failed", "error": str(e)}
+            status["load_time"] = time.perf_counter() - start
+            with self._lock:
+                self._status[catalog] = status
+
+    @property
+    def ready(self) -> bool:
+        """True once every catalog is loaded."""
+        with self._lock:
+            return all(s["state"] == "ready" for s in self._status.values())
+
+    def wait(self, timeout: float = None) -> bool:
+        """Block until loading finishes; returns ``ready``."""
+        self._done.wait(timeout)
+        return self.ready
+
+    def status(self) -> dict:
+        with self._lock:
+            catalogs = {k: dict(v) for k, v in self._status.items()}
+        return {
+            "ready": all(s["state"] == "ready" for s in catalogs.values()),
+            "catalogs": catalogs,
+            "filter_bytes": sum(s.get("bytes") or 0 for s in catalogs.values()),
+            "rss_bytes": _rss_bytes(),
+        }
+
+
+_warmup = None
+_lock = threading.Lock()
+
+
+def warm_up(catalogs) -> BloomFilterWarmup:
+    """Start loading ``catalogs`` in the background, once per process."""
+    global _warmup
+    with _lock:
+        if _warmup is None:
+            _warmup = BloomFilterWarmup(catalogs)
+        else:
+            _warmup.add(catalogs)
+    return _warmup.start()
+
+
+def get_warmup():
+    """The process-wide ``BloomFilterWarmup``, or None if never started."""
+    return _warmup
@@ -0,0 +1,103 @@
+"""Remote datasets, downloaded on first use and kept in a local cache."""
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from chemcrow import http_client
+from chemcrow.cache import default_cache_dir
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DataAsset:
+    """A dataset file fetched from ``url`` into the local cache directory.
+
+    The download is verified against ``sha256`` when given. Its checksum is
+    stored next to the file and checked again whenever the cached copy is
+    used, so a truncated or corrupted file is fetched again. ``load`` parses
+    the file once per process and all callers share the result.
+    """
+
+    def __init__(self, name: str, url: str, sha256: str = None, cache_dir=None):
+        self.name = name
+        self.url = url
+        self.sha256 = sha256
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._data = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> Path:
+        cache_dir = self.cache_dir or default_cache_dir() / "data"
+        return cache_dir / os.path.basename(self.url)
+
+    @property
+    def checksum_path(self) -> Path:
+        return self.path.with_name(self.path.name + ".sha256")
+
+    def is_cached(self) -> bool:
+        """True if a local copy exists and matches its checksum."""
+        if not (self.path.exists() and self.checksum_path.exists()):
+            return False
+        expected = self.sha256 or self.checksum_path.read_text().strip()
+        return _sha256(self.path) == expected
+
+    def fetch(self) -> Path:
+        """Return the path of a verified local copy, downloading it if needed.
+
+        Raises ``requests.RequestException`` if the download fails and
+        ``ValueError`` if it does not match ``sha256``.
+        """
+        if self.is_cached():
+            return self.path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.part")
+        try:
+            r = http_client.get(self.url, stream=True)
+            r.raise_for_status()
+            with open(tmp, "wb") as f:
+                for chunk in r.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            checksum = _sha256(tmp)
+            if self.sha256 and checksum != self.sha256:
+                raise ValueError(
+                    f"Checksum mismatch for {self.name}: "
+                    f"expected {self.sha256}, got {checksum}"
+                )
+            os.replace(tmp, self.path)
+            self.checksum_path.write_text(checksum)
+        finally:
+            tmp.unlink(missing_ok=True)
+        return self.path
+
+    def read(self, path: Path) -> pd.DataFrame:
+        return pd.read_csv(path)
+
+    def load(self) -> pd.DataFrame:
+        """The parsed dataset, loaded on first call and shared afterwards."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._data = self.read(self.fetch())
+        return self._data
+
+
+CLINTOX = DataAsset(
+    "clintox",
+    "https://deepchemdata.s3-us-west-1.amazonaws.com/datasets/clintox.csv.gz",
+)
+
+
+def load_clintox() -> pd.DataFrame:
+    """ClinTox dataset, shared by all tools in the process."""
+    return CLINTOX.load()
@@ -0,0 +1,158 @@
+"""Descriptors and similarities for many molecules at once, as NumPy arrays.
+
+All functions take an iterable of SMILES and return one row per input, in
+order. Invalid SMILES give ``nan`` (numbers) or ``None`` (objects) instead
+of raising, so a single bad entry does not spoil a library-sized batch.
+Functions with ``n_jobs`` split the input into chunks of ``chunksize`` and
+process them in a process pool when ``n_jobs > 1``.
+
+Fingerprints default to 2048-bit Morgan fingerprints of radius 2, the same
+as ``chemcrow.utils.tanimoto``; ``kind`` selects another type from
+``chemcrow.fingerprints``.
+"""
+
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from rdkit import Chem, DataStructs
+from rdkit.Chem import rdMolDescriptors
+
+from chemcrow.fingerprints import get_fingerprint_service, make_fingerprinter
+
+N_BITS = 2048
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def _map_chunks(func, smiles, n_jobs: int, chunksize: int) -> list:
+    """``func`` over chunks of ``smiles``, results concatenated in order."""
+    smiles = list(smiles)
+    if n_jobs <= 1 or len(smiles) <= chunksize:
+        return func(smiles)
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return [
+            r for chunk in pool.map(func, _chunks(smiles, chunksize)) for r in chunk
+        ]
+
+
+def parse(smiles) -> list:
+    """RDKit molecules, None for invalid SMILES."""
+    return [Chem.MolFromSmiles(s) for s in smiles]
+
+
+def _exact_mass(smiles: list) -> list:
+    return [
+        rdMolDescriptors.CalcExactMolWt(m) if m is not None else np.nan
+        for m in parse(smiles)
+    ]
+
+
+def _formula(smiles: list) -> list:
+    return [
+        rdMolDescriptors.CalcMolFormula(m) if m is not None else None
+        for m in parse(smiles)
+    ]
+
+
+def _fingerprints(smiles: list, kind: str = "morgan") -> list:
+    fingerprinter = make_fingerprinter(kind)
+    return [fingerprinter(m) if m is not None else None for m in parse(smiles)]
+
+
+def exact_mass(smiles, n_jobs: int = 1, chunksize: int = 1024) -> np.ndarray:
+    """Monoisotopic masses, shape ``(n,)``."""
+    return np.array(_map_chunks(_exact_mass, smiles, n_jobs, chunksize), dtype=float)
+
+
+def formula(smiles, n_jobs: int = 1, chunksize: int = 1024) -> np.ndarray:
+    """Molecular formulas, object array of shape ``(n,)``."""
+    out = _map_chunks(_formula, smiles, n_jobs, chunksize)
+    return np.array(out, dtype=object)
+
+
+def fingerprints(
+    smiles, n_jobs: int = 1, chunksize: int = 1024, kind: str = "morgan"
+) -> list:
+    """Fingerprints as RDKit bit vectors, for the bulk similarity APIs.
+
+    Serial runs go through the shared ``FingerprintService`` cache; process
+    pools compute them afresh.
+    """
+    if n_jobs <= 1:
+        return get_fingerprint_service(kind).fingerprints(smiles)
+    func = functools.partial(_fingerprints, kind=kind)
+    return _map_chunks(func, smiles, n_jobs, chunksize)
+
+
+def fingerprint_array(fps) -> np.ndarray:
+    """Bit vectors from ``fingerprints`` as a ``(n, n_bits)`` uint8 array.
+
+    Rows of invalid molecules are all zeros.
+    """
+    n_bits = next((fp.GetNumBits() for fp in fps if fp is not None), N_BITS)
+    arr = np.zeros((len(fps), n_bits), dtype=np.uint8)
+    for i, fp in enumerate(fps):
+        if fp is not None:
+            DataStructs.ConvertToNumpyArray(fp, arr[i])
+    return arr
+
+
+def _bulk_tanimoto(query, fps) -> np.ndarray:
+    sims = np.full(len(fps), np.nan)
+    valid = [i for i, fp in enumerate(fps) if fp is not None]
+    if query is not None and valid:
+        sims[valid] = DataStructs.BulkTanimotoSimilarity(query, [fps[i] for i in valid])
+    return sims
+
+
+def tanimoto_one_vs_many(
+    query: str, smiles, n_jobs: int = 1, kind: str = "morgan"
+) -> np.ndarray:
+    """Tanimoto similarity of ``query`` to each of ``smiles``, shape ``(n,)``.
+
+    Raises ValueError if ``query`` is not a valid SMILES.
+    """
+    query_fp = get_fingerprint_service(kind).fingerprint(query)
+    if query_fp is None:
+        raise ValueError(f"Invalid SMILES string: {query}")
+    return _bulk_tanimoto(query_fp, fingerprints(smiles, n_jobs, kind=kind))
+
+
+def tanimoto_matrix(
+    smiles, other=None, n_jobs: int = 1, kind: str = "morgan"
+) -> np.ndarray:
+    """Pairwise Tanimoto similarities, shape ``(n, m)``.
+
+    Compares ``smiles`` with itself, or with ``other`` if given.
+    """
+    fps = fingerprints(smiles, n_jobs, kind=kind)
+    other_fps = fps if other is None else fingerprints(other, n_jobs, kind=kind)
+    if not fps:
+        return np.empty((0, len(other_fps)))
+    return np.vstack([_bulk_tanimoto(fp, other_fps) for fp in fps])
+
+
+def _describe(smiles: list) -> list:
+    return [
+        (rdMolDescriptors.CalcExactMolWt(m), rdMolDescriptors.CalcMolFormula(m))
+        if m is not None
+        else (np.nan, None)
+        for m in parse(smiles)
+    ]
+
+
+def describe(smiles, n_jobs: int = 1, chunksize: int = 1024) -> dict:
+    """Validity, exact mass and formula of each molecule, as arrays."""
+    smiles = list(smiles)
+    rows = _map_chunks(_describe, smiles, n_jobs, chunksize)
+    formulas = np.array([f for _, f in rows], dtype=object)
+    return {
+        "smiles": np.array(smiles, dtype=object),
+        "valid": np.array([f is not None for f in formulas], dtype=bool),
+        "exact_mass": np.array([m for m, _ in rows], dtype=float),
+        "formula": formulas,
+    }
@@ -1,29 +1,179 @@
 import json
-import subprocess
+import multiprocessing
+import os
+import queue
+import time
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 
 app = Flask(__name__)
 
+CONFIG = os.getenv("AZF_CONFIG", "config.yml")
+EXPANSION = os.getenv("AZF_EXPANSION", "uspto")
+FILTER = os.getenv("AZF_FILTER", "uspto")
+STOCK = os.getenv("AZF_STOCK", "zinc")
+# number of worker processes, each holding one warm AiZynthFinder
+WORKERS = int(os.getenv("AZF_WORKERS", 2))
+# default search budget, and the most a request may ask for
+TIME_LIMIT = float(os.getenv("AZF_TIME_LIMIT", 120))
+ITERATION_LIMIT = int(os.getenv("AZF_ITERATION_LIMIT", 100))
+MAX_TIME_LIMIT = float(os.getenv("AZF_MAX_TIME_LIMIT", 600))
+MAX_ITERATION_LIMIT = int(os.getenv("AZF_MAX_ITERATION_LIMIT", 1000))
+# seconds a worker may take to load its models
+START_TIMEOUT = float(os.getenv("AZF_START_TIMEOUT", 600))
+
+# one warm AiZynthFinder per worker process
+finder = None
+# the worker processes, started in __main__
+pool = None
+
+
+def _init_worker(ready):
+    """Load policies and stock once per worker process, then report on
+    ``ready`` with the worker's pid and None or the error."""
+    global finder
+    try:
+        from aizynthfinder.aizynthfinder import AiZynthFinder
+
+        finder = AiZynthFinder(configfile=CONFIG)
+        finder.stock.select(STOCK)
+        finder.expansion_policy.select(EXPANSION)
+        finder.filter_policy.select(FILTER)
+    except Exception as e:
+        ready.put((os.getpid(), repr(e)))
+        raise
+    ready.put((os.getpid(), None))
+
+
+def start_pool(workers=WORKERS, timeout=START_TIMEOUT):
+    """Start the workers and wait until each has loaded its models.
+
+    Raises RuntimeError if a worker fails to load or takes longer than
+    ``timeout``; multiprocessing would otherwise restart it forever.
+    """
+    ready = multiprocessing.Queue()
+    workers_pool = multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(ready,)
+    )
+    deadline = time.monotonic() + timeout
+    loaded = set()
+    try:
+        while len(loaded) < workers:
+            pid, error = ready.get(timeout=max(deadline - time.monotonic(), 0))
+            if error is not None:
+                raise RuntimeError(f"Worker {pid} failed to load: {error}")
+            loaded.add(pid)
+    except queue.Empty:
+        workers_pool.terminate()
+        raise RuntimeError(
+            f"Only {len(loaded)} of {workers} workers loaded within {timeout} s"
+        )
+    except RuntimeError:
+        workers_pool.terminate()
+        raise
+    return workers_pool
+
+
+def _search(target, time_limit, iteration_limit):
+    """Run one tree search; returns the routes aizynthcli wrote to trees.json."""
+    # aizynthfinder 4 moved the limits to config.search
+    search_config = getattr(finder.config, "search", finder.config)
+    search_config.time_limit = time_limit
+    search_config.iteration_limit = iteration_limit
+    finder.target_smiles = target
+    search_time = finder.tree_search()
+    finder.build_routes()
+    trees = finder.routes.dict_with_extra(include_metadata=True, include_scores=True)
+    return target, trees, search_time
+
+
+def _try_search(job):
+    """``_search``, but a failed target gives its error instead of raising."""
+    try:
+        return _search(*job), None
+    except Exception as e:
+        return (job[0], None, None), str(e)
+
+
+def _budget(data):
+    time_limit = min(float(data.get("time_limit", TIME_LIMIT)), MAX_TIME_LIMIT)
+    iteration_limit = min(
+        int(data.get("iteration_limit", ITERATION_LIMIT)), MAX_ITERATION_LIMIT
+    )
+    return time_limit, iteration_limit
+
+
+def _stream(targets, budget):
+    """One JSON line per solved route, target by target as searches finish."""
+    jobs = [(t, *budget) for t in targets]
+    for (target, trees, search_time), error in pool.imap_unordered(_try_search, jobs):
+        if error is not None:
+            yield json.dumps({"target": target, "error": error}) + "\n"
+            continue
+        for rank, route in enumerate(trees):
+            yield json.dumps({"target": target, "rank": rank, "route": route}) + "\n"
+        yield json.dumps(
+            {"target": target, "routes": len(trees), "search_time": search_time}
+        ) + "\n"
+
+
 @app.route('/api/v1/run', methods=['POST'])
+@app.route('/api/v1/retrosynth', methods=['POST'])
 def rxnfp():
     data = request.get_json()
-    target = data.get("target", [])
+    target = data.get("smiles", data.get("target"))
+    if not isinstance(target, str) or not target:
+        return jsonify({"error": "Expected one SMILES, see /api/v1/batch"}), 400
+    budget = _budget(data)
+
+    if data.get("stream"):
+        return Response(_stream([target], budget), mimetype="application/x-ndjson")
 
-    command = ["aizynthcli", "--config", "config.yml", "--smiles", f"{target}"]
+    (_, trees, _), error = pool.apply(_try_search, ((target, *budget),))
+    if error is not None:
+        return jsonify({"error": error}), 400
+    # the routes, like trees.json
+    return jsonify(trees)
 
-    print(command)
-    result = subprocess.run(
-        command, check=True, capture_output=True, text=True
+
+@app.route('/api/v1/batch', methods=['POST'])
+def batch():
+    """Routes for a list of targets, one result per input in input order.
+
+    With "stream", NDJSON lines as each target finishes instead.
+    """
+    data = request.get_json()
+    targets = data.get("smiles", data.get("target"))
+    if not isinstance(targets, list) or not all(isinstance(t, str) for t in targets):
+        return jsonify({"error": "Expected a list of SMILES"}), 400
+    budget = _budget(data)
+
+    if data.get("stream"):
+        return Response(_stream(targets, budget), mimetype="application/x-ndjson")
+
+    results = pool.map(_try_search, [(t, *budget) for t in targets])
+    return jsonify(
+        {
+            "results": [
+                {"target": t, "routes": trees}
+                if error is None
+                else {"target": t, "error": error}
+                for (t, trees, _), error in results
+            ]
+        }
     )
-    print(result)
 
-    # Read output trees.json
-    with open("trees.json", "r") as f:
-        tree = json.load(f)
 
-    return tree
+@app.route('/api/v1/health', methods=['GET'])
+def health():
+    return jsonify(
+        {"status": "READY" if pool is not None else "LOADING", "workers": WORKERS}
+    )
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    start = time.perf_counter()
+    pool = start_pool()
+    elapsed = time.perf_counter() - start
+    print(f"{WORKERS} AiZynthFinder workers ready in {elapsed:.1f} s")
+    app.run(host="0.0.0.0", port=5000, threaded=True)
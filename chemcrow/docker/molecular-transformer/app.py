@@ -1,5 +1,11 @@
+import io
+import os
+import queue
 import re
-import subprocess
+import threading
+import time
+from concurrent.futures import Future
+
 from flask import Flask, request, jsonify
 from rdkit import Chem
 
@@ -7,6 +13,17 @@ app = Flask(__name__)
 
 
 SMI_REGEX_PATTERN =  r"(\%\([0-9]{3}\)|\[[^\]]+]|Br?|Cl?|N|O|S|P|F|I|b|c|n|o|s|p|\||\(|\)|\.|=|#|-|\+|\\|\/|:|~|@|\?|>>?|\*|\$|\%[0-9]{2}|[0-9])"
+SMI_REGEX = re.compile(SMI_REGEX_PATTERN)
+
+MODEL_PATH = os.getenv("MT_MODEL_PATH", "models/USPTO480k_model_step_400000.pt")
+N_BEST = int(os.getenv("MT_N_BEST", 5))
+BEAM_SIZE = int(os.getenv("MT_BEAM_SIZE", 10))
+MAX_LENGTH = int(os.getenv("MT_MAX_LENGTH", 300))
+# micro-batching: wait up to MAX_LATENCY_MS after the first queued request
+# for up to MAX_BATCH_SIZE requests, then translate them together
+MAX_BATCH_SIZE = int(os.getenv("MT_MAX_BATCH_SIZE", 16))
+MAX_LATENCY_MS = float(os.getenv("MT_MAX_LATENCY_MS", 20))
+
 
 def canonicalize_smiles(smiles, verbose=False): # will raise an Exception if invalid SMILES
     mol = Chem.MolFromSmiles(smiles)
@@ -19,57 +36,146 @@ def canonicalize_smiles(smiles, verbose=False): # will raise an Exception if inv
 
 def smiles_tokenizer(smiles):
     """Canonicalize and tokenize input smiles"""
-    
+
     smiles = canonicalize_smiles(smiles)
-    smiles_regex = re.compile(SMI_REGEX_PATTERN)
-    tokens = [token for token in smiles_regex.findall(smiles)]
+    tokens = [token for token in SMI_REGEX.findall(smiles)]
     return ' '.join(tokens)
 
 
+def load_translator():
+    """Load the OpenNMT model once, with the options onmt_translate used."""
+    import onmt.opts as opts
+    from onmt.translate.translator import build_translator
+    from onmt.utils.parse import ArgumentParser
+
+    parser = ArgumentParser()
+    opts.config_opts(parser)
+    opts.translate_opts(parser)
+    opt = parser.parse_args([
+        "-model", MODEL_PATH,
+        "-src", "-",
+        "-n_best", str(N_BEST),
+        "-beam_size", str(BEAM_SIZE),
+        "-max_length", str(MAX_LENGTH),
+        "-batch_size", str(MAX_BATCH_SIZE),
+    ])
+    ArgumentParser.validate_translate_opts(opt)
+    # predictions are returned, not written out
+    return build_translator(opt, out_file=io.StringIO(), report_score=False)
+
+
+class BatchTranslator:
+    """Collect concurrent requests and translate them in one model call."""
+
+    def __init__(self, translator, max_batch_size=MAX_BATCH_SIZE, max_latency_ms=MAX_LATENCY_MS):
+        self.translator = translator
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.requests = 0
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, tokens):
+        """Queue tokenized SMILES, returns a Future of its n_best products."""
+        future = Future()
+        self.queue.put((tokens, future))
+        return future
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                _, predictions = self.translator.translate(
+                    src=[tokens for tokens, _ in batch],
+                    batch_size=len(batch),
+                )
+                # the output file is not needed, keep it from growing
+                self.translator.out_file.seek(0)
+                self.translator.out_file.truncate()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            for (_, future), preds in zip(batch, predictions):
+                future.set_result([re.sub(' ', '', p) for p in preds])
+
+
+batcher = None
+
+
 @app.route('/api/v1/run', methods=['POST'])
+@app.route('/api/v1/translate', methods=['POST'])
 def f():
     request_data = request.get_json()
     input = request_data['smiles']
 
-    # Write the input to 'inp.txt'
-    with open('input.txt', 'w') as f:
-        # Tokenize smiles
-        smi = smiles_tokenizer(input)
-        f.write(smi)
-
-    model_path = 'models/USPTO480k_model_step_400000.pt'
-
-    src_path = 'input.txt'
-    output_path = 'output.txt'
-    n_best = 5
-    beam_size = 10
-    max_length = 300
-    batch_size = 1
+    # Tokenize smiles
+    smi = smiles_tokenizer(input)
+    if not smi:
+        return jsonify({'status': 'ERROR', 'product': None})
 
     try:
-        # Construct the command to execute
-        cmd = f"onmt_translate -model {model_path} " \
-              f"--src {src_path} " \
-              f"--output {output_path} --n_best {n_best} " \
-              f"--beam_size {beam_size} --max_length {max_length} " \
-              f"--batch_size {batch_size}"
-
-        # Execute the command using subprocess.check_call()
-        subprocess.check_call(cmd, shell=True)
-
-        # Read produced output
-        with open('output.txt', 'r') as f:
-            prods = f.read()
-            prods = re.sub(' ', '', prods).split('\n')
-
-        
+        prods = batcher.submit(smi).result()
         # Return a success message
         return jsonify({'status': 'SUCCESS', 'product': prods})
 
     except:
         return jsonify({'status': 'ERROR', 'product': None})
 
-if __name__ == '__main__':
-    # Run the Flask app
-    app.run(debug=True, host='0.0.0.0')
 
+@app.route('/api/v1/batch', methods=['POST'])
+def batch():
+    """Predict products for a list of reactant SMILES, one result per input."""
+    request_data = request.get_json()
+    inputs = request_data.get('smiles')
+    if not isinstance(inputs, list) or not all(isinstance(i, str) for i in inputs):
+        return jsonify({'status': 'ERROR', 'error': 'Expected a list of SMILES'}), 400
+
+    # queue everything first, so the batcher can group the inputs
+    futures = []
+    for input in inputs:
+        smi = smiles_tokenizer(input)
+        futures.append(batcher.submit(smi) if smi else None)
+
+    results = []
+    for input, future in zip(inputs, futures):
+        try:
+            if future is None:  # invalid SMILES
+                raise ValueError(input)
+            prods = future.result()
+            results.append({'smiles': input, 'status': 'SUCCESS', 'product': prods})
+        except:
+            results.append({'smiles': input, 'status': 'ERROR', 'product': None})
+    return jsonify({'status': 'SUCCESS', 'results': results})
+
+
+@app.route('/api/v1/health', methods=['GET'])
+def health():
+    return jsonify({
+        'status': 'READY' if batcher is not None else 'LOADING',
+        'requests': batcher.requests if batcher else 0,
+        'batches': batcher.batches if batcher else 0,
+    })
+
+
+if __name__ == '__main__':
+    batcher = BatchTranslator(load_translator())
+    # threaded, so concurrent requests can be batched together; no reloader,
+    # it would load the model a second time
+    app.run(host='0.0.0.0', threaded=True)
@@ -0,0 +1,64 @@
+"""Throughput and latency of a running reaction prediction container.
+
+Sends ``--requests`` predictions with ``--concurrency`` clients in parallel
+and reports requests per second and p50/p95 latency. Run it once against
+the container built from this directory and once against the previous
+image (one onmt_translate process per request) to compare, e.g.
+
+    python benchmark.py --url http://localhost:8052/api/v1/run --concurrency 1 8 32
+"""
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+REACTANTS = [
+    "CCOCCCCO.CC(=O)Cl",
+    "O=C(O)c1ccccc1.OCC",
+    "CC(=O)Cl.Nc1ccccc1",
+    "Brc1ccccc1.OB(O)c1ccccc1",
+    "CC(C)(C)OC(=O)N1CCNCC1.O=C(Cl)c1ccccc1",
+]
+
+
+def predict(url, smiles):
+    start = time.perf_counter()
+    r = requests.post(url, json={"smiles": smiles}, timeout=600)
+    r.raise_for_status()
+    return time.perf_counter() - start
+
+
+def run(url, n_requests, concurrency):
+    jobs = [REACTANTS[i % len(REACTANTS)] for i in range(n_requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda s: predict(url, s), jobs))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "throughput": n_requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[max(0, int(round(0.95 * len(latencies))) - 1)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--url", default="http://localhost:8052/api/v1/run")
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    # first request pays any lazy start-up cost
+    predict(args.url, REACTANTS[0])
+    print(f"{'clients':>8}{'req/s':>10}{'p50 s':>10}{'p95 s':>10}")
+    for c in args.concurrency:
+        r = run(args.url, args.requests, c)
+        print(f"{c:>8}{r['throughput']:>10.2f}{r['p50']:>10.2f}{r['p95']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
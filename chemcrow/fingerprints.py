@@ -0,0 +1,195 @@
+"""Fingerprints cached by canonical SMILES, shared by the similarity tools.
+
+``get_fingerprint_service(kind)`` returns the process-wide service for one
+fingerprint type: "morgan" (radius 2, 2048 bits, the default everywhere in
+chemcrow), "rdkit", "atompair" or "maccs". Fingerprints are kept in an LRU
+cache bounded by ``max_bytes`` and can be saved to and loaded from a
+compressed ``.npz`` file, so a large library is fingerprinted only once.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from rdkit import DataStructs
+from rdkit.Chem import MACCSkeys, rdFingerprintGenerator
+
+# per-entry overhead on top of the packed bits, for the size budget
+_ENTRY_OVERHEAD = 100
+
+DEFAULT_PARAMS = {
+    "morgan": {"radius": 2, "fpSize": 2048},
+    "rdkit": {"fpSize": 2048},
+    "atompair": {"fpSize": 2048},
+    "maccs": {},
+}
+
+
+def make_fingerprinter(kind: str = "morgan", **params):
+    """Function mapping an RDKit molecule to an ``ExplicitBitVect``.
+
+    ``params`` override ``DEFAULT_PARAMS[kind]`` and are passed to the
+    matching ``rdFingerprintGenerator`` factory.
+    """
+    if kind not in DEFAULT_PARAMS:
+        raise ValueError(
+            f"Unknown fingerprint type {kind}, use one of {list(DEFAULT_PARAMS)}"
+        )
+    params = {**DEFAULT_PARAMS[kind], **params}
+    if kind == "maccs":
+        return MACCSkeys.GenMACCSKeys
+    factory = {
+        "morgan": rdFingerprintGenerator.GetMorganGenerator,
+        "rdkit": rdFingerprintGenerator.GetRDKitFPGenerator,
+        "atompair": rdFingerprintGenerator.GetAtomPairGenerator,
+    }[kind]
+    return factory(**params).GetFingerprint
+
+
+def _parse(smiles: str):
+    """Canonical SMILES and molecule, or (None, None) for invalid SMILES."""
+    # imported here, chemcrow.utils itself uses this module
+    from chemcrow.utils import canonical_smiles, mol_from_smiles
+
+    try:
+        mol = mol_from_smiles(smiles)
+    except TypeError:
+        mol = None
+    if mol is None:
+        return None, None
+    return canonical_smiles(smiles), mol
+
+
+class FingerprintService:
+    """Compute and cache fingerprints of one type, keyed by canonical SMILES.
+
+    kind, params: fingerprint type and generator arguments, see
+        ``make_fingerprinter``.
+    max_bytes: approximate memory budget; least recently used fingerprints
+        are dropped beyond it.
+    """
+
+    def __init__(self, kind: str = "morgan", max_bytes: int = 64 * 2**20, **params):
+        self.kind = kind
+        self.params = {**DEFAULT_PARAMS.get(kind, {}), **params}
+        self._fingerprinter = make_fingerprinter(kind, **params)
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(key: str, fp) -> int:
+        return len(key) + fp.GetNumBits() // 8 + _ENTRY_OVERHEAD
+
+    def _put(self, key: str, fp) -> None:
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = fp
+            self._bytes += self._size(key, fp)
+            while self._bytes > self.max_bytes and len(self._cache) > 1:
+                old_key, old_fp = self._cache.popitem(last=False)
+                self._bytes -= self._size(old_key, old_fp)
+
+    def fingerprint(self, smiles: str):
+        """Fingerprint of ``smiles``, None if it is not a valid SMILES."""
+        key, mol = _parse(smiles)
+        if key is None:
+            return None
+        with self._lock:
+            fp = self._cache.get(key)
+            if fp is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return fp
+            self.misses += 1
+        fp = self._fingerprinter(mol)
+        self._put(key, fp)
+        return fp
+
+    def fingerprints(self, smiles) -> list:
+        return [self.fingerprint(s) for s in smiles]
+
+    def similarity(self, s1: str, s2: str) -> float:
+        """Tanimoto similarity; raises ValueError for invalid SMILES."""
+        fp1, fp2 = self.fingerprint(s1), self.fingerprint(s2)
+        if fp1 is None or fp2 is None:
+            raise ValueError("Invalid SMILES string")
+        return DataStructs.TanimotoSimilarity(fp1, fp2)
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
+            self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "kind": self.kind,
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def save(self, path) -> None:
+        """Write the cached fingerprints to ``path`` as a compressed npz file."""
+        with self._lock:
+            items = list(self._cache.items())
+        n_bits = items[0][1].GetNumBits() if items else 0
+        bits = np.zeros((len(items), n_bits), dtype=np.uint8)
+        for row, (_, fp) in zip(bits, items):
+            DataStructs.ConvertToNumpyArray(fp, row)
+        np.savez_compressed(
+            path,
+            kind=self.kind,
+            params=json.dumps(self.params, sort_keys=True),
+            smiles=np.array([k for k, _ in items], dtype=str),
+            bits=np.packbits(bits, axis=1),
+            n_bits=n_bits,
+        )
+
+    def load(self, path) -> int:
+        """Add fingerprints saved by ``save``; returns how many were read.
+
+        Raises ValueError if they were made with another type or parameters.
+        """
+        with np.load(path) as data:
+            params = json.loads(str(data["params"]))
+            if str(data["kind"]) != self.kind or params != self.params:
+                raise ValueError(
+                    f"{path} holds {data['kind']} fingerprints with {params}, "
+                    f"expected {self.kind} with {self.params}"
+                )
+            n_bits = int(data["n_bits"])
+            bits = np.unpackbits(data["bits"], axis=1, count=n_bits)
+            smiles = data["smiles"].tolist()
+        for key, row in zip(smiles, bits):
+            fp = DataStructs.ExplicitBitVect(n_bits)
+            fp.SetBitsFromList(np.flatnonzero(row).tolist())
+            self._put(key, fp)
+        return len(smiles)
+
+
+_services = {}
+_lock = threading.Lock()
+
+
+def get_fingerprint_service(kind: str = "morgan") -> FingerprintService:
+    """Process-wide ``FingerprintService`` for ``kind`` with default params."""
+    if kind not in _services:
+        with _lock:
+            if kind not in _services:
+                _services[kind] = FingerprintService(kind)
+    return _services[kind]
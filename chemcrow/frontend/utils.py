@@ -1,8 +1,9 @@
-import requests
 from langchain import LLMChain, PromptTemplate
 from langchain.chat_models import ChatOpenAI
 from rdkit import Chem
 
+from chemcrow import http_client
+
 
 def cdk(smiles):
     """
@@ -11,7 +12,7 @@ def cdk(smiles):
 
     url = "https://www.simolecule.com/cdkdepict/depict/wob/svg"
     headers = {"Content-Type": "application/json"}
-    response = requests.get(
+    response = http_client.get(
         url,
         headers=headers,
         params={
@@ -0,0 +1,261 @@
+"""Shared, connection-pooled HTTP session for outbound requests.
+
+All tools go through the module-level ``get``/``post``/``request`` helpers so
+that keep-alive connections are reused between calls, every request has a
+timeout, and transient failures are retried with backoff. ``aget``/``apost``/
+``arequest`` are the asyncio counterparts used by the tools' ``_arun``.
+Defaults can be changed with ``configure`` or the ``CHEMCROW_HTTP_*``
+environment variables.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class HTTPClient:
+    """A ``requests.Session`` with bounded per-host pools, timeouts and retries.
+
+    pool_connections: number of hosts to keep a connection pool for.
+    pool_maxsize: max open connections per host; extra requests wait for one.
+    connect_timeout, read_timeout: default timeouts in seconds.
+    retries: retries on connection errors and on ``status_forcelist`` responses
+        (idempotent methods only), waiting ``backoff_factor * 2**n`` seconds
+        or as long as a Retry-After header asks.
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=status_forcelist,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=True,
+            max_retries=retry,
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncResponse:
+    """Status, headers and body of an aiohttp response, read eagerly."""
+
+    def __init__(self, status_code: int, headers, content: bytes):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class AsyncHTTPClient:
+    """aiohttp counterpart of ``HTTPClient``, with the same arguments.
+
+    Keeps one ``aiohttp.ClientSession`` per event loop. Network errors are
+    re-raised as the matching ``requests`` exceptions so callers handle both
+    clients alike.
+    """
+
+    _idempotent = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 60.0,
+        retries: int = 3,
+        backoff_factor: float = 0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+    ):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = set(status_forcelist)
+        self._sessions = weakref.WeakKeyDictionary()
+
+    def _session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_connections * self.pool_maxsize,
+                limit_per_host=self.pool_maxsize,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+        return session
+
+    def _backoff(self, attempt: int, response=None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_factor * 2**attempt
+
+    async def request(self, method: str, url: str, **kwargs) -> AsyncResponse:
+        timeout = kwargs.pop("timeout", None) or self.timeout
+        if not isinstance(timeout, tuple):
+            timeout = (timeout, timeout)
+        kwargs["timeout"] = aiohttp.ClientTimeout(
+            sock_connect=timeout[0], sock_read=timeout[1]
+        )
+        method = method.upper()
+        retries = self.retries if method in self._idempotent else 0
+        for attempt in range(retries + 1):
+            try:
+                async with self._session().request(method, url, **kwargs) as r:
+                    response = AsyncResponse(r.status, r.headers, await r.read())
+            except asyncio.TimeoutError as e:
+                if attempt == retries:
+                    raise requests.exceptions.Timeout(str(e)) from e
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except aiohttp.ClientError as e:
+                if attempt == retries:
+                    raise requests.exceptions.ConnectionError(str(e)) from e
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            if response.status_code in self.status_forcelist and attempt < retries:
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            return response
+
+    async def get(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> AsyncResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        """Close the session of the running event loop."""
+        session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
+
+
+def _from_env() -> dict:
+    env = {
+        "pool_connections": ("CHEMCROW_HTTP_POOL_CONNECTIONS", int),
+        "pool_maxsize": ("CHEMCROW_HTTP_POOL_MAXSIZE", int),
+        "connect_timeout": ("CHEMCROW_HTTP_CONNECT_TIMEOUT", float),
+        "read_timeout": ("CHEMCROW_HTTP_READ_TIMEOUT", float),
+        "retries": ("CHEMCROW_HTTP_RETRIES", int),
+        "backoff_factor": ("CHEMCROW_HTTP_BACKOFF", float),
+    }
+    return {
+        key: cast(os.environ[var])
+        for key, (var, cast) in env.items()
+        if var in os.environ
+    }
+
+
+_client = None
+_async_client = None
+_lock = threading.Lock()
+
+
+def get_http_client() -> HTTPClient:
+    """Process-wide HTTP client, created on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = HTTPClient(**_from_env())
+    return _client
+
+
+def get_async_http_client() -> AsyncHTTPClient:
+    """Process-wide async HTTP client, created on first use."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = AsyncHTTPClient(**_from_env())
+    return _async_client
+
+
+def configure(**kwargs) -> HTTPClient:
+    """Replace the process-wide clients with ones built from ``kwargs``.
+
+    Arguments are those of ``HTTPClient``; unset ones fall back to the
+    environment, then to the defaults.
+    """
+    global _client, _async_client
+    with _lock:
+        old = _client
+        _client = HTTPClient(**{**_from_env(), **kwargs})
+        _async_client = AsyncHTTPClient(**{**_from_env(), **kwargs})
+    if old is not None:
+        old.close()
+    return _client
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_http_client().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_http_client().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_http_client().post(url, **kwargs)
+
+
+async def arequest(method: str, url: str, **kwargs) -> AsyncResponse:
+    return await get_async_http_client().request(method, url, **kwargs)
+
+
+async def aget(url: str, **kwargs) -> AsyncResponse:
+    return await get_async_http_client().get(url, **kwargs)
+
+
+async def apost(url: str, **kwargs) -> AsyncResponse:
+    return await get_async_http_client().post(url, **kwargs)
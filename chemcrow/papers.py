@@ -0,0 +1,415 @@
+"""Concurrent ingestion of downloaded papers into a paperqa ``Docs``.
+
+``ingest(docs, papers)`` does what calling ``docs.add(path, citation)`` for
+every paper and then querying would, in three concurrent stages: papers
+are deduplicated by DOI and file hash, PDFs are parsed and chunked in a
+process pool, and the chunks are embedded in batches of ``batch_size``
+texts, several batches in flight at once. The FAISS index is built from
+those embeddings, so ``docs.query`` does not embed again.
+
+Parsed chunks and their vectors are kept in the paper store
+(``get_paper_store``), keyed by the PDF's content hash and the embedding
+model, so papers seen in earlier queries or sessions skip both stages.
+
+Downloaded PDFs are kept in a ``PDFCache`` (``get_pdf_cache``) keyed by DOI
+and arXiv ID, which the paperscraper scrapers in ``fix_package/lib.py`` check
+before downloading.
+"""
+
+import base64
+import contextlib
+import hashlib
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from langchain.vectorstores import FAISS
+from paperqa.readers import parse_pdf
+from paperqa.utils import maybe_is_text, md5sum
+from pypdf.errors import PdfReadError
+
+from chemcrow.cache import SQLiteCache, default_cache_dir
+
+# errors of a single paper, which is then skipped like in scholar2result_llm
+LOAD_ERRORS = (
+    ValueError,
+    FileNotFoundError,
+    PdfReadError,
+    UnboundLocalError,
+    PermissionError,
+    AttributeError,
+)
+
+
+def _doc_key(citation: str, keys: set) -> str:
+    """Author and year from ``citation``, unique among ``keys``, like
+    ``Docs.add`` makes them."""
+    author = re.search(r"([A-Z][a-z]+)", citation)
+    if author is None:
+        raise ValueError(f"Could not parse key from citation {citation}")
+    year = re.search(r"(\d{4})", citation)
+    key = author.group(1) + (year.group(1) if year else "")
+    suffix = ""
+    while key + suffix in keys:
+        suffix = "a" if suffix == "" else chr(ord(suffix) + 1)
+    return key + suffix
+
+
+def _parse(job):
+    """Chunks and their metadata of one paper, or the error parsing it."""
+    path, citation, key, chunk_chars = job
+    try:
+        texts, metadata = parse_pdf(str(path), citation, key, chunk_chars, 100)
+    except Exception as e:
+        return None, e
+    text = "".join(texts)
+    if len(text) < 10 or not maybe_is_text(text):
+        return None, ValueError(f"This does not look like a text document: {path}")
+    return (texts, metadata), None
+
+
+def _unique(docs, papers: dict):
+    """(path, data, md5) of papers not in ``docs`` nor seen before in
+    ``papers``, by DOI and by file hash, and the number of missing files."""
+    hashes = {doc["md5"] for doc in docs.docs.values()}
+    dois = {doc["doi"] for doc in docs.docs.values() if doc.get("doi")}
+    unique = []
+    missing = 0
+    for path, data in papers.items():
+        if path in docs.docs:
+            continue
+        doi = (data.get("doi") or "").lower()
+        try:
+            digest = md5sum(path)
+        except (FileNotFoundError, PermissionError):
+            missing += 1
+            continue
+        if digest in hashes or (doi and doi in dois):
+            continue
+        hashes.add(digest)
+        if doi:
+            dois.add(doi)
+        unique.append((path, data, digest))
+    return unique, missing
+
+
+def embed(embeddings, texts: list, batch_size: int = 64, concurrency: int = 4):
+    """Vectors of ``texts``, ``batch_size`` texts per request and up to
+    ``concurrency`` requests at a time."""
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    if len(batches) <= 1 or concurrency <= 1:
+        return [v for batch in batches for v in embeddings.embed_documents(batch)]
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return [
+            v
+            for vectors in pool.map(embeddings.embed_documents, batches)
+            for v in vectors
+        ]
+
+
+def ingest(
+    docs,
+    papers: dict,
+    n_jobs: int = 4,
+    batch_size: int = 64,
+    concurrency: int = 4,
+    chunk_chars: int = 3000,
+) -> int:
+    """Add ``papers`` (path -> data with "citation" and "doi") to ``docs``.
+
+    Duplicates are skipped silently. Returns the number of papers that could
+    not be loaded.
+    """
+    unique, not_loaded = _unique(docs, papers)
+    jobs = []
+    keys = set(docs.keys)
+    for path, data, digest in unique:
+        try:
+            key = _doc_key(data["citation"], keys)
+        except (ValueError, KeyError):
+            not_loaded += 1
+            continue
+        keys.add(key)
+        doi = (data.get("doi") or "").lower()
+        jobs.append((path, data["citation"], key, chunk_chars, digest, doi))
+    if not jobs:
+        return not_loaded
+
+    store = get_paper_store()
+    model = _embedding_id(docs.embeddings)
+    entries = {}
+    for path, _, _, _, digest, _ in jobs:
+        if store is None:
+            break
+        entry = store.get(_store_key(digest, chunk_chars, model))
+        if entry is not None:
+            entries[path] = entry
+
+    parse_jobs = [job[:4] for job in jobs if job[0] not in entries]
+    if n_jobs <= 1 or len(parse_jobs) <= 1:
+        parsed = [_parse(job) for job in parse_jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(parse_jobs))) as pool:
+            parsed = list(pool.map(_parse, parse_jobs))
+    parsed = dict(zip([job[0] for job in parse_jobs], parsed))
+
+    # (path, texts, metadata, vectors) to index; vectors None until embedded
+    added = []
+    for path, citation, key, _, digest, doi in jobs:
+        if path in entries:
+            entry = entries[path]
+            texts = entry["texts"]
+            metadata = _metadata(citation, key, entry["pages"])
+            vectors = _decode(entry)
+        else:
+            chunks, error = parsed[path]
+            if error is not None:
+                if not isinstance(error, LOAD_ERRORS):
+                    raise error
+                not_loaded += 1
+                continue
+            (texts, metadata), vectors = chunks, None
+        docs.docs[path] = dict(
+            texts=texts, metadata=metadata, key=key, md5=digest, doi=doi
+        )
+        docs.keys.add(key)
+        added.append((path, texts, metadata, vectors))
+        if docs._doc_index is not None:
+            docs._doc_index.add_texts([citation], metadatas=[{"key": key}])
+
+    if docs._faiss_index is None:
+        # index every document, including ones added before with docs.add
+        new = {path for path, *_ in added}
+        added += [
+            (path, doc["texts"], doc["metadata"], None)
+            for path, doc in docs.docs.items()
+            if path not in new
+        ]
+    texts = [t for _, texts, _, vectors in added if vectors is None for t in texts]
+    vectors = iter(embed(docs.embeddings, texts, batch_size, concurrency))
+    pairs, metadatas = [], []
+    for path, texts, metadata, doc_vectors in added:
+        if doc_vectors is None:
+            doc_vectors = [next(vectors) for _ in texts]
+            if store is not None and path not in entries:
+                store.set(
+                    _store_key(docs.docs[path]["md5"], chunk_chars, model),
+                    _entry(texts, metadata, doc_vectors),
+                )
+        pairs += zip(texts, doc_vectors)
+        metadatas += metadata
+    if pairs:
+        if docs._faiss_index is None:
+            docs._faiss_index = FAISS.from_embeddings(
+                pairs, docs.embeddings, metadatas=metadatas
+            )
+        else:
+            docs._faiss_index.add_embeddings(pairs, metadatas=metadatas)
+    return not_loaded
+
+
+def _embedding_id(embeddings) -> str:
+    """Name of an embedding model, so stores of different models do not mix."""
+    return f"{type(embeddings).__name__}/{getattr(embeddings, 'model', '')}"
+
+
+def _store_key(digest: str, chunk_chars: int, model: str) -> str:
+    return f"paper/{model}/{chunk_chars}/{digest}"
+
+
+def _entry(texts: list, metadata: list, vectors: list) -> dict:
+    """Store entry of a paper; citation and key differ between sessions, so
+    only the pages of each chunk are kept from its metadata."""
+    return {
+        "texts": texts,
+        "pages": [m["key"].rsplit(" pages ", 1)[-1] for m in metadata],
+        "vectors": base64.b64encode(
+            np.asarray(vectors, dtype=np.float32).tobytes()
+        ).decode(),
+        "dim": len(vectors[0]) if vectors else 0,
+    }
+
+
+def _decode(entry: dict) -> list:
+    vectors = np.frombuffer(base64.b64decode(entry["vectors"]), dtype=np.float32)
+    return vectors.reshape(-1, entry["dim"]).tolist()
+
+
+def _metadata(citation: str, key: str, pages: list) -> list:
+    """Chunk metadata as ``parse_pdf`` makes it."""
+    return [
+        dict(citation=citation, dockey=key, key=f"{key} pages {pg}") for pg in pages
+    ]
+
+
+_store = None
+_store_set = False
+_lock = threading.Lock()
+
+
+def get_paper_store():
+    """Process-wide store of parsed and embedded papers, None if disabled.
+
+    By default a SQLite file in the chemcrow cache directory holding at most
+    ``CHEMCROW_PAPER_STORE_BYTES`` (1 GB), least recently used papers
+    evicted first. Entries are keyed by the PDF's md5, so a paper found again
+    by another query, in any session, is neither parsed nor embedded again.
+    """
+    global _store, _store_set
+    if not _store_set:
+        with _lock:
+            if not _store_set:
+                max_bytes = int(os.getenv("CHEMCROW_PAPER_STORE_BYTES", 1024**3))
+                _store = SQLiteCache(
+                    default_cache_dir() / "papers.sqlite",
+                    ttl=None,
+                    max_bytes=max_bytes,
+                )
+                _store_set = True
+    return _store
+
+
+def set_paper_store(store) -> None:
+    """Replace the process-wide store; None disables it."""
+    global _store, _store_set
+    with _lock:
+        _store = store
+        _store_set = True
+
+
+def paper_ids(paper: dict) -> list:
+    """Cache keys of a paper, "doi:..." and "arxiv:...", from Semantic Scholar
+    ``externalIds`` or a parsed paper's "doi"."""
+    external = paper.get("externalIds") or {}
+    doi = (external.get("DOI") or paper.get("doi") or "").strip().lower()
+    ids = [f"doi:{doi}"] if doi else []
+    arxiv = external.get("ArXiv")
+    if not arxiv and doi.startswith("10.48550/arxiv."):
+        arxiv = doi.split("/arxiv.", 1)[1]
+    if arxiv:
+        ids.append(f"arxiv:{arxiv.lower()}")
+    return ids
+
+
+class PDFCache:
+    """Downloaded PDFs shared by all queries, stored once per content.
+
+    Files live in ``root/blobs`` named by their sha256; a ``SQLiteCache`` maps
+    DOIs and arXiv IDs (see ``paper_ids``) to them. Once the files exceed
+    ``max_bytes`` the least recently used are deleted.
+    """
+
+    def __init__(self, root=None, max_bytes: int = 2 * 1024**3):
+        if root is None:
+            root = default_cache_dir() / "pdfs"
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.index = SQLiteCache(self.root / "index.sqlite", ttl=None, max_bytes=None)
+
+    def get(self, ids: list):
+        """Path of the cached PDF for any of ``ids``, None if not cached."""
+        for paper_id in ids:
+            digest = self.index.get(paper_id)
+            if digest is None:
+                continue
+            blob = self.blobs / f"{digest}.pdf"
+            try:
+                # the modification time orders eviction
+                os.utime(blob)
+            except FileNotFoundError:
+                self.index.delete(paper_id)
+                continue
+            return blob
+        return None
+
+    def copy_to(self, ids: list, path) -> bool:
+        """Put the cached PDF for ``ids`` at ``path``; False if not cached."""
+        blob = self.get(ids)
+        if blob is None:
+            return False
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+        try:
+            os.link(blob, path)
+        except OSError:
+            shutil.copyfile(blob, path)
+        return True
+
+    def put(self, ids: list, path):
+        """Cache the PDF at ``path`` under ``ids``; returns its cached path, or
+        None if ``path`` is not a PDF."""
+        if not ids:
+            return None
+        try:
+            with open(path, "rb") as f:
+                if f.read(5) != b"%PDF-":
+                    return None
+        except FileNotFoundError:
+            return None
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 16), b""):
+                h.update(block)
+        blob = self.blobs / f"{h.hexdigest()}.pdf"
+        if not blob.exists():
+            tmp = blob.with_suffix(f".{os.getpid()}.tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, blob)
+        for paper_id in ids:
+            self.index.set(paper_id, h.hexdigest())
+        self._evict()
+        return blob
+
+    def _evict(self) -> None:
+        files = [
+            (f.stat().st_mtime, f.stat().st_size, f) for f in self.blobs.glob("*.pdf")
+        ]
+        total = sum(size for _, size, _ in files)
+        for _, size, f in sorted(files):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                f.unlink()
+            total -= size
+
+    def stats(self) -> dict:
+        files = list(self.blobs.glob("*.pdf"))
+        return {
+            "files": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+            "ids": len(self.index),
+        }
+
+
+_pdf_cache = None
+_pdf_cache_set = False
+
+
+def get_pdf_cache():
+    """Process-wide PDF cache, None if disabled.
+
+    By default ``pdfs`` in the chemcrow cache directory, holding at most
+    ``CHEMCROW_PDF_CACHE_BYTES`` (2 GB).
+    """
+    global _pdf_cache, _pdf_cache_set
+    if not _pdf_cache_set:
+        with _lock:
+            if not _pdf_cache_set:
+                max_bytes = int(os.getenv("CHEMCROW_PDF_CACHE_BYTES", 2 * 1024**3))
+                _pdf_cache = PDFCache(max_bytes=max_bytes)
+                _pdf_cache_set = True
+    return _pdf_cache
+
+
+def set_pdf_cache(cache) -> None:
+    """Replace the process-wide PDF cache; None disables it."""
+    global _pdf_cache, _pdf_cache_set
+    with _lock:
+        _pdf_cache = cache
+        _pdf_cache_set = True
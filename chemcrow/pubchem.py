@@ -0,0 +1,236 @@
+"""PubChem access shared by the tools, backed by a persistent response cache."""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from rdkit import Chem
+
+from chemcrow import http_client
+from chemcrow.cache import SQLiteCache, default_cache_dir
+
+PUG_URL = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
+PUG_VIEW_URL = "https://pubchem.ncbi.nlm.nih.gov/rest/pug_view"
+
+
+def normalize_query(query: str, namespace: str = "name") -> str:
+    """Normalize a PubChem identifier so equivalent queries share a cache entry.
+
+    Names are case- and whitespace-insensitive, SMILES are canonicalized.
+    """
+    query = " ".join(str(query).split())
+    if namespace == "smiles":
+        mol = Chem.MolFromSmiles(query)
+        if mol is not None:
+            return Chem.MolToSmiles(mol)
+        return query
+    if namespace == "name":
+        return query.casefold()
+    return query
+
+
+def quote_identifier(identifier: str) -> str:
+    """Escape an identifier for use as a PUG REST path segment."""
+    return quote(str(identifier).strip(), safe="")
+
+
+def compound_key(namespace: str, identifier: str, operation: str) -> str:
+    """Cache key of a PUG REST compound request."""
+    identifier = normalize_query(identifier, namespace)
+    return f"pug/compound/{namespace}/{identifier}/{operation}"
+
+
+class PubChemClient:
+    """Fetch PubChem JSON, answering repeat queries from ``cache``.
+
+    Only successful responses are cached. Pass ``cache=None`` to disable
+    caching.
+    """
+
+    # PubChem allows at most 5 requests per second per user
+    max_workers: int = 5
+
+    def __init__(self, cache="default"):
+        if cache == "default":
+            cache = SQLiteCache(default_cache_dir() / "pubchem.sqlite")
+        self.cache = cache
+
+    def get_json(self, url: str, key: str = None, params: dict = None):
+        """GET ``url`` and return the decoded JSON, cached under ``key``.
+
+        ``key`` defaults to ``url``. Raises ``requests.RequestException`` on
+        network errors.
+        """
+        key = key or url
+        if self.cache is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+        r = http_client.get(url, params=params)
+        data = r.json()
+        if self.cache is not None and r.status_code == 200:
+            self.cache.set(key, data)
+        return data
+
+    def compound(self, namespace: str, identifier: str, operation: str):
+        """PUG REST ``compound/{namespace}/{identifier}/{operation}`` as JSON."""
+        url = f"{PUG_URL}/compound/{namespace}/{quote_identifier(identifier)}"
+        return self.get_json(
+            f"{url}/{operation}", key=compound_key(namespace, identifier, operation)
+        )
+
+    def pug_view(self, cid, heading: str = None):
+        """PUG View record of compound ``cid``.
+
+        With ``heading`` (e.g. "CAS" or "GHS Classification") only that
+        section is downloaded, keeping its position in the section tree.
+        Full records of popular compounds are several MB.
+        """
+        if heading is None:
+            return self.get_json(
+                f"{PUG_VIEW_URL}/data/compound/{cid}/JSON",
+                key=f"pug_view/compound/{cid}",
+            )
+        return self.get_json(
+            f"{PUG_VIEW_URL}/data/compound/{cid}/JSON",
+            key=f"pug_view/compound/{cid}/{heading}",
+            params={"heading": heading},
+        )
+
+    def pug_view_sections(self, cid, headings):
+        """PUG View record of ``cid`` restricted to several ``headings``.
+
+        Fetches each heading separately and merges their top-level sections.
+        Headings missing from the record are skipped.
+        """
+        record = {"Record": {"RecordNumber": cid, "Section": []}}
+        for heading in headings:
+            data = self.pug_view(cid, heading)
+            if "Record" in data:
+                record["Record"]["Section"].extend(data["Record"].get("Section", []))
+        return record
+
+    def cid(self, identifier: str, namespace: str = "name"):
+        """First CID matching ``identifier``, or None."""
+        data = self.compound(namespace, identifier, "cids/JSON")
+        try:
+            return data["IdentifierList"]["CID"][0]
+        except (KeyError, IndexError):
+            return None
+
+    def cids(self, identifiers, namespace: str = "name") -> dict:
+        """Map each of ``identifiers`` to its first CID, or None.
+
+        PUG REST takes a single name or SMILES per request, so these are
+        resolved concurrently over the shared connection pool (cached
+        answers need no request at all).
+        """
+        identifiers = list(dict.fromkeys(identifiers))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            cids = pool.map(lambda q: self._safe_cid(q, namespace), identifiers)
+            return dict(zip(identifiers, cids))
+
+    def _safe_cid(self, identifier, namespace):
+        try:
+            return self.cid(identifier, namespace)
+        except Exception:
+            return None
+
+    def properties(self, cids, properties=("IsomericSMILES",)) -> dict:
+        """Map each CID to a dict of ``properties``, in one POST per call.
+
+        Cached CIDs are not requested again.
+        """
+        props = ",".join(properties)
+        out, missing = {}, []
+        for cid in dict.fromkeys(cids):
+            key = f"pug/compound/cid/{cid}/property/{props}"
+            cached = self.cache.get(key) if self.cache is not None else None
+            if cached is None:
+                missing.append(cid)
+            else:
+                out[cid] = cached
+        if missing:
+            r = http_client.post(
+                f"{PUG_URL}/compound/cid/property/{props}/JSON",
+                data={"cid": ",".join(str(c) for c in missing)},
+            )
+            for row in r.json().get("PropertyTable", {}).get("Properties", []):
+                cid = row.pop("CID")
+                out[cid] = row
+                if self.cache is not None and r.status_code == 200:
+                    self.cache.set(f"pug/compound/cid/{cid}/property/{props}", row)
+        return out
+
+    # asyncio counterparts, used by the tools' _arun
+
+    async def aget_json(self, url: str, key: str = None, params: dict = None):
+        """Async ``get_json``."""
+        key = key or url
+        if self.cache is not None:
+            data = self.cache.get(key)
+            if data is not None:
+                return data
+        r = await http_client.aget(url, params=params)
+        data = r.json()
+        if self.cache is not None and r.status_code == 200:
+            self.cache.set(key, data)
+        return data
+
+    async def acompound(self, namespace: str, identifier: str, operation: str):
+        """Async ``compound``."""
+        url = f"{PUG_URL}/compound/{namespace}/{quote_identifier(identifier)}"
+        return await self.aget_json(
+            f"{url}/{operation}", key=compound_key(namespace, identifier, operation)
+        )
+
+    async def apug_view(self, cid, heading: str = None):
+        """Async ``pug_view``."""
+        if heading is None:
+            return await self.aget_json(
+                f"{PUG_VIEW_URL}/data/compound/{cid}/JSON",
+                key=f"pug_view/compound/{cid}",
+            )
+        return await self.aget_json(
+            f"{PUG_VIEW_URL}/data/compound/{cid}/JSON",
+            key=f"pug_view/compound/{cid}/{heading}",
+            params={"heading": heading},
+        )
+
+    async def apug_view_sections(self, cid, headings):
+        """Async ``pug_view_sections``; the headings are fetched concurrently."""
+        parts = await asyncio.gather(*(self.apug_view(cid, h) for h in headings))
+        record = {"Record": {"RecordNumber": cid, "Section": []}}
+        for data in parts:
+            if "Record" in data:
+                record["Record"]["Section"].extend(data["Record"].get("Section", []))
+        return record
+
+    async def acid(self, identifier: str, namespace: str = "name"):
+        """Async ``cid``."""
+        data = await self.acompound(namespace, identifier, "cids/JSON")
+        try:
+            return data["IdentifierList"]["CID"][0]
+        except (KeyError, IndexError):
+            return None
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PubChemClient:
+    """Process-wide PubChem client."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PubChemClient()
+    return _client
+
+
+def set_client(client: PubChemClient) -> None:
+    """Replace the process-wide PubChem client, e.g. to change its cache."""
+    global _client
+    _client = client
@@ -0,0 +1,95 @@
+"""Persistent cache of reaction prediction and retrosynthesis results.
+
+Results are keyed by the canonical SMILES of the input together with the
+model and its settings, so the same target asked with different wording
+of the SMILES, in another session or by another process, is answered
+without calling the model. The backend is any object with the
+``SQLiteCache`` ``get``/``set`` interface; by default a SQLite file next to
+the PubChem cache, with entries expiring after ``CHEMCROW_REACTION_CACHE_TTL``
+seconds (30 days).
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+from chemcrow.cache import SQLiteCache, default_cache_dir
+from chemcrow.utils import canonical_smiles
+
+
+def reaction_key(task: str, smiles: str, model: str, **params) -> str:
+    """Cache key of running ``model`` on ``smiles`` with ``params``.
+
+    task: "predict" or "retrosynthesis".
+    """
+    settings = json.dumps(params, sort_keys=True)
+    return f"{task}/{model}/{canonical_smiles(smiles)}/{settings}"
+
+
+def summary_key(actions, model: str) -> str:
+    """Cache key of an LLM description of a synthesis given as ``actions``."""
+    payload = json.dumps(actions, sort_keys=True, default=str)
+    return f"summary/{model}/{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def cached(key: str, compute, cache="default"):
+    """``cache[key]``, or ``compute()`` stored under ``key``.
+
+    Nothing is stored if ``compute`` raises or returns an empty result, such
+    as no routes found. ``cache=None`` disables caching.
+    """
+    if cache == "default":
+        cache = get_reaction_cache()
+    if cache is None:
+        return compute()
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        if not _empty(value):
+            cache.set(key, value)
+    return value
+
+
+async def acached(key: str, compute, cache="default"):
+    """Async ``cached``, ``compute`` returns an awaitable."""
+    if cache == "default":
+        cache = get_reaction_cache()
+    if cache is None:
+        return await compute()
+    value = cache.get(key)
+    if value is None:
+        value = await compute()
+        if not _empty(value):
+            cache.set(key, value)
+    return value
+
+
+def _empty(value) -> bool:
+    return value is None or (isinstance(value, (list, dict, str)) and not value)
+
+
+_cache = None
+_cache_set = False
+_lock = threading.Lock()
+
+
+def get_reaction_cache():
+    """Process-wide reaction result cache, None if disabled."""
+    global _cache, _cache_set
+    if not _cache_set:
+        with _lock:
+            if not _cache_set:
+                ttl = float(os.getenv("CHEMCROW_REACTION_CACHE_TTL", 30 * 24 * 3600))
+                _cache = SQLiteCache(default_cache_dir() / "reactions.sqlite", ttl=ttl)
+                _cache_set = True
+    return _cache
+
+
+def set_reaction_cache(cache) -> None:
+    """Replace the process-wide cache, e.g. with another backend; None
+    disables caching."""
+    global _cache, _cache_set
+    with _lock:
+        _cache = cache
+        _cache_set = True
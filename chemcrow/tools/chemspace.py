@@ -1,26 +1,135 @@
+import asyncio
+import math
 import os
+import threading
+import time
+import weakref
 
 import molbloom
-import pandas as pd
-import requests
+import numpy as np
 from langchain.tools import BaseTool
 
+from chemcrow import http_client
 from chemcrow.utils import is_smiles
 
+# grams per pack unit; packs in other units (e.g. mL) cannot be compared per gram
+_GRAMS = {"ug": 1e-6, "µg": 1e-6, "mg": 1e-3, "g": 1.0, "kg": 1e3}
+
+
+def _number(value):
+    """``value`` as a finite float, None for "Inquire", missing values etc."""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _offers(data) -> dict:
+    """Flatten the offers of search results into columns, in one pass.
+
+    One row per pack with a numeric price; "perGram" is the USD price per
+    gram, inf when the pack unit is not a mass.
+    """
+    columns = {k: [] for k in ("smiles", "vendorName", "quantity", "priceUsd")}
+    per_gram = []
+    for item in data["items"]:
+        for off in item.get("offers") or ():
+            for price in off.get("prices") or ():
+                usd = _number(price.get("priceUsd"))
+                if usd is None:
+                    continue
+                pack = _number(price.get("pack"))
+                unit = _GRAMS.get(str(price.get("uom")).lower())
+                grams = pack * unit if pack and unit else 0.0
+                columns["smiles"].append(item["smiles"])
+                columns["vendorName"].append(off["vendorName"])
+                columns["quantity"].append(f"{price.get('pack')}{price.get('uom')}")
+                columns["priceUsd"].append(usd)
+                per_gram.append(usd / grams if grams > 0 else np.inf)
+    offers = {k: np.array(v, dtype=object) for k, v in columns.items()}
+    offers["priceUsd"] = np.array(columns["priceUsd"], dtype=float)
+    offers["perGram"] = np.array(per_gram, dtype=float)
+    return offers
+
+
+def _top_offers(offers: dict, top: int) -> np.ndarray:
+    """Rows of the ``top`` offers, cheapest per gram first; offers that
+    cannot be compared per gram follow, cheapest first."""
+    order = np.lexsort((offers["priceUsd"], offers["perGram"]))
+    return order[:top]
+
 
 class ChemSpace:
+    # molbloom catalog used to check whether a molecule is purchasable
+    catalog = "zinc-instock"
+
+    url = "https://api.chem-space.com"
+    # tokens are renewed this many seconds before they expire
+    token_margin = 60
+
     def __init__(self, chemspace_api_key=None):
         self.chemspace_api_key = chemspace_api_key
-        self._renew_token()  # Create token
-
-    def _renew_token(self):
-        self.chemspace_token = requests.get(
-            url="https://api.chem-space.com/auth/token",
+        # fetched on the first request, then reused until it expires
+        self.chemspace_token = None
+        self._token_expiry = 0.0
+        self._token_lock = threading.Lock()
+        # asyncio locks belong to one event loop
+        self._async_token_locks = weakref.WeakKeyDictionary()
+
+    def _token_request(self):
+        return dict(
+            url=f"{self.url}/auth/token",
             headers={
                 "Accept": "application/json",
                 "Authorization": f"Bearer {self.chemspace_api_key}",
             },
-        ).json()["access_token"]
+        )
+
+    def _set_token(self, data):
+        self.chemspace_token = data["access_token"]
+        # tokens are valid for an hour unless the response says otherwise
+        lifetime = float(data.get("expires_in", 3600))
+        self._token_expiry = time.monotonic() + lifetime - self.token_margin
+
+    def _token_valid(self) -> bool:
+        return (
+            self.chemspace_token is not None and time.monotonic() < self._token_expiry
+        )
+
+    def _renew_token(self):
+        self._set_token(http_client.get(**self._token_request()).json())
+
+    async def _arenew_token(self):
+        r = await http_client.aget(**self._token_request())
+        self._set_token(r.json())
+
+    def _ensure_token(self):
+        if not self._token_valid():
+            with self._token_lock:
+                if not self._token_valid():
+                    self._renew_token()
+
+    async def _aensure_token(self, rejected=None):
+        """Async ``_ensure_token``; also renews the token if it is ``rejected``."""
+        loop = asyncio.get_running_loop()
+        with self._token_lock:
+            lock = self._async_token_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            # requests waiting here find the token another one fetched
+            stale = rejected is not None and self.chemspace_token == rejected
+            if stale or not self._token_valid():
+                await self._arenew_token()
+
+    @staticmethod
+    def _invalid_credentials(r) -> bool:
+        if r.status_code == 401:
+            return True
+        try:
+            message = r.json().get("message")
+        except (ValueError, AttributeError):
+            return False
+        return message == "Your request was made with invalid credentials."
 
     def _make_api_request(
         self,
@@ -32,6 +141,9 @@ class ChemSpace:
         """
         Make a generic request to chem-space API.
 
+        The token is fetched once and reused; it is renewed when it expires
+        or the API rejects it.
+
         Categories request.
             CSCS: Custom Request: Could be useful for requesting whole synthesis
             CSMB: Make-On-Demand Building Blocks
@@ -41,30 +153,60 @@ class ChemSpace:
         """
 
         def _do_request():
-            data = requests.request(
-                "POST",
-                url=f"https://api.chem-space.com/v3/search/{request_type}?count={count}&page=1&categories={categories}",
-                headers={
-                    "Accept": "application/json; version=3.1",
-                    "Authorization": f"Bearer {self.chemspace_token}",
-                },
-                data={"SMILES": f"{query}"},
-            ).json()
-            return data
-
-        data = _do_request()
+            return http_client.request(
+                "POST", **self._search_request(query, request_type, count, categories)
+            )
+
+        self._ensure_token()
+        r = _do_request()
 
         # renew token if token is invalid
-        if "message" in data.keys():
-            if data["message"] == "Your request was made with invalid credentials.":
+        if self._invalid_credentials(r):
+            with self._token_lock:
                 self._renew_token()
+            r = _do_request()
+        return r.json()
+
+    async def _amake_api_request(self, query, request_type, count, categories):
+        """Async ``_make_api_request``."""
+
+        async def _do_request():
+            return await http_client.arequest(
+                "POST", **self._search_request(query, request_type, count, categories)
+            )
+
+        await self._aensure_token()
+        token = self.chemspace_token
+        r = await _do_request()
 
-        data = _do_request()
-        return data
+        # renew token if token is invalid
+        if self._invalid_credentials(r):
+            await self._aensure_token(rejected=token)
+            r = await _do_request()
+        return r.json()
+
+    def _search_request(self, query, request_type, count, categories):
+        """Keyword arguments of a search request."""
+        return dict(
+            url=f"{self.url}/v3/search/{request_type}?count={count}&page=1&categories={categories}",
+            headers={
+                "Accept": "application/json; version=3.1",
+                "Authorization": f"Bearer {self.chemspace_token}",
+            },
+            data={"SMILES": f"{query}"},
+        )
 
     def _convert_single(self, query, search_type: str):
         """Do query for a single molecule"""
         data = self._make_api_request(query, "exact", 1, "CSCS,CSMB,CSSB")
+        return self._converted(data, search_type)
+
+    async def _aconvert_single(self, query, search_type: str):
+        data = await self._amake_api_request(query, "exact", 1, "CSCS,CSMB,CSSB")
+        return self._converted(data, search_type)
+
+    @staticmethod
+    def _converted(data, search_type: str):
         if data["count"] > 0:
             return data["items"][0][search_type]
         else:
@@ -83,11 +225,21 @@ class ChemSpace:
         except Exception:
             return "The input provided is wrong. Input either a single molecule, or multiple molecules separated by a ', '"
 
+    async def aconvert_mol_rep(self, query, search_type: str = "smiles"):
+        """Async ``convert_mol_rep``."""
+        q = query.split(", ")[0]
+        try:
+            converted = await self._aconvert_single(q, search_type)
+            return f"{query}'s {search_type} is: {str(converted)}"
+        except Exception:
+            return "The input provided is wrong. Input either a single molecule, or multiple molecules separated by a ', '"
+
     def buy_mol(
         self,
         smiles,
         request_type="exact",
         count=1,
+        top=1,
     ):
         """
         Get data about purchasing compounds.
@@ -95,37 +247,52 @@ class ChemSpace:
         smiles: smiles string of the molecule you want to buy
         request_type: one of "exact", "sim" (search by similarity), "sub" (search by substructure).
         count: retrieve data for this many substances max.
+        top: describe this many offers, cheapest per gram first.
         """
 
-        def purchasable_check(
-            s,
-        ):
-            if not is_smiles(s):
-                try:
-                    s = self.convert_mol_rep(s, "smiles")
-                except:
-                    return "Invalid SMILES string."
+        purchasable = self._purchasable_check(smiles)
+        categories = self._categories(request_type)
+        data = self._make_api_request(smiles, request_type, count, categories)
+        return self._cheapest_offer(data, purchasable, top)
+
+    async def abuy_mol(self, smiles, request_type="exact", count=1, top=1):
+        """Async ``buy_mol``."""
+        purchasable = await asyncio.to_thread(self._purchasable_check, smiles)
+        categories = self._categories(request_type)
+        data = await self._amake_api_request(smiles, request_type, count, categories)
+        return self._cheapest_offer(data, purchasable, top)
 
-            """Checks if molecule is available for purchase (ZINC20)"""
+    def _purchasable_check(
+        self,
+        s,
+    ):
+        if not is_smiles(s):
             try:
-                r = molbloom.buy(s, canonicalize=True)
+                s = self.convert_mol_rep(s, "smiles")
             except:
-                print("invalid smiles")
-                return False
-            if r:
-                return True
-            else:
-                return False
+                return "Invalid SMILES string."
 
-        purchasable = purchasable_check(smiles)
+        """Checks if molecule is available for purchase (ZINC20)"""
+        try:
+            r = molbloom.buy(s, canonicalize=True, catalog=self.catalog)
+        except:
+            print("invalid smiles")
+            return False
+        if r:
+            return True
+        else:
+            return False
 
+    @staticmethod
+    def _categories(request_type):
         if request_type == "exact":
             categories = "CSMB,CSSB"
         elif request_type in ["sim", "sub"]:
             categories = "CSSS,CSMS"
+        return categories
 
-        data = self._make_api_request(smiles, request_type, count, categories)
-
+    @staticmethod
+    def _cheapest_offer(data, purchasable, top=1):
         try:
             if data["count"] == 0:
                 if purchasable:
@@ -137,36 +304,34 @@ class ChemSpace:
 
         print(f"Obtaining data for {data['count']} substances.")
 
-        dfs = []
-        # Convert this data into df
-        for item in data["items"]:
-            dfs_tmp = []
-            smiles = item["smiles"]
-            offers = item["offers"]
-
-            for off in offers:
-                df_tmp = pd.DataFrame(off["prices"])
-                df_tmp["vendorName"] = off["vendorName"]
-                df_tmp["time"] = off["shipsWithin"]
-                df_tmp["purity"] = off["purity"]
+        offers = _offers(data)
+        if len(offers["priceUsd"]) == 0:
+            return "Compound is purchasable, but price is unknown."
 
-                dfs_tmp.append(df_tmp)
+        # name the molecule only when the search returned several
+        several = len(set(offers["smiles"])) > 1
+        lines = []
+        for i in _top_offers(offers, top):
+            molecule = offers["smiles"][i] if several else "this molecule"
+            price = f"{offers['priceUsd'][i]:.2f}".rstrip("0").rstrip(".")
+            lines.append(
+                f"{offers['quantity'][i]} of {molecule} cost {price} USD "
+                f"and can be purchased at {offers['vendorName'][i]}."
+            )
+        return "\n".join(lines)
 
-            df_this = pd.concat(dfs_tmp)
-            df_this["smiles"] = smiles
-            dfs.append(df_this)
 
-        df = pd.concat(dfs).reset_index(drop=True)
+_clients = {}
+_clients_lock = threading.Lock()
 
-        df["quantity"] = df["pack"].astype(str) + df["uom"]
-        df["time"] = df["time"].astype(str) + " days"
 
-        df = df.drop(columns=["pack", "uom"])
-        # Remove all entries that are not numbers
-        df = df[df["priceUsd"].astype(str).str.isnumeric()]
-
-        cheapest = df.iloc[df["priceUsd"].astype(float).idxmin()]
-        return f"{cheapest['quantity']} of this molecule cost {cheapest['priceUsd']} USD and can be purchased at {cheapest['vendorName']}."
+def get_chemspace(chemspace_api_key: str) -> ChemSpace:
+    """Process-wide ``ChemSpace`` client for an API key, sharing its token."""
+    if chemspace_api_key not in _clients:
+        with _clients_lock:
+            if chemspace_api_key not in _clients:
+                _clients[chemspace_api_key] = ChemSpace(chemspace_api_key)
+    return _clients[chemspace_api_key]
 
 
 class GetMoleculePrice(BaseTool):
@@ -184,7 +349,7 @@ class GetMoleculePrice(BaseTool):
         if not self.chemspace_api_key:
             return "No Chemspace API key found. This tool may not be used without a Chemspace API key."
         try:
-            chemspace = ChemSpace(self.chemspace_api_key)
+            chemspace = get_chemspace(self.chemspace_api_key)
             price = chemspace.buy_mol(query)
             return price
         except Exception as e:
@@ -192,4 +357,10 @@ class GetMoleculePrice(BaseTool):
 
     async def _arun(self, query: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        if not self.chemspace_api_key:
+            return "No Chemspace API key found. This tool may not be used without a Chemspace API key."
+        try:
+            chemspace = get_chemspace(self.chemspace_api_key)
+            return await chemspace.abuy_mol(query)
+        except Exception as e:
+            return str(e)
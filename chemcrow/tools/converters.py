@@ -1,9 +1,13 @@
+import asyncio
 import logging
 from langchain.tools import BaseTool
 
-from chemcrow.tools.chemspace import ChemSpace
+from chemcrow.tools.chemspace import get_chemspace
 from chemcrow.tools.safety import ControlChemCheck
 from chemcrow.utils import (
+    apubchem_query2smiles,
+    aquery2cas,
+    asmiles2name,
     is_multiple_smiles,
     is_smiles,
     pubchem_query2smiles,
@@ -12,6 +16,46 @@ from chemcrow.utils import (
 )
 
 
+_LOOKUP_FAILED = {
+    "PubChem": "PubChem query failed. Please check the chemical information or try again later.",
+    "ChemSpace": "Both PubChem and ChemSpace queries failed. Please check your input or try again later.",
+}
+
+
+def _validate_query(query):
+    """Error message for an unusable Query2SMILES input, None if it is fine."""
+    # 输入验证
+    if not query or not isinstance(query, str):
+        logging.error("Input validation error: Input must be a non-empty string.")
+        return "Invalid input detected. Please provide a valid, non-empty molecule name or SMILES string."
+
+    # 检查是否是多个 SMILES
+    if is_smiles(query) and is_multiple_smiles(query):
+        logging.info("Multiple SMILES strings detected in input.")
+        return "Multiple SMILES strings detected. Please provide only one molecule name at a time."
+    return None
+
+
+def _lookup_failed(source: str, error) -> str:
+    logging.error(f"{source} query failed: {error}")
+    # 提供用户友好的反馈
+    return _LOOKUP_FAILED[source]
+
+
+def _check_failed(smi: str, error) -> str:
+    # 记录异常信息到日志
+    logging.error(f"受控化学品检查失败，SMILES: {smi}，错误: {error}")
+    # 返回友好的提示信息
+    return "化学品合规性检查失败，请稍后重试"
+
+
+def _flag_controlled(label: str, value: str, msg: str) -> str:
+    """``value``, or a warning if ControlChemCheck's ``msg`` flags the molecule."""
+    if "high similarity" in msg or "appears" in msg:
+        return f"{label} {value} found, but " + msg
+    return value
+
+
 class Query2CAS(BaseTool):
     name = "Mol2CAS"
     description = "Input molecule (name or SMILES), returns CAS number."
@@ -47,15 +91,29 @@ class Query2CAS(BaseTool):
                     return str(e)
             # check if mol is controlled
             msg = self.ControlChemCheck._run(smiles)
-            if "high similarity" in msg or "appears" in msg:
-                return f"CAS number {cas}found, but " + msg
-            return cas
+            return _flag_controlled("CAS number", cas, msg)
         except ValueError:
             return "CAS number not found"
 
     async def _arun(self, query: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        try:
+            smiles = None
+            if is_smiles(query):
+                smiles = query
+            try:
+                cas = await aquery2cas(query, self.url_cid, self.url_data)
+            except ValueError as e:
+                return str(e)
+            if smiles is None:
+                try:
+                    smiles = await apubchem_query2smiles(cas, None)
+                except ValueError as e:
+                    return str(e)
+            msg = await self.ControlChemCheck._arun(smiles)
+            return _flag_controlled("CAS number", cas, msg)
+        except ValueError:
+            return "CAS number not found"
 
 
 class Query2SMILES(BaseTool):
@@ -73,54 +131,49 @@ class Query2SMILES(BaseTool):
     def _run(self, query: str) -> str:
         """This function queries the given molecule name and returns a SMILES string from the record"""
         """Useful to get the SMILES string of one molecule by searching the name of a molecule. Only query with one specific name."""
-        # 输入验证
-        if not query or not isinstance(query, str):
-            logging.error("Input validation error: Input must be a non-empty string.")
-            return "Invalid input detected. Please provide a valid, non-empty molecule name or SMILES string."
-
-        # 检查是否是多个 SMILES
-        if is_smiles(query) and is_multiple_smiles(query):
-            logging.info("Multiple SMILES strings detected in input.")
-            return "Multiple SMILES strings detected. Please provide only one molecule name at a time."
+        error = _validate_query(query)
+        if error is not None:
+            return error
         try:
             smi = pubchem_query2smiles(query, self.url)
         except Exception as pubchem_error:
-            # PubChem 查询失败
-            if self.chemspace_api_key:
-                try:
-                    # 如果有 ChemSpace API 密钥，尝试使用 ChemSpace 进行查询
-                    chemspace = ChemSpace(self.chemspace_api_key)
-                    smi = chemspace.convert_mol_rep(query, "smiles")
-                    # 从 ChemSpace 返回结果中提取 SMILES
-                    smi = smi.split(":")[1]
-                except Exception as chemspace_error:
-                    # 记录 ChemSpace 查询异常
-                    logging.error(f"ChemSpace query failed: {chemspace_error}")
-                    # 提供用户友好的反馈
-                    return "Both PubChem and ChemSpace queries failed. Please check your input or try again later."
-            else:
-                # 如果没有 ChemSpace API 密钥，只返回 PubChem 错误信息
-                logging.error(f"PubChem query failed: {pubchem_error}")
-                # 提供用户友好的反馈
-                return "PubChem query failed. Please check the chemical information or try again later."
+            # 如果有 ChemSpace API 密钥，尝试使用 ChemSpace 进行查询
+            if not self.chemspace_api_key:
+                return _lookup_failed("PubChem", pubchem_error)
+            try:
+                chemspace = get_chemspace(self.chemspace_api_key)
+                # 从 ChemSpace 返回结果中提取 SMILES
+                smi = chemspace.convert_mol_rep(query, "smiles").split(":")[1]
+            except Exception as chemspace_error:
+                return _lookup_failed("ChemSpace", chemspace_error)
         try:
             msg = "Note: " + self.ControlChemCheck._run(smi)
-            if "high similarity" in msg or "appears" in msg:
-                return f"CAS number {smi}found, but " + msg
-            return smi
         except Exception as check_error:
-            # 记录异常信息到日志
-            logging.error(f"受控化学品检查失败，SMILES: {smi}，错误: {check_error}")
-            
-            # 返回友好的提示信息
-            return "化学品合规性检查失败，请稍后重试"   
+            return _check_failed(smi, check_error)
+        return _flag_controlled("SMILES", smi, msg)
+
     async def _arun(self, query: str) -> str:
         """Use the tool asynchronously."""
-        logging.info(f"Async method _arun was called with query: {query}")
-        return (
-            "The asynchronous version (_arun) of this tool is not implemented yet. "
-            "Please use the synchronous version (_run) instead."
-        )
+        error = _validate_query(query)
+        if error is not None:
+            return error
+        try:
+            smi = await apubchem_query2smiles(query, self.url)
+        except Exception as pubchem_error:
+            if not self.chemspace_api_key:
+                return _lookup_failed("PubChem", pubchem_error)
+            try:
+                chemspace = get_chemspace(self.chemspace_api_key)
+                smi = (await chemspace.aconvert_mol_rep(query, "smiles")).split(":")[1]
+            except Exception as chemspace_error:
+                return _lookup_failed("ChemSpace", chemspace_error)
+        try:
+            msg = "Note: " + await self.ControlChemCheck._arun(smi)
+        except Exception as check_error:
+            return _check_failed(smi, check_error)
+        return _flag_controlled("SMILES", smi, msg)
+
+
 class SMILES2Name(BaseTool):
     name = "SMILES2Name"
     description = "Input SMILES, returns molecule name."
@@ -141,12 +194,20 @@ class SMILES2Name(BaseTool):
             name = smiles2name(query)
             # check if mol is controlled
             msg = "Note: " + self.ControlChemCheck._run(query)
-            if "high similarity" in msg or "appears" in msg:
-                return f"Molecule name {name} found, but " + msg
-            return name
+            return _flag_controlled("Molecule name", name, msg)
         except Exception as e:
             return "Error: " + str(e)
 
     async def _arun(self, query: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        try:
+            if not is_smiles(query):
+                try:
+                    query = await self.query2smiles.arun(query)
+                except:
+                    raise ValueError("Invalid molecule input, no Pubchem entry")
+            name = await asmiles2name(query)
+            msg = "Note: " + await self.ControlChemCheck._arun(query)
+            return _flag_controlled("Molecule name", name, msg)
+        except Exception as e:
+            return "Error: " + str(e)
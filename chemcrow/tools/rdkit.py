@@ -1,7 +1,12 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 from langchain.tools import BaseTool
 from rdkit import Chem
-from rdkit.Chem import rdMolDescriptors
+from rdkit.Chem.FilterCatalog import FilterCatalog, FilterCatalogEntry, SmartsMatcher
 
+from chemcrow import descriptors
 from chemcrow.utils import *
 
 
@@ -21,10 +26,12 @@ class MolSimilarity(BaseTool):
         else:
             smiles1, smiles2 = smi_list
 
-        similarity = tanimoto(smiles1, smiles2)
-
-        if isinstance(similarity, str):
-            return similarity
+        try:
+            similarity = float(descriptors.tanimoto_one_vs_many(smiles1, [smiles2])[0])
+        except ValueError:
+            similarity = np.nan
+        if np.isnan(similarity):
+            return "Error: Not a valid SMILES string"
 
         sim_score = {
             0.9: "very similar",
@@ -45,7 +52,7 @@ class MolSimilarity(BaseTool):
 
     async def _arun(self, smiles_pair: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        return await asyncio.to_thread(self._run, smiles_pair)
 
 
 class SMILES2Weight(BaseTool):
@@ -58,15 +65,94 @@ class SMILES2Weight(BaseTool):
         super().__init__()
 
     def _run(self, smiles: str) -> str:
-        mol = Chem.MolFromSmiles(smiles)
-        if mol is None:
+        mol_weight = descriptors.exact_mass([smiles])[0]
+        if np.isnan(mol_weight):
             return "Invalid SMILES string"
-        mol_weight = rdMolDescriptors.CalcExactMolWt(mol)
-        return mol_weight
+        return float(mol_weight)
 
     async def _arun(self, smiles: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        return await asyncio.to_thread(self._run, smiles)
+
+
+# List obtained from https://github.com/rdkit/rdkit/blob/master/Data/FunctionalGroups.txt
+FUNCTIONAL_GROUPS = {
+    "furan": "o1cccc1",
+    "aldehydes": " [CX3H1](=O)[#6]",
+    "esters": " [#6][CX3](=O)[OX2H0][#6]",
+    "ketones": " [#6][CX3](=O)[#6]",
+    "amides": " C(=O)-N",
+    "thiol groups": " [SH]",
+    "alcohol groups": " [OH]",
+    "methylamide": "*-[N;D2]-[C;D3](=O)-[C;D1;H3]",
+    "carboxylic acids": "*-C(=O)[O;D1]",
+    "carbonyl methylester": "*-C(=O)[O;D2]-[C;D1;H3]",
+    "terminal aldehyde": "*-C(=O)-[C;D1]",
+    "amide": "*-C(=O)-[N;D1]",
+    "carbonyl methyl": "*-C(=O)-[C;D1;H3]",
+    "isocyanate": "*-[N;D2]=[C;D2]=[O;D1]",
+    "isothiocyanate": "*-[N;D2]=[C;D2]=[S;D1]",
+    "nitro": "*-[N;D3](=[O;D1])[O;D1]",
+    "nitroso": "*-[N;R0]=[O;D1]",
+    "oximes": "*=[N;R0]-[O;D1]",
+    "Imines": "*-[N;R0]=[C;D1;H2]",
+    "terminal azo": "*-[N;D2]=[N;D2]-[C;D1;H3]",
+    "hydrazines": "*-[N;D2]=[N;D1]",
+    "diazo": "*-[N;D2]#[N;D1]",
+    "cyano": "*-[C;D2]#[N;D1]",
+    "primary sulfonamide": "*-[S;D4](=[O;D1])(=[O;D1])-[N;D1]",
+    "methyl sulfonamide": "*-[N;D2]-[S;D4](=[O;D1])(=[O;D1])-[C;D1;H3]",
+    "sulfonic acid": "*-[S;D4](=O)(=O)-[O;D1]",
+    "methyl ester sulfonyl": "*-[S;D4](=O)(=O)-[O;D2]-[C;D1;H3]",
+    "methyl sulfonyl": "*-[S;D4](=O)(=O)-[C;D1;H3]",
+    "sulfonyl chloride": "*-[S;D4](=O)(=O)-[Cl]",
+    "methyl sulfinyl": "*-[S;D3](=O)-[C;D1]",
+    "methyl thio": "*-[S;D2]-[C;D1;H3]",
+    "thiols": "*-[S;D1]",
+    "thio carbonyls": "*=[S;D1]",
+    "halogens": "*-[#9,#17,#35,#53]",
+    "t-butyl": "*-[C;D4]([C;D1])([C;D1])-[C;D1]",
+    "tri fluoromethyl": "*-[C;D4](F)(F)F",
+    "acetylenes": "*-[C;D2]#[C;D1;H]",
+    "cyclopropyl": "*-[C;D3]1-[C;D2]-[C;D2]1",
+    "ethoxy": "*-[O;D2]-[C;D2]-[C;D1;H3]",
+    "methoxy": "*-[O;D2]-[C;D1;H3]",
+    "side-chain hydroxyls": "*-[O;D1]",
+    "ketones": "*=[O;D1]",
+    "primary amines": "*-[N;D1]",
+    "nitriles": "*#[N;D1]",
+}
+
+
+def _build_fg_catalog(fgs: dict) -> FilterCatalog:
+    catalog = FilterCatalog()
+    for name, smarts in fgs.items():
+        catalog.AddEntry(FilterCatalogEntry(name, SmartsMatcher(name, smarts, 1)))
+    return catalog
+
+
+# compiled once, shared by all FuncGroups tools and batch workers
+FG_CATALOG = _build_fg_catalog(FUNCTIONAL_GROUPS)
+_FG_ORDER = {name: i for i, name in enumerate(FUNCTIONAL_GROUPS)}
+
+
+def functional_groups(smiles: str) -> list:
+    """Names of the functional groups in ``smiles``, in FUNCTIONAL_GROUPS order.
+
+    Raises ValueError for an invalid SMILES.
+    """
+    mol = Chem.MolFromSmiles(smiles.strip())
+    if mol is None:
+        raise ValueError(f"Invalid SMILES string: {smiles}")
+    names = {match.GetDescription() for match in FG_CATALOG.GetMatches(mol)}
+    return sorted(names, key=_FG_ORDER.get)
+
+
+def _functional_groups_or_none(smiles: str):
+    try:
+        return functional_groups(smiles)
+    except ValueError:
+        return None
 
 
 class FuncGroups(BaseTool):
@@ -78,59 +164,7 @@ class FuncGroups(BaseTool):
         self,
     ):
         super().__init__()
-
-        # List obtained from https://github.com/rdkit/rdkit/blob/master/Data/FunctionalGroups.txt
-        self.dict_fgs = {
-            "furan": "o1cccc1",
-            "aldehydes": " [CX3H1](=O)[#6]",
-            "esters": " [#6][CX3](=O)[OX2H0][#6]",
-            "ketones": " [#6][CX3](=O)[#6]",
-            "amides": " C(=O)-N",
-            "thiol groups": " [SH]",
-            "alcohol groups": " [OH]",
-            "methylamide": "*-[N;D2]-[C;D3](=O)-[C;D1;H3]",
-            "carboxylic acids": "*-C(=O)[O;D1]",
-            "carbonyl methylester": "*-C(=O)[O;D2]-[C;D1;H3]",
-            "terminal aldehyde": "*-C(=O)-[C;D1]",
-            "amide": "*-C(=O)-[N;D1]",
-            "carbonyl methyl": "*-C(=O)-[C;D1;H3]",
-            "isocyanate": "*-[N;D2]=[C;D2]=[O;D1]",
-            "isothiocyanate": "*-[N;D2]=[C;D2]=[S;D1]",
-            "nitro": "*-[N;D3](=[O;D1])[O;D1]",
-            "nitroso": "*-[N;R0]=[O;D1]",
-            "oximes": "*=[N;R0]-[O;D1]",
-            "Imines": "*-[N;R0]=[C;D1;H2]",
-            "terminal azo": "*-[N;D2]=[N;D2]-[C;D1;H3]",
-            "hydrazines": "*-[N;D2]=[N;D1]",
-            "diazo": "*-[N;D2]#[N;D1]",
-            "cyano": "*-[C;D2]#[N;D1]",
-            "primary sulfonamide": "*-[S;D4](=[O;D1])(=[O;D1])-[N;D1]",
-            "methyl sulfonamide": "*-[N;D2]-[S;D4](=[O;D1])(=[O;D1])-[C;D1;H3]",
-            "sulfonic acid": "*-[S;D4](=O)(=O)-[O;D1]",
-            "methyl ester sulfonyl": "*-[S;D4](=O)(=O)-[O;D2]-[C;D1;H3]",
-            "methyl sulfonyl": "*-[S;D4](=O)(=O)-[C;D1;H3]",
-            "sulfonyl chloride": "*-[S;D4](=O)(=O)-[Cl]",
-            "methyl sulfinyl": "*-[S;D3](=O)-[C;D1]",
-            "methyl thio": "*-[S;D2]-[C;D1;H3]",
-            "thiols": "*-[S;D1]",
-            "thio carbonyls": "*=[S;D1]",
-            "halogens": "*-[#9,#17,#35,#53]",
-            "t-butyl": "*-[C;D4]([C;D1])([C;D1])-[C;D1]",
-            "tri fluoromethyl": "*-[C;D4](F)(F)F",
-            "acetylenes": "*-[C;D2]#[C;D1;H]",
-            "cyclopropyl": "*-[C;D3]1-[C;D2]-[C;D2]1",
-            "ethoxy": "*-[O;D2]-[C;D2]-[C;D1;H3]",
-            "methoxy": "*-[O;D2]-[C;D1;H3]",
-            "side-chain hydroxyls": "*-[O;D1]",
-            "ketones": "*=[O;D1]",
-            "primary amines": "*-[N;D1]",
-            "nitriles": "*#[N;D1]",
-        }
-
-    def _is_fg_in_mol(self, mol, fg):
-        fgmol = Chem.MolFromSmarts(fg)
-        mol = Chem.MolFromSmiles(mol.strip())
-        return len(Chem.Mol.GetSubstructMatches(mol, fgmol, uniquify=True)) > 0
+        self.dict_fgs = FUNCTIONAL_GROUPS
 
     def _run(self, smiles: str) -> str:
         """
@@ -138,11 +172,7 @@ class FuncGroups(BaseTool):
         Returns a list of functional groups identified by their common name (in natural language).
         """
         try:
-            fgs_in_molec = [
-                name
-                for name, fg in self.dict_fgs.items()
-                if self._is_fg_in_mol(smiles, fg)
-            ]
+            fgs_in_molec = functional_groups(smiles)
             if len(fgs_in_molec) > 1:
                 return f"This molecule contains {', '.join(fgs_in_molec[:-1])}, and {fgs_in_molec[-1]}."
             else:
@@ -150,6 +180,18 @@ class FuncGroups(BaseTool):
         except:
             return "Wrong argument. Please input a valid molecular SMILES."
 
+    def run_batch(self, smiles_list, n_jobs: int = 1, chunksize: int = 256) -> list:
+        """Functional groups of many molecules, None for invalid SMILES.
+
+        With ``n_jobs > 1`` the molecules are split over a process pool.
+        """
+        if n_jobs <= 1:
+            return [_functional_groups_or_none(smi) for smi in smiles_list]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            return list(
+                pool.map(_functional_groups_or_none, smiles_list, chunksize=chunksize)
+            )
+
     async def _arun(self, smiles: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        return await asyncio.to_thread(self._run, smiles)
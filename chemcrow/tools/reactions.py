@@ -4,20 +4,64 @@ import abc
 import ast
 import re
 from time import sleep
-from typing import Optional
-
-import requests
+from typing import List, Optional
 
 import json
 from langchain.chat_models import ChatOpenAI
 from langchain.schema import HumanMessage
 from langchain.tools import BaseTool
 
+from chemcrow import http_client
+from chemcrow.reaction_cache import (
+    acached,
+    cached,
+    get_reaction_cache,
+    reaction_key,
+    summary_key,
+)
 from chemcrow.utils import is_smiles
 
 __all__ = ["RXNPredictLocal", "RXNRetrosynthesisLocal"]
 
 
+def _cached_results(inputs: List[str], key, invalid: str):
+    """Results already cached for ``inputs``, and the positions still to run.
+
+    Invalid SMILES get ``invalid`` and are not run; ``key`` maps a SMILES
+    to its cache key.
+    """
+    cache = get_reaction_cache()
+    results = [invalid] * len(inputs)
+    todo = []
+    for i, smiles in enumerate(inputs):
+        if not is_smiles(smiles):
+            continue
+        value = cache.get(key(smiles)) if cache is not None else None
+        if value is None:
+            todo.append(i)
+        else:
+            results[i] = value
+    return results, todo
+
+
+def _batches(inputs: List[str], todo: List[int], batch_size: int, **params):
+    """Positions and JSON payload of ``inputs[todo]``, batch_size at a time."""
+    for start in range(0, len(todo), batch_size):
+        idx = todo[start : start + batch_size]
+        yield idx, json.dumps({"smiles": [inputs[i] for i in idx], **params})
+
+
+def _store(inputs: List[str], idx: List[int], values: list, key, failed: str):
+    """Cache the successful ``values`` computed for ``inputs[idx]``."""
+    cache = get_reaction_cache()
+    if cache is None:
+        return
+    for i, value in zip(idx, values):
+        # empty route lists are retried rather than cached, like ``cached``
+        if value != failed and value != []:
+            cache.set(key(inputs[i]), value)
+
+
 class RXNPredictLocal(BaseTool):
     """Predict reaction."""
 
@@ -27,6 +71,13 @@ class RXNPredictLocal(BaseTool):
         "Takes as input the SMILES of the reactants separated by a dot '.', "
         "returns SMILES of the products."
     )
+    url: str = "http://localhost:8052"
+    # model served at url, part of the result cache key
+    model: str = "molecular-transformer-USPTO480k"
+    # (connect, read) seconds; the model service can be slow on CPU
+    timeout: tuple = (5, 300)
+    # inputs per request of predict_reactions
+    batch_size: int = 256
 
     def _run(self, reactants: str) -> str:
         """Run reaction prediction."""
@@ -36,18 +87,103 @@ class RXNPredictLocal(BaseTool):
         product = self.predict_reaction(reactants)
         return product
 
+    def _cache_key(self, reactants: str) -> str:
+        return reaction_key("predict", reactants, self.model)
+
     def predict_reaction(self, reactants: str) -> str:
-        """Make api request."""
+        """Make api request, unless the result is cached."""
+
+        def request():
+            response = http_client.post(
+                f"{self.url}/api/v1/translate",
+                headers={"Content-Type": "application/json"},
+                data=json.dumps({"smiles": reactants}),
+                timeout=self.timeout,
+            )
+            return response.json()['product'][0]
+
         try:
-            response = requests.post(
-                "http://localhost:8052/api/v1/translate",
+            return cached(self._cache_key(reactants), request)
+        except:
+            return "Error in prediction."
+
+    async def _arun(self, reactants: str) -> str:
+        """Run reaction prediction asynchronously."""
+        if not is_smiles(reactants):
+            return "Incorrect input."
+
+        return await self.apredict_reaction(reactants)
+
+    async def apredict_reaction(self, reactants: str) -> str:
+        """Make async api request, unless the result is cached."""
+
+        async def request():
+            response = await http_client.apost(
+                f"{self.url}/api/v1/translate",
                 headers={"Content-Type": "application/json"},
-                data=json.dumps({"smiles": reactants})
+                data=json.dumps({"smiles": reactants}),
+                timeout=self.timeout,
             )
             return response.json()['product'][0]
+
+        try:
+            return await acached(self._cache_key(reactants), request)
         except:
             return "Error in prediction."
 
+    @staticmethod
+    def _batch_products(response) -> list:
+        return [
+            r["product"][0] if r["status"] == "SUCCESS" else "Error in prediction."
+            for r in response.json()["results"]
+        ]
+
+    def predict_reactions(self, reactants_list: List[str]) -> List[str]:
+        """Predict products for many reactions, batch_size per request.
+
+        Returns one entry per input, with the same messages as ``_run`` for
+        invalid input and failed predictions. Cached inputs are not sent.
+        """
+        products, todo = _cached_results(
+            reactants_list, self._cache_key, "Incorrect input."
+        )
+        for idx, payload in _batches(reactants_list, todo, self.batch_size):
+            try:
+                response = http_client.post(
+                    f"{self.url}/api/v1/batch",
+                    headers={"Content-Type": "application/json"},
+                    data=payload,
+                    timeout=self.timeout,
+                )
+                batch = self._batch_products(response)
+            except:
+                batch = ["Error in prediction."] * len(idx)
+            _store(reactants_list, idx, batch, self._cache_key, "Error in prediction.")
+            for i, product in zip(idx, batch):
+                products[i] = product
+        return products
+
+    async def apredict_reactions(self, reactants_list: List[str]) -> List[str]:
+        """Predict products for many reactions asynchronously."""
+        products, todo = _cached_results(
+            reactants_list, self._cache_key, "Incorrect input."
+        )
+        for idx, payload in _batches(reactants_list, todo, self.batch_size):
+            try:
+                response = await http_client.apost(
+                    f"{self.url}/api/v1/batch",
+                    headers={"Content-Type": "application/json"},
+                    data=payload,
+                    timeout=self.timeout,
+                )
+                batch = self._batch_products(response)
+            except:
+                batch = ["Error in prediction."] * len(idx)
+            _store(reactants_list, idx, batch, self._cache_key, "Error in prediction.")
+            for i, product in zip(idx, batch):
+                products[i] = product
+        return products
+
 
 class RXNRetrosynthesisLocal(BaseTool):
     """Predict retrosynthesis."""
@@ -58,6 +194,16 @@ class RXNRetrosynthesisLocal(BaseTool):
         "Takes as input the SMILES of the product, returns recipe."
     )
     openai_api_key: str = ""
+    summary_model: str = "gpt-3.5-turbo-16k"
+    url: str = "http://localhost:8053"
+    # model served at url, and the search budget sent with each request
+    # (time_limit, iteration_limit); both are part of the result cache key
+    model: str = "aizynthfinder-uspto"
+    search_params: dict = {}
+    # (connect, read) seconds; tree search takes minutes
+    timeout: tuple = (5, 1800)
+    # targets per request of retrosyntheses, each one is a full tree search
+    batch_size: int = 8
 
     def _run(self, reactants: str) -> str:
         """Run reaction prediction."""
@@ -66,17 +212,113 @@ class RXNRetrosynthesisLocal(BaseTool):
             return "Incorrect input."
 
         paths = self.retrosynthesis(reactants)
+        if not paths:
+            return "No synthesis route found."
         procedure = self.get_action_sequence(paths[0])
         return procedure
 
-    def retrosynthesis(self, reactants: str) -> str:
-        """Make api request."""
-        response = requests.post(
-            "http://localhost:8053/api/v1/retrosynth",
-            headers={"Content-Type": "application/json"},
-            data=json.dumps({"smiles": reactants})
-        )
-        return response.json()
+    def _cache_key(self, target: str) -> str:
+        return reaction_key("retrosynthesis", target, self.model, **self.search_params)
+
+    @staticmethod
+    def _routes(response) -> list:
+        routes = response.json()
+        if not isinstance(routes, list):
+            raise ValueError(routes.get("error", routes))
+        return routes
+
+    def retrosynthesis(self, reactants: str) -> list:
+        """Make api request, unless the routes are cached."""
+
+        def request():
+            response = http_client.post(
+                f"{self.url}/api/v1/retrosynth",
+                headers={"Content-Type": "application/json"},
+                data=json.dumps({"smiles": reactants, **self.search_params}),
+                timeout=self.timeout,
+            )
+            return self._routes(response)
+
+        return cached(self._cache_key(reactants), request)
+
+    async def _arun(self, reactants: str) -> str:
+        """Run retrosynthesis asynchronously."""
+        if not is_smiles(reactants):
+            return "Incorrect input."
+
+        paths = await self.aretrosynthesis(reactants)
+        if not paths:
+            return "No synthesis route found."
+        procedure = await self.aget_action_sequence(paths[0])
+        return procedure
+
+    async def aretrosynthesis(self, reactants: str) -> list:
+        """Make async api request, unless the routes are cached."""
+
+        async def request():
+            response = await http_client.apost(
+                f"{self.url}/api/v1/retrosynth",
+                headers={"Content-Type": "application/json"},
+                data=json.dumps({"smiles": reactants, **self.search_params}),
+                timeout=self.timeout,
+            )
+            return self._routes(response)
+
+        return await acached(self._cache_key(reactants), request)
+
+    def retrosyntheses(self, targets: List[str]) -> List:
+        """Routes for many targets, batch_size per request.
+
+        Returns, per target, the list of routes ``retrosynthesis`` gives, or
+        "Incorrect input." / "Error in retrosynthesis." like ``predict_reactions``.
+        Cached targets are not sent.
+        """
+        routes, todo = _cached_results(targets, self._cache_key, "Incorrect input.")
+        for idx, payload in _batches(
+            targets, todo, self.batch_size, **self.search_params
+        ):
+            try:
+                response = http_client.post(
+                    f"{self.url}/api/v1/batch",
+                    headers={"Content-Type": "application/json"},
+                    data=payload,
+                    timeout=self.timeout,
+                )
+                batch = self._batch_routes(response)
+            except:
+                batch = ["Error in retrosynthesis."] * len(idx)
+            _store(targets, idx, batch, self._cache_key, "Error in retrosynthesis.")
+            for i, r in zip(idx, batch):
+                routes[i] = r
+        return routes
+
+    async def aretrosyntheses(self, targets: List[str]) -> List:
+        """Routes for many targets asynchronously."""
+        routes, todo = _cached_results(targets, self._cache_key, "Incorrect input.")
+        for idx, payload in _batches(
+            targets, todo, self.batch_size, **self.search_params
+        ):
+            try:
+                response = await http_client.apost(
+                    f"{self.url}/api/v1/batch",
+                    headers={"Content-Type": "application/json"},
+                    data=payload,
+                    timeout=self.timeout,
+                )
+                batch = self._batch_routes(response)
+            except:
+                batch = ["Error in retrosynthesis."] * len(idx)
+            _store(targets, idx, batch, self._cache_key, "Error in retrosynthesis.")
+            for i, r in zip(idx, batch):
+                routes[i] = r
+        return routes
+
+    @staticmethod
+    def _batch_routes(response) -> list:
+        return [
+            r["routes"] if "routes" in r else "Error in retrosynthesis."
+            for r in response.json()["results"]
+        ]
 
     def get_action_sequence(self, path):
         """Get sequence of actions."""
@@ -85,6 +327,11 @@ class RXNRetrosynthesisLocal(BaseTool):
         llm_sum = self._summary_gpt(json_actions)
         return llm_sum
 
+    async def aget_action_sequence(self, path):
+        """Get sequence of actions asynchronously."""
+        json_actions = self._preproc_actions(path)
+        return await self._asummary_gpt(json_actions)
+
     def _preproc_actions(self, path):
         """Preprocess actions."""
         def _clean_actions(d):
@@ -100,15 +347,38 @@ class RXNRetrosynthesisLocal(BaseTool):
         return rxns
 
     def _summary_gpt(self, json: dict) -> str:
-        """Describe synthesis."""
-        llm = ChatOpenAI(  # type: ignore
+        """Describe synthesis, cached per path."""
+
+        def describe():
+            llm = self._summary_llm()
+            prompt = self._summary_prompt(json)
+            return llm([HumanMessage(content=prompt)]).content
+
+        return cached(summary_key(json, self.summary_model), describe)
+
+    async def _asummary_gpt(self, json: dict) -> str:
+        """Describe synthesis asynchronously, cached per path."""
+
+        async def describe():
+            llm = self._summary_llm()
+            prompt = self._summary_prompt(json)
+            messages = [HumanMessage(content=prompt)]
+            return (await llm.apredict_messages(messages)).content
+
+        return await acached(summary_key(json, self.summary_model), describe)
+
+    def _summary_llm(self):
+        return ChatOpenAI(  # type: ignore
             temperature=0.05,
-            model_name="gpt-3.5-turbo-16k",
+            model_name=self.summary_model,
             request_timeout=2000,
             max_tokens=2000,
             openai_api_key=self.openai_api_key,
         )
-        prompt = (
+
+    @staticmethod
+    def _summary_prompt(json: dict) -> str:
+        return (
             "Here is a chemical synthesis described as a json.\nYour task is "
             "to describe the synthesis, as if you were giving instructions for"
             "a recipe. Use only the substances, quantities, temperatures and "
@@ -119,4 +389,3 @@ class RXNRetrosynthesisLocal(BaseTool):
             "However avoid references to it. \nFor this task, give as many "
             f"details as possible.\n {str(json)}"
         )
-        return llm([HumanMessage(content=prompt)]).content
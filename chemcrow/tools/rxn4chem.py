@@ -2,8 +2,11 @@
 
 import abc
 import ast
+import random
 import re
-from time import sleep
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
 from typing import Optional
 
 from langchain.chat_models import ChatOpenAI
@@ -11,11 +14,46 @@ from langchain.schema import HumanMessage
 from langchain.tools import BaseTool
 from rxn4chemistry import RXN4ChemistryWrapper  # type: ignore
 
+from chemcrow.reaction_cache import cached, reaction_key, summary_key
 from chemcrow.utils import is_smiles
 
 __all__ = ["RXNPredict", "RXNRetrosynthesis"]
 
 
+class RetryLater(Exception):
+    """Raised by a call wrapped with ``RXN4Chem.retry`` to be retried, after
+    at least ``delay`` seconds if given."""
+
+    def __init__(self, delay: Optional[float] = None):
+        super().__init__(delay)
+        self.delay = delay
+
+
+def _rate_limited(response) -> bool:
+    """Whether an RXN4Chem wrapper result is a 429 Too Many Requests."""
+    body = response.get("response") if isinstance(response, dict) else None
+    if not isinstance(body, dict):
+        return False
+    return body.get("status") == 429 or body.get("error") == "Too Many Requests"
+
+
+class _RateLimiter:
+    """Space calls at least ``1 / per_second`` seconds apart, across threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1 / per_second
+        self._next = monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            sleep(delay)
+
+
 class RXN4Chem(BaseTool):
     """Wrapper for RXN4Chem functionalities."""
 
@@ -24,7 +62,9 @@ class RXN4Chem(BaseTool):
     rxn4chem_api_key: Optional[str] = None
     rxn4chem: RXN4ChemistryWrapper = None
     base_url: str = "https://rxn.res.ibm.com"
-    sleep_time: int = 5
+    # node settings fetched at once, and the most requests started per second
+    max_concurrency: int = 4
+    requests_per_second: float = 2.0
 
     def __init__(self, rxn4chem_api_key):
         """Init object."""
@@ -47,32 +87,40 @@ class RXN4Chem(BaseTool):
         pass
 
     @staticmethod
-    def retry(times: int, exceptions, sleep_time: int = 5):
+    def retry(times: int, exceptions, sleep_time: float = 1, max_sleep: float = 30):
         """
         Retry Decorator.
 
-        Retries the wrapped function/method `times` times if the exceptions
-        listed in ``exceptions`` are thrown
+        Runs the wrapped function/method at once and retries it up to `times`
+        times if the exceptions listed in ``exceptions`` (or ``RetryLater``)
+        are thrown, waiting `sleep_time`, then twice as long each time up to
+        `max_sleep` seconds, with jitter. ``RetryLater(delay)`` waits at
+        least `delay`.
         :param times: The number of times to repeat the wrapped function/method
         :type times: Int
         :param Exceptions: Lists of exceptions that trigger a retry attempt
         :type Exceptions: Tuple of Exceptions
         """
+        if not isinstance(exceptions, tuple):
+            exceptions = (exceptions,)
 
         def decorator(func):
             def newfn(*args, **kwargs):
-                attempt = 0
-                while attempt < times:
+                for attempt in range(times + 1):
                     try:
-                        sleep(sleep_time)
                         return func(*args, **kwargs)
-                    except exceptions:
+                    except (RetryLater, *exceptions) as e:
+                        if attempt == times:
+                            raise
+                        delay = min(max_sleep, sleep_time * 2**attempt)
+                        delay *= random.uniform(0.5, 1)
+                        if isinstance(e, RetryLater) and e.delay is not None:
+                            delay = max(delay, e.delay)
                         print(
                             "Exception thrown when attempting to run %s, "
                             "attempt %d of %d" % (func, attempt, times)
                         )
-                        attempt += 1
-                return func(*args, **kwargs)
+                        sleep(delay)
 
             return newfn
 
@@ -88,22 +136,26 @@ class RXNPredict(RXN4Chem):
         "Takes as input the SMILES of the reactants separated by a dot '.', "
         "returns SMILES of the products."
     )
+    ai_model: str = "2020-08-10"
 
     def _run(self, reactants: str) -> str:
-        """Run reaction prediction."""
+        """Run reaction prediction, unless the product is cached."""
         # Check that input is smiles
         if not is_smiles(reactants):
             return "Incorrect input."
 
-        prediction_id = self.predict_reaction(reactants)
-        results = self.get_results(prediction_id)
-        product = results["productMolecule"]["smiles"]
-        return product
+        def predict():
+            prediction_id = self.predict_reaction(reactants)
+            results = self.get_results(prediction_id)
+            return results["productMolecule"]["smiles"]
+
+        key = reaction_key("predict", reactants, f"rxn4chem/{self.ai_model}")
+        return cached(key, predict)
 
     # @RXN4Chem.retry(10, KeyError)
     def predict_reaction(self, reactants: str) -> str:
         """Make api request."""
-        response = self.rxn4chem.predict_reaction(reactants)
+        response = self.rxn4chem.predict_reaction(reactants, ai_model=self.ai_model)
         if "prediction_id" in response.keys():
             return response["prediction_id"]
         else:
@@ -132,6 +184,15 @@ class RXNRetrosynthesis(RXN4Chem):
         "Takes as input the SMILES of the product, returns recipe."
     )
     openai_api_key: str = ""
+    summary_model: str = "gpt-3.5-turbo-16k"
+    # settings of predict_automatic_retrosynthesis, part of the cache key
+    retro_params: dict = {
+        "fap": 0.6,
+        "max_steps": 3,
+        "nbeams": 10,
+        "pruning_steps": 2,
+        "ai_model": "12class-tokens-2021-05-14",
+    }
 
     def __init__(self, rxn4chem_api_key, openai_api_key):
         """Init object."""
@@ -144,8 +205,14 @@ class RXNRetrosynthesis(RXN4Chem):
         if not is_smiles(target):
             return "Incorrect input."
 
-        prediction_id = self.predict_retrosynthesis(target)
-        paths = self.get_paths(prediction_id)
+        def predict():
+            prediction_id = self.predict_retrosynthesis(target)
+            return self.get_paths(prediction_id)
+
+        key = reaction_key("retrosynthesis", target, "rxn4chem", **self.retro_params)
+        paths = cached(key, predict)
+        if not paths:
+            return "No synthesis route found."
         # path_img = self.visualize_path(paths[0])
         procedure = self.get_action_sequence(paths[0])
         return procedure
@@ -158,18 +225,13 @@ class RXNRetrosynthesis(RXN4Chem):
     def predict_retrosynthesis(self, target: str) -> str:
         """Make api request."""
         response = self.rxn4chem.predict_automatic_retrosynthesis(
-            product=target,
-            fap=0.6,
-            max_steps=3,
-            nbeams=10,
-            pruning_steps=2,
-            ai_model="12class-tokens-2021-05-14",
+            product=target, **self.retro_params
         )
         if "prediction_id" in response.keys():
             return response["prediction_id"]
         raise KeyError
 
-    @RXN4Chem.retry(20, KeyError)
+    @RXN4Chem.retry(20, KeyError, sleep_time=2)
     def get_paths(self, prediction_id: str) -> str:
         """Make api request."""
         results = self.rxn4chem.get_predict_automatic_retrosynthesis_results(
@@ -182,8 +244,7 @@ class RXNRetrosynthesis(RXN4Chem):
             if len(paths) > 0:
                 return paths
         if results["status"] == "PROCESSING":
-            sleep(self.sleep_time * 2)
-            raise KeyError
+            raise RetryLater()
         raise KeyError
 
     def get_action_sequence(self, path):
@@ -197,16 +258,17 @@ class RXNRetrosynthesis(RXN4Chem):
         if nodeids is None:
             return "Tool error"
 
-        # Attempt to get actions for each node + product information
-        real_nodes = []
-        actions_and_products = []
-        for node in nodeids:
-            node_resp = self.get_reaction_settings(
-                synthesis_id=synthesis_id, node_id=node
-            )
-            if "actions" in node_resp.keys():
-                real_nodes.append(node)
-                actions_and_products.append(node_resp)
+        # Attempt to get actions for each node + product information,
+        # several nodes at a time
+        limiter = _RateLimiter(self.requests_per_second)
+
+        def settings(node):
+            limiter.wait()
+            return self.get_reaction_settings(synthesis_id=synthesis_id, node_id=node)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            node_resps = list(pool.map(settings, nodeids))
+        actions_and_products = [r for r in node_resps if "actions" in r.keys()]
 
         json_actions = self._preproc_actions(actions_and_products)
         llm_sum = self._summary_gpt(json_actions)
@@ -227,7 +289,7 @@ class RXNRetrosynthesis(RXN4Chem):
         if isinstance(response, list):
             if len(response) > 0:
                 return response
-        return KeyError
+        raise KeyError
 
     @RXN4Chem.retry(20, KeyError)
     def get_reaction_settings(self, synthesis_id: str, node_id: str):
@@ -237,11 +299,10 @@ class RXNRetrosynthesis(RXN4Chem):
         )
         if "actions" in response.keys():
             return response
-        elif "response" in response.keys():
-            if "error" in response["response"].keys():
-                if response["response"]["error"] == "Too Many Requests":
-                    sleep(self.sleep_time * 2)
-                    raise KeyError
+        if _rate_limited(response):
+            # the wrapper drops the Retry-After header, back off instead
+            raise RetryLater()
+        if "response" in response.keys():
             return response
         raise KeyError
 
@@ -263,10 +324,15 @@ class RXNRetrosynthesis(RXN4Chem):
         return json_actions
 
     def _summary_gpt(self, json: dict) -> str:
-        """Describe synthesis."""
+        """Describe synthesis, cached per path."""
+        return cached(
+            summary_key(json, self.summary_model), lambda: self._describe(json)
+        )
+
+    def _describe(self, json: dict) -> str:
         llm = ChatOpenAI(  # type: ignore
             temperature=0.05,
-            model_name="gpt-3.5-turbo-16k",
+            model_name=self.summary_model,
             request_timeout=2000,
             max_tokens=2000,
             openai_api_key=self.openai_api_key,
@@ -1,6 +1,9 @@
+import asyncio
+import logging
 import re
-import urllib
-from time import sleep
+import threading
+from time import perf_counter
+from types import MappingProxyType
 
 import langchain
 import molbloom
@@ -11,43 +14,82 @@ import tiktoken
 from langchain import LLMChain, PromptTemplate
 from langchain.llms import BaseLLM
 from langchain.tools import BaseTool
-
-from chemcrow.utils import is_smiles, pubchem_query2smiles, tanimoto
+from rdkit import Chem, DataStructs
+
+from chemcrow.data_assets import load_clintox
+from chemcrow.fingerprints import get_fingerprint_service
+from chemcrow.pubchem import get_client
+from chemcrow.utils import (
+    apubchem_query2smiles,
+    canonical_smiles,
+    is_cas,
+    is_smiles,
+    mol_from_smiles,
+    morgan_fingerprint,
+    pubchem_query2smiles,
+)
 
 from .prompts import safety_summary_prompt, summary_each_data
 
 
 class MoleculeSafety:
     def __init__(self, llm: BaseLLM = None):
-        while True:
-            try:
-                self.clintox = pd.read_csv(
-                    "https://deepchemdata.s3-us-west-1.amazonaws.com/datasets/clintox.csv.gz"
-                )
-                break
-            except (ConnectionRefusedError, urllib.error.URLError):
-                sleep(5)
-                continue
-        self.pubchem_data = {}
         self.llm = llm
 
-    def _fetch_pubchem_data(self, cas_number):
-        """Fetch data from PubChem for a given CAS number, or use cached data if it's already been fetched."""
-        if cas_number not in self.pubchem_data:
-            try:
-                url1 = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{cas_number}/cids/JSON"
-                url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/data/compound/{requests.get(url1).json()['IdentifierList']['CID'][0]}/JSON"
-                r = requests.get(url)
-                self.pubchem_data[cas_number] = r.json()
-            except:
-                return "Invalid molecule input, no Pubchem entry."
-        return self.pubchem_data[cas_number]
+    @property
+    def clintox(self) -> pd.DataFrame:
+        """ClinTox dataset, downloaded on first use and shared by all instances."""
+        return load_clintox()
+
+    # PubChem sections read by ghs_classification and _get_safety_data
+    ghs_headings = ("Chemical Safety",)
+    safety_headings = ("Safety and Hazards", "Toxicity")
+
+    def _fetch_pubchem_data(self, cas_number, headings=None):
+        """Fetch data from PubChem for a given CAS number, or use cached data if it's already been fetched.
+
+        With ``headings`` only those top-level sections are downloaded.
+        """
+        try:
+            client = get_client()
+            cid = client.cid(cas_number)
+            if cid is None:
+                raise KeyError(cas_number)
+            if headings is None:
+                return client.pug_view(cid)
+            return client.pug_view_sections(cid, headings)
+        except:
+            return "Invalid molecule input, no Pubchem entry."
+
+    async def _afetch_pubchem_data(self, cas_number, headings=None):
+        """Async ``_fetch_pubchem_data``."""
+        try:
+            client = get_client()
+            cid = await client.acid(cas_number)
+            if cid is None:
+                raise KeyError(cas_number)
+            if headings is None:
+                return await client.apug_view(cid)
+            return await client.apug_view_sections(cid, headings)
+        except:
+            return "Invalid molecule input, no Pubchem entry."
 
     def ghs_classification(self, text):
         """Gives the ghs classification from Pubchem. Give this tool the name or CAS number of one molecule."""
         if is_smiles(text):
             return "Please input a valid CAS number."
-        data = self._fetch_pubchem_data(text)
+        data = self._fetch_pubchem_data(text, self.ghs_headings)
+        return self._ghs_from_record(data)
+
+    async def aghs_classification(self, text):
+        """Async ``ghs_classification``."""
+        if is_smiles(text):
+            return "Please input a valid CAS number."
+        data = await self._afetch_pubchem_data(text, self.ghs_headings)
+        return self._ghs_from_record(data)
+
+    @staticmethod
+    def _ghs_from_record(data):
         if isinstance(data, str):
             return "Molecule not found in Pubchem."
         try:
@@ -80,8 +122,9 @@ class MoleculeSafety:
         except:
             return None
 
-    def _get_safety_data(self, cas):
-        data = self._fetch_pubchem_data(cas)
+    def _get_safety_data(self, cas, data=None):
+        if data is None:
+            data = self._fetch_pubchem_data(cas, self.safety_headings)
         safety_data = []
 
         iterations = [
@@ -130,8 +173,8 @@ class MoleculeSafety:
         num_tokens = len(encoding.encode(string))
         return num_tokens
 
-    def get_safety_summary(self, cas):
-        safety_data = self._get_safety_data(cas)
+    def _summary_chain_inputs(self, safety_data):
+        """LLM chain summarizing each safety entry, and its inputs."""
         approx_length = int(
             (3500 * 4) / len(safety_data) - 0.1 * ((3500 * 4) / len(safety_data))
         )
@@ -140,22 +183,26 @@ class MoleculeSafety:
         )
         llm_chain_short = LLMChain(prompt=prompt_short, llm=self.llm)
 
-        llm_output = []
+        inputs = []
         for info in safety_data:
             if self._num_tokens(str(info)) > approx_length:
                 trunc_info = str(info)[:approx_length]
-                llm_output.append(
-                    llm_chain_short.run(
-                        {"data": str(trunc_info), "approx_length": approx_length}
-                    )
-                )
+                inputs.append({"data": str(trunc_info), "approx_length": approx_length})
             else:
-                llm_output.append(
-                    llm_chain_short.run(
-                        {"data": str(info), "approx_length": approx_length}
-                    )
-                )
-        return llm_output
+                inputs.append({"data": str(info), "approx_length": approx_length})
+        return llm_chain_short, inputs
+
+    def get_safety_summary(self, cas):
+        safety_data = self._get_safety_data(cas)
+        llm_chain_short, inputs = self._summary_chain_inputs(safety_data)
+        return [llm_chain_short.run(i) for i in inputs]
+
+    async def aget_safety_summary(self, cas):
+        """Async ``get_safety_summary``; the entries are summarized concurrently."""
+        data = await self._afetch_pubchem_data(cas, self.safety_headings)
+        safety_data = self._get_safety_data(cas, data)
+        llm_chain_short, inputs = self._summary_chain_inputs(safety_data)
+        return await asyncio.gather(*(llm_chain_short.arun(i) for i in inputs))
 
 
 class SafetySummary(BaseTool):
@@ -182,15 +229,24 @@ class SafetySummary(BaseTool):
     def _run(self, cas: str) -> str:
         if is_smiles(cas):
             return "Please input a valid CAS number."
-        data = self.mol_safety._fetch_pubchem_data(cas)
+        data = self.mol_safety._fetch_pubchem_data(cas, self.mol_safety.safety_headings)
         if isinstance(data, str):
             return "Molecule not found in Pubchem."
 
         data = self.mol_safety.get_safety_summary(cas)
         return self.llm_chain.run(" ".join(data))
 
-    async def _arun(self, cas_number):
-        raise NotImplementedError("Async not implemented.")
+    async def _arun(self, cas: str) -> str:
+        if is_smiles(cas):
+            return "Please input a valid CAS number."
+        data = await self.mol_safety._afetch_pubchem_data(
+            cas, self.mol_safety.safety_headings
+        )
+        if isinstance(data, str):
+            return "Molecule not found in Pubchem."
+
+        data = await self.mol_safety.aget_safety_summary(cas)
+        return await self.llm_chain.arun(" ".join(data))
 
 
 class ExplosiveCheck(BaseTool):
@@ -208,6 +264,19 @@ class ExplosiveCheck(BaseTool):
         if is_smiles(cas_number):
             return "Please input a valid CAS number."
         cls = self.mol_safety.ghs_classification(cas_number)
+        return self._explosive_message(cls)
+
+    async def _arun(self, cas_number):
+        if is_smiles(cas_number):
+            return "Please input a valid CAS number."
+        cls = await self.mol_safety.aghs_classification(cas_number)
+        return self._explosive_message(cls)
+
+    @staticmethod
+    def _explosive_message(cls):
+        if isinstance(cls, str):
+            # the lookup failed, which says nothing about the molecule
+            return cls
         if cls is None:
             return (
                 "Explosive Check Error. The molecule may not be assigned a GHS rating. "
@@ -217,8 +286,79 @@ class ExplosiveCheck(BaseTool):
         else:
             return "Molecule is not known to be explosive"
 
-    async def _arun(self, cas_number):
-        raise NotImplementedError("Async not implemented.")
+
+class ControlChemFingerprints:
+    """Morgan fingerprints of the controlled chemicals list.
+
+    Built lazily once per process (see ``get``) and queried with a single
+    ``BulkTanimotoSimilarity`` call instead of re-reading the csv and
+    re-fingerprinting every entry on each tool call.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = None):
+        if data_path is None:
+            data_path = pkg_resources.resource_filename(
+                "chemcrow", "data/chem_wep_smi.csv"
+            )
+        start = perf_counter()
+        cw_df = pd.read_csv(data_path)
+        self.smiles = []
+        self.fps = []
+        service = get_fingerprint_service("morgan")
+        for smi in cw_df["smiles"].astype(str):
+            fp = service.fingerprint(smi)
+            if fp is not None:
+                self.smiles.append(smi)
+                self.fps.append(fp)
+        self.build_time = perf_counter() - start
+        self.n_queries = 0
+        self.total_query_time = 0.0
+        self.last_query_time = None
+        logging.info(
+            f"Built controlled chemicals fingerprint index ({len(self.fps)} "
+            f"entries) in {self.build_time * 1000:.1f} ms"
+        )
+
+    @classmethod
+    def get(cls) -> "ControlChemFingerprints":
+        """Return the process-wide index, building it on first use."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def max_similarity(self, smiles: str) -> float:
+        """Max Tanimoto similarity of ``smiles`` to any controlled chemical.
+
+        Invalid SMILES score 0.0, as they did with the per-row comparison.
+        """
+        start = perf_counter()
+        fp = morgan_fingerprint(smiles)
+        if fp is None or not self.fps:
+            max_sim = 0.0
+        else:
+            max_sim = max(DataStructs.BulkTanimotoSimilarity(fp, self.fps))
+        elapsed = perf_counter() - start
+        self.n_queries += 1
+        self.total_query_time += elapsed
+        self.last_query_time = elapsed
+        return max_sim
+
+    def stats(self) -> dict:
+        """Build time and query latency, in seconds."""
+        return {
+            "entries": len(self.fps),
+            "build_time": self.build_time,
+            "n_queries": self.n_queries,
+            "last_query_time": self.last_query_time,
+            "mean_query_time": (
+                self.total_query_time / self.n_queries if self.n_queries else None
+            ),
+        }
 
 
 class SimilarControlChemCheck(BaseTool):
@@ -229,14 +369,11 @@ class SimilarControlChemCheck(BaseTool):
         """Checks max similarity between compound and controlled chemicals.
         Input SMILES string."""
 
-        data_path = pkg_resources.resource_filename("chemcrow", "data/chem_wep_smi.csv")
-        cw_df = pd.read_csv(data_path)
-
         try:
             if not is_smiles(smiles):
                 return "Please input a valid SMILES string."
 
-            max_sim = cw_df["smiles"].apply(lambda x: self.tanimoto(smiles, x)).max()
+            max_sim = ControlChemFingerprints.get().max_similarity(smiles)
             if max_sim > 0.35:
                 return (
                     f"{smiles} has a high similarity "
@@ -251,15 +388,90 @@ class SimilarControlChemCheck(BaseTool):
         except:
             return "Tool error."
 
-    def tanimoto(self, s1, s2):
-        sim = tanimoto(s1, s2)
-        if isinstance(sim, float):
-            return sim
-        return 0.0
-
-    async def _arun(self, query: str) -> str:
+    async def _arun(self, smiles: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        return await asyncio.to_thread(self._run, smiles)
+
+
+def normalize_cas(cas: str) -> str:
+    """Normalize a CAS number, e.g. '(010025-87-3)' -> '10025-87-3'."""
+    cas = re.sub(r"[()\s]", "", str(cas))
+    if is_cas(cas):
+        cas = cas.lstrip("0")
+    return cas
+
+
+class ControlChemLookup:
+    """Exact-match lookup over the controlled chemicals list.
+
+    Maps canonical SMILES, InChIKey and normalized CAS number to the list
+    entry, so membership is a dict lookup instead of a regex scan of the
+    whole csv. Built lazily once per process (see ``get``) and read-only
+    afterwards.
+    """
+
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, data_path: str = None):
+        if data_path is None:
+            data_path = pkg_resources.resource_filename(
+                "chemcrow", "data/chem_wep_smi.csv"
+            )
+        cw_df = pd.read_csv(data_path, dtype=str).fillna("")
+        by_smiles, by_inchikey, by_cas = {}, {}, {}
+        for row in cw_df.to_dict("records"):
+            entry = MappingProxyType(row)
+            if row["cas"]:
+                by_cas.setdefault(normalize_cas(row["cas"]), entry)
+            mol = Chem.MolFromSmiles(row["smiles"])
+            if mol is None:
+                continue
+            by_smiles.setdefault(Chem.MolToSmiles(mol), entry)
+            inchikey = Chem.MolToInchiKey(mol)
+            if inchikey:
+                by_inchikey.setdefault(inchikey, entry)
+        self.by_smiles = MappingProxyType(by_smiles)
+        self.by_inchikey = MappingProxyType(by_inchikey)
+        self.by_cas = MappingProxyType(by_cas)
+
+    @classmethod
+    def get(cls) -> "ControlChemLookup":
+        """Return the process-wide lookup, building it on first use."""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def find_smiles(self, smiles: str):
+        """Entry matching ``smiles`` (canonical SMILES or InChIKey), or None."""
+        mol = mol_from_smiles(smiles)
+        if mol is None:
+            return None
+        entry = self.by_smiles.get(canonical_smiles(smiles))
+        if entry is None:
+            inchikey = Chem.MolToInchiKey(mol)
+            if inchikey:
+                entry = self.by_inchikey.get(inchikey)
+        return entry
+
+    def find_cas(self, cas: str):
+        """Entry matching the CAS number ``cas``, or None."""
+        return self.by_cas.get(normalize_cas(cas))
+
+    def find_inchikey(self, inchikey: str):
+        """Entry matching ``inchikey``, or None."""
+        return self.by_inchikey.get(inchikey.strip().upper())
+
+    def find(self, query: str):
+        """Entry matching a SMILES, CAS number or InChIKey, or None."""
+        query = query.strip()
+        if re.fullmatch(r"[A-Za-z]{14}-[A-Za-z]{10}-[A-Za-z]", query):
+            return self.find_inchikey(query)
+        if is_smiles(query):
+            return self.find_smiles(query)
+        return self.find_cas(query)
 
 
 class ControlChemCheck(BaseTool):
@@ -269,35 +481,18 @@ class ControlChemCheck(BaseTool):
 
     def _run(self, query: str) -> str:
         """Checks if compound is a controlled chemical. Input CAS number."""
-        data_path = pkg_resources.resource_filename("chemcrow", "data/chem_wep_smi.csv")
-        cw_df = pd.read_csv(data_path)
         try:
-            if is_smiles(query):
-                query_esc = re.escape(query)
-                found = (
-                    cw_df["smiles"]
-                    .astype(str)
-                    .str.contains(f"^{query_esc}$", regex=True)
-                    .any()
-                )
-            else:
-                found = (
-                    cw_df["cas"]
-                    .astype(str)
-                    .str.contains(f"^\({query}\)$", regex=True)
-                    .any()
-                )
-            if found:
-                return (
-                    f"The molecule {query} appears in a list of "
-                    "controlled chemicals."
-                )
+            lookup = ControlChemLookup.get()
+            if lookup.find(query) is not None:
+                return self._controlled_message(query)
             else:
                 # Get smiles of CAS number
                 try:
                     smi = pubchem_query2smiles(query)
                 except ValueError as e:
                     return str(e)
+                if lookup.find_smiles(smi) is not None:
+                    return self._controlled_message(query)
                 # Check similarity to known controlled chemicals
                 return self.similar_control_chem_check._run(smi)
 
@@ -306,4 +501,20 @@ class ControlChemCheck(BaseTool):
 
     async def _arun(self, query: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        try:
+            lookup = await asyncio.to_thread(ControlChemLookup.get)
+            if await asyncio.to_thread(lookup.find, query) is not None:
+                return self._controlled_message(query)
+            try:
+                smi = await apubchem_query2smiles(query)
+            except ValueError as e:
+                return str(e)
+            if await asyncio.to_thread(lookup.find_smiles, smi) is not None:
+                return self._controlled_message(query)
+            return await self.similar_control_chem_check._arun(smi)
+        except Exception as e:
+            return f"Error: {e}"
+
+    @staticmethod
+    def _controlled_message(query):
+        return f"The molecule {query} appears in a list of controlled chemicals."
@@ -9,13 +9,18 @@ from langchain import SerpAPIWrapper
 from langchain.base_language import BaseLanguageModel
 from langchain.tools import BaseTool
 from langchain.embeddings.openai import OpenAIEmbeddings
-from pypdf.errors import PdfReadError
 from pathlib import Path
-from chemcrow.utils import is_multiple_smiles, split_smiles
+from chemcrow.papers import get_pdf_cache, ingest, paper_ids
+from chemcrow.utils import is_multiple_smiles, kekule_smiles, split_smiles
 
 
 
-def paper_search(llm, query,serp_api_key= None, semantic_scholar_api_key=None):
+def paper_search(llm, query,serp_api_key= None, semantic_scholar_api_key=None, **scraper_kwargs):
+    """Search and download papers for ``query``.
+
+    ``scraper_kwargs`` (limit, batch_size, rate_limits, prefetch) are passed
+    to ``paperscraper.search_papers``.
+    """
     prompt = langchain.prompts.PromptTemplate(
         input_variables=["question"],
         template="""
@@ -34,15 +39,22 @@ def paper_search(llm, query,serp_api_key= None, semantic_scholar_api_key=None):
     search_stripped = search.strip()
     search_cleaned = re.sub(r'[<>:"/\\|?*]', '', search_stripped)
     pdir = Path("query") / search_cleaned
-    papers = paperscraper.search_papers(search_cleaned, pdir=pdir, serp_api_key= serp_api_key, semantic_scholar_api_key=semantic_scholar_api_key)
+    papers = paperscraper.search_papers(search_cleaned, pdir=pdir, serp_api_key= serp_api_key, semantic_scholar_api_key=semantic_scholar_api_key, **scraper_kwargs)
+    # the scrapers take papers from the shared PDF cache before downloading;
+    # also keep the ones found locally, e.g. in an earlier query directory
+    cache = get_pdf_cache()
+    if cache is not None and isinstance(papers, dict):
+        for path, data in papers.items():
+            if not cache.get(paper_ids(data)):
+                cache.put(paper_ids(data), path)
     return papers
 
 
-def scholar2result_llm(llm, query, k=5, max_sources=2, openai_api_key=None,serp_api_key= None, semantic_scholar_api_key=None):
+def scholar2result_llm(llm, query, k=5, max_sources=2, openai_api_key=None,serp_api_key= None, semantic_scholar_api_key=None, **scraper_kwargs):
     """Useful to answer questions that require
     technical knowledge. Ask a specific question."""
     try:
-        papers = paper_search(llm, query, serp_api_key=serp_api_key,semantic_scholar_api_key=semantic_scholar_api_key)
+        papers = paper_search(llm, query, serp_api_key=serp_api_key,semantic_scholar_api_key=semantic_scholar_api_key, **scraper_kwargs)
     except RuntimeError as e:
     # 捕获 RuntimeError 错误
         return (f"RuntimeError occurred while searching papers: {e}")
@@ -58,13 +70,9 @@ def scholar2result_llm(llm, query, k=5, max_sources=2, openai_api_key=None,serp_
         summary_llm=llm,
         embeddings=OpenAIEmbeddings(openai_api_key=openai_api_key),
     )
-    not_loaded = 0
     if isinstance(papers, dict):
-        for path, data in papers.items():
-            try:
-                docs.add(path, data["citation"])
-            except (ValueError, FileNotFoundError, PdfReadError, UnboundLocalError, PermissionError, AttributeError) as e:
-                not_loaded += 1
+        # parse, deduplicate and embed concurrently rather than docs.add each
+        not_loaded = ingest(docs, papers)
         if not_loaded > 0:
             print(f"\nFound {len(papers.items())} papers but couldn't load {not_loaded}.")
         else:
@@ -86,10 +94,17 @@ class Scholar2ResultLLM(BaseTool):
     openai_api_key: str = None
     serp_api_key: str = None
     semantic_scholar_api_key: str = None
+    # paper download: PDFs to find, papers scraped at a time, requests/sec
+    # per host overriding fix_package/lib.py HOST_RATE_LIMITS, and whether to
+    # search the next result page while scraping the current one
+    paper_limit: int = 10
+    scrape_batch_size: int = 10
+    rate_limits: dict = {}
+    prefetch: bool = True
 
 
-    def __init__(self, llm, openai_api_key,serp_api_key):
-        super().__init__()
+    def __init__(self, llm, openai_api_key,serp_api_key, **kwargs):
+        super().__init__(**kwargs)
         self.llm = llm
         # api keys
         self.openai_api_key = openai_api_key
@@ -100,7 +115,11 @@ class Scholar2ResultLLM(BaseTool):
             self.llm,
             query,
             openai_api_key=self.openai_api_key,
-            serp_api_key=self.serp_api_key
+            serp_api_key=self.serp_api_key,
+            limit=self.paper_limit,
+            batch_size=self.scrape_batch_size,
+            rate_limits=self.rate_limits,
+            prefetch=self.prefetch,
         )
 
     async def _arun(self, query) -> str:
@@ -140,9 +159,50 @@ class WebSearch(BaseTool):
         raise NotImplementedError("Async not implemented")
 
 
+def read_smiles_file(path) -> list:
+    """SMILES from the first column of a text or csv file.
+
+    Blank lines, ``#`` comments and a ``smiles`` header are skipped.
+    """
+    smiles = []
+    with open(path) as f:
+        for line in f:
+            fields = re.split(r"[,\s]+", line.strip(), maxsplit=1)
+            if fields[0] and not fields[0].startswith("#"):
+                smiles.append(fields[0])
+    if smiles and smiles[0].lower() == "smiles":
+        smiles = smiles[1:]
+    return smiles
+
+
+def patent_check(smiles, catalog: str = "surechembl") -> list:
+    """Check many molecules against a molbloom patent catalog.
+
+    smiles: list of SMILES, or path to a file read with ``read_smiles_file``.
+
+    Returns one ``{"smiles", "canonical", "status"}`` dict per input, in
+    order, where status is "Patented", "Novel" or "Invalid SMILES". Errors
+    loading the catalog are raised rather than reported per molecule.
+    """
+    if isinstance(smiles, (str, Path)):
+        smiles = read_smiles_file(smiles)
+    results = []
+    for smi in smiles:
+        canonical = kekule_smiles(smi)
+        if canonical is None:
+            status = "Invalid SMILES"
+        elif molbloom.buy(canonical, catalog=catalog, canonicalize=False):
+            status = "Patented"
+        else:
+            status = "Novel"
+        results.append({"smiles": smi, "canonical": canonical, "status": status})
+    return results
+
+
 class PatentCheck(BaseTool):
     name = "PatentCheck"
     description = "Input SMILES, returns if molecule is patented. You may also input several SMILES, separated by a period."
+    catalog: str = "surechembl"
 
     def _run(self, smiles: str) -> str:
         """Checks if compound is patented. Give this tool only one SMILES string"""
@@ -151,17 +211,18 @@ class PatentCheck(BaseTool):
         else:
             smiles_list = [smiles]
         try:
-            output_dict = {}
-            for smi in smiles_list:
-                r = molbloom.buy(smi, canonicalize=True, catalog="surechembl")
-                if r:
-                    output_dict[smi] = "Patented"
-                else:
-                    output_dict[smi] = "Novel"
-            return str(output_dict)
-        except:
+            results = patent_check(smiles_list, self.catalog)
+        except Exception as e:
+            return f"Patent check failed: {e}"
+        if all(r["status"] == "Invalid SMILES" for r in results):
             return "Invalid SMILES string"
+        return str({r["smiles"]: r["status"] for r in results})
 
-    async def _arun(self, query: str) -> str:
+    def run_batch(self, smiles) -> list:
+        """Per-molecule results for a list or file of SMILES, see ``patent_check``."""
+        return patent_check(smiles, self.catalog)
+
+    async def _arun(self, smiles: str) -> str:
         """Use the tool asynchronously."""
-        raise NotImplementedError()
+        # molbloom lookups are CPU-bound, keep them off the event loop
+        return await asyncio.to_thread(self._run, smiles)
@@ -1,13 +1,75 @@
+import functools
 import re
 
 import requests
 from rdkit import Chem, DataStructs
-from rdkit.Chem import AllChem
+
+from chemcrow.fingerprints import get_fingerprint_service
+from chemcrow.pubchem import compound_key, get_client, quote_identifier
+
+# Molecules and canonical SMILES are memoized by input string, so the helpers
+# below parse a given SMILES once however often a tool step checks it. The
+# caches are bounded LRUs (thread-safe, see memo_stats). Fingerprints are
+# cached by chemcrow.fingerprints.
+MEMO_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def mol_from_smiles(smiles: str, sanitize: bool = True):
+    """Memoized ``Chem.MolFromSmiles``, None for invalid SMILES.
+
+    The molecule is shared between callers and must not be modified.
+    """
+    return Chem.MolFromSmiles(smiles, sanitize=sanitize)
+
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def _canonical(smiles: str):
+    mol = mol_from_smiles(smiles)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol, canonical=True)
+
+
+def morgan_fingerprint(smiles: str):
+    """Cached 2048-bit Morgan fingerprint (radius 2), None for invalid SMILES."""
+    return get_fingerprint_service("morgan").fingerprint(smiles)
+
+
+def _memos():
+    return {
+        "mol": mol_from_smiles,
+        "canonical": _canonical,
+        "kekule": kekule_smiles,
+    }
+
+
+def memo_stats() -> dict:
+    """Hits, misses, size and hit rate of each SMILES memo."""
+    stats = {}
+    for name, memo in _memos().items():
+        info = memo.cache_info()
+        lookups = info.hits + info.misses
+        stats[name] = {
+            "hits": info.hits,
+            "misses": info.misses,
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hit_rate": info.hits / lookups if lookups else 0.0,
+        }
+    stats["fingerprint"] = get_fingerprint_service("morgan").stats()
+    return stats
+
+
+def clear_memos() -> None:
+    for memo in _memos().values():
+        memo.cache_clear()
+    get_fingerprint_service("morgan").clear()
 
 
 def is_smiles(text):
     try:
-        m = Chem.MolFromSmiles(text, sanitize=False)
+        m = mol_from_smiles(text, sanitize=False)
         if m is None:
             return False
         return True
@@ -41,41 +103,51 @@ def largest_mol(smiles):
 
 def canonical_smiles(smiles):
     try:
-        smi = Chem.MolToSmiles(Chem.MolFromSmiles(smiles), canonical=True)
-        return smi
+        smi = _canonical(smiles)
     except Exception:
+        smi = None
+    if smi is None:
         return "Invalid SMILES string"
+    return smi
+
+
+# larger than MEMO_SIZE since patent screening goes through it in bulk
+@functools.lru_cache(maxsize=100_000)
+def kekule_smiles(smiles):
+    """Canonical, isomeric, kekulized SMILES as used by molbloom, or None."""
+    mol = mol_from_smiles(smiles)
+    if mol is None:
+        return None
+    return Chem.MolToSmiles(mol, canonical=True, isomericSmiles=True, kekuleSmiles=True)
 
 
 def tanimoto(s1, s2):
     """Calculate the Tanimoto similarity of two SMILES strings."""
     try:
-        mol1 = Chem.MolFromSmiles(s1)
-        mol2 = Chem.MolFromSmiles(s2)
-        fp1 = AllChem.GetMorganFingerprintAsBitVect(mol1, 2, nBits=2048)
-        fp2 = AllChem.GetMorganFingerprintAsBitVect(mol2, 2, nBits=2048)
+        fp1 = morgan_fingerprint(s1)
+        fp2 = morgan_fingerprint(s2)
+        if fp1 is None or fp2 is None:
+            raise ValueError("Invalid SMILES string")
         return DataStructs.TanimotoSimilarity(fp1, fp2)
     except (TypeError, ValueError, AttributeError):
         return "Error: Not a valid SMILES string"
 
 
-def pubchem_query2smiles(
-    query: str,
-    url: str = "https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{}/{}",
-) -> str:
+PUBCHEM_NAME_URL = "https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{}/{}"
+
+
+def _check_single_smiles(query):
+    """Return True if ``query`` is a single SMILES, raise if several."""
     if is_smiles(query):
-        if not is_multiple_smiles(query):
-            return query
-        else:
+        if is_multiple_smiles(query):
             raise ValueError(
                 "Multiple SMILES strings detected, input one molecule at a time."
             )
-    if url is None:
-        url = "https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{}/{}"
-    r = requests.get(url.format(query, "property/IsomericSMILES/JSON"))
-    # convert the response to a json object
-    data = r.json()
-    # return the SMILES string
+        return True
+    return False
+
+
+def _smiles_from_properties(data) -> str:
     try:
         smi = data["PropertyTable"]["Properties"][0]["IsomericSMILES"]
     except KeyError:
@@ -83,22 +155,54 @@ def pubchem_query2smiles(
     return str(Chem.CanonSmiles(largest_mol(smi)))
 
 
-def query2cas(query: str, url_cid: str, url_data: str):
-    try:
-        mode = "name"
-        if is_smiles(query):
-            if is_multiple_smiles(query):
-                raise ValueError(
-                    "Multiple SMILES strings detected, input one molecule at a time."
-                )
-            mode = "smiles"
-        url_cid = url_cid.format(mode, query)
-        cid = requests.get(url_cid).json()["IdentifierList"]["CID"][0]
-        url_data = url_data.format(cid)
-        data = requests.get(url_data).json()
-    except (requests.exceptions.RequestException, KeyError):
-        raise ValueError("Invalid molecule input, no Pubchem entry")
+def pubchem_query2smiles(
+    query: str,
+    url: str = PUBCHEM_NAME_URL,
+) -> str:
+    if _check_single_smiles(query):
+        return query
+    if url is None:
+        url = PUBCHEM_NAME_URL
+    operation = "property/IsomericSMILES/JSON"
+    data = get_client().get_json(
+        url.format(quote_identifier(query), operation),
+        key=compound_key("name", query, operation),
+    )
+    # return the SMILES string
+    return _smiles_from_properties(data)
+
+
+def pubchem_names2smiles(names) -> dict:
+    """Map several names or CAS numbers to SMILES, None if not found.
+
+    CIDs are resolved concurrently and their SMILES fetched in one POST,
+    instead of one ``pubchem_query2smiles`` request chain per name.
+    """
+    client = get_client()
+    cids = client.cids(names)
+    props = client.properties([c for c in cids.values() if c is not None])
+    out = {}
+    for name, cid in cids.items():
+        smi = props.get(cid, {}).get("IsomericSMILES")
+        out[name] = str(Chem.CanonSmiles(largest_mol(smi))) if smi else None
+    return out
+
+
+async def apubchem_query2smiles(query: str, url: str = PUBCHEM_NAME_URL) -> str:
+    """Async ``pubchem_query2smiles``."""
+    if _check_single_smiles(query):
+        return query
+    if url is None:
+        url = PUBCHEM_NAME_URL
+    operation = "property/IsomericSMILES/JSON"
+    data = await get_client().aget_json(
+        url.format(quote_identifier(query), operation),
+        key=compound_key("name", query, operation),
+    )
+    return _smiles_from_properties(data)
+
 
+def _cas_from_record(data) -> str:
     try:
         for section in data["Record"]["Section"]:
             if section.get("TOCHeading") == "Names and Identifiers":
@@ -115,22 +219,44 @@ def query2cas(query: str, url_cid: str, url_data: str):
     raise ValueError("CAS number not found")
 
 
-def smiles2name(smi, single_name=True):
-    """This function queries the given molecule smiles and returns a name record or iupac"""
+def query2cas(query: str, url_cid: str, url_data: str):
+    try:
+        mode = "smiles" if _check_single_smiles(query) else "name"
+        client = get_client()
+        url_cid = url_cid.format(mode, quote_identifier(query))
+        cid = client.get_json(url_cid, key=compound_key(mode, query, "cids/JSON"))[
+            "IdentifierList"
+        ]["CID"][0]
+        # only download the CAS section instead of the full record
+        url_data = url_data.format(cid)
+        data = client.get_json(
+            url_data, key=f"pug_view/compound/{cid}/CAS", params={"heading": "CAS"}
+        )
+    except (requests.exceptions.RequestException, KeyError):
+        raise ValueError("Invalid molecule input, no Pubchem entry")
+    return _cas_from_record(data)
 
+
+async def aquery2cas(query: str, url_cid: str, url_data: str):
+    """Async ``query2cas``."""
     try:
-        smi = Chem.MolToSmiles(Chem.MolFromSmiles(smi), canonical=True)
-    except Exception:
-        raise ValueError("Invalid SMILES string")
-    # query the PubChem database
-    r = requests.get(
-        "https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/smiles/"
-        + smi
-        + "/synonyms/JSON"
-    )
-    # convert the response to a json object
-    data = r.json()
-    # return the SMILES string
+        mode = "smiles" if _check_single_smiles(query) else "name"
+        client = get_client()
+        url_cid = url_cid.format(mode, quote_identifier(query))
+        data = await client.aget_json(
+            url_cid, key=compound_key(mode, query, "cids/JSON")
+        )
+        cid = data["IdentifierList"]["CID"][0]
+        url_data = url_data.format(cid)
+        data = await client.aget_json(
+            url_data, key=f"pug_view/compound/{cid}/CAS", params={"heading": "CAS"}
+        )
+    except (requests.exceptions.RequestException, KeyError):
+        raise ValueError("Invalid molecule input, no Pubchem entry")
+    return _cas_from_record(data)
+
+
+def _name_from_synonyms(data, single_name=True):
     try:
         if single_name:
             index = 0
@@ -144,3 +270,23 @@ def smiles2name(smi, single_name=True):
     except KeyError:
         raise ValueError("Unknown Molecule")
     return name
+
+
+def smiles2name(smi, single_name=True):
+    """This function queries the given molecule smiles and returns a name record or iupac"""
+
+    smi = canonical_smiles(smi)
+    if smi == "Invalid SMILES string":
+        raise ValueError(smi)
+    # query the PubChem database
+    data = get_client().compound("smiles", smi, "synonyms/JSON")
+    return _name_from_synonyms(data, single_name)
+
+
+async def asmiles2name(smi, single_name=True):
+    """Async ``smiles2name``."""
+    smi = canonical_smiles(smi)
+    if smi == "Invalid SMILES string":
+        raise ValueError(smi)
+    data = await get_client().acompound("smiles", smi, "synonyms/JSON")
+    return _name_from_synonyms(data, single_name)
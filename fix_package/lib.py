@@ -6,13 +6,15 @@ import logging
 import os
 import re
 import sys
-from collections.abc import Iterable
+import time
+from collections.abc import Awaitable, Callable, Iterable
 from enum import Enum, IntEnum, auto
-from functools import partial
+from functools import partial, wraps
 from pathlib import Path
 from typing import Any
 
 from aiohttp import ClientResponse, ClientResponseError, ClientSession, InvalidURL
+from yarl import URL
 
 from .exceptions import CitationConversionError, DOINotFoundError, NoPDFLinkError
 from .headers import get_header
@@ -307,22 +309,59 @@ async def local_scraper(paper, path) -> bool:  # noqa: ARG001
     return True
 
 
-def default_scraper(**scraper_kwargs) -> Scraper:
-    scraper = Scraper(**scraper_kwargs)
+def _pdf_cache():
+    """chemcrow's shared PDF cache and its key function, or (None, None).
+
+    Imported on first use, so this module does not need chemcrow to import.
+    """
+    try:
+        from chemcrow.papers import get_pdf_cache, paper_ids
+    except ImportError:
+        return None, None
+    return get_pdf_cache(), paper_ids
+
+
+async def cache_scraper(paper, path) -> bool:
+    """Take the PDF from the shared cache, by DOI or arXiv ID, if it is there."""
+    cache, paper_ids = _pdf_cache()
+    return cache is not None and cache.copy_to(paper_ids(paper), path)
+
+
+def cached_scraper(scraper_fn):
+    """Store the PDFs ``scraper_fn`` downloads in the shared cache."""
+
+    @wraps(scraper_fn)
+    async def scrape(paper, path, session: ClientSession) -> bool:
+        found = await scraper_fn(paper, path, session)
+        cache, paper_ids = _pdf_cache() if found else (None, None)
+        if cache is not None:
+            cache.put(paper_ids(paper), path)
+        return found
+
+    return scrape
+
+
+def default_scraper(
+    rate_limits: dict[str, float] | None = None, **scraper_kwargs
+) -> Scraper:
+    """
+    Scraper trying the local directory, the PDF cache, then the network.
+
+    Args:
+        rate_limits: Requests per second by host, overriding HOST_RATE_LIMITS.
+        scraper_kwargs: Passed through to Scraper.
+    """
+    scraper = HostThrottledScraper(rate_limits=rate_limits, **scraper_kwargs)
     scraper.register_scraper(local_scraper, priority=12)
-    scraper_rate_limit_config: dict[str, Any] = {
-        "attach_session": True,
-        "rate_limit": RateLimits.SCRAPER.value,
-    }
-    scraper.register_scraper(arxiv_scraper, **scraper_rate_limit_config)
-    scraper.register_scraper(medrxiv_scraper, **scraper_rate_limit_config)
-    scraper.register_scraper(biorxiv_scraper, **scraper_rate_limit_config)
-    scraper.register_scraper(chemrxiv_scraper, **scraper_rate_limit_config)
-    scraper.register_scraper(pmc_scraper, priority=9, **scraper_rate_limit_config)
-    scraper.register_scraper(pubmed_scraper, priority=9, **scraper_rate_limit_config)
-    scraper.register_scraper(
-        openaccess_scraper, priority=9, **scraper_rate_limit_config
-    )
+    # before any network request
+    scraper.register_scraper(cache_scraper, priority=11)
+    scraper.register_host_scraper(cached_scraper(arxiv_scraper))
+    scraper.register_host_scraper(cached_scraper(medrxiv_scraper))
+    scraper.register_host_scraper(cached_scraper(biorxiv_scraper))
+    scraper.register_host_scraper(cached_scraper(chemrxiv_scraper))
+    scraper.register_host_scraper(cached_scraper(pmc_scraper), priority=9)
+    scraper.register_host_scraper(cached_scraper(pubmed_scraper), priority=9)
+    scraper.register_host_scraper(cached_scraper(openaccess_scraper), priority=9)
     return scraper
 
 
@@ -569,6 +608,108 @@ class RateLimits(float, Enum):
     FALLBACK_SLOW = 15 / 60
 
 
+# Requests/sec per host for the scrapers; subdomains share their domain's
+# limit and other hosts get RateLimits.SCRAPER each.
+HOST_RATE_LIMITS: dict[str, float] = {
+    # SEE: https://info.arxiv.org/help/api/tou.html
+    "arxiv.org": 1 / 3,
+    # SEE: https://www.ncbi.nlm.nih.gov/books/NBK25497/
+    "ncbi.nlm.nih.gov": 3.0,
+    "biorxiv.org": 1.0,
+    "medrxiv.org": 1.0,
+    "chemrxiv.org": 1.0,
+    "doi.org": 2.0,
+}
+
+
+class TokenBucket:
+    """Allow ``rate`` requests/sec on average, in bursts of up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1.0
+                self._updated = time.monotonic()
+            self._tokens -= 1
+
+
+class HostThrottledClientSession(ClientSession):
+    """ClientSession with a separate token bucket for each host."""
+
+    def __init__(
+        self,
+        *args,
+        rate_limits: dict[str, float] | None = None,
+        default_rate_limit: float = RateLimits.SCRAPER.value,
+        burst: float = 1.0,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.rate_limits = {**HOST_RATE_LIMITS, **(rate_limits or {})}
+        self.default_rate_limit = default_rate_limit
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def rate_limit(self, host: str) -> float:
+        labels = host.lower().split(".")
+        for i in range(len(labels)):
+            domain = ".".join(labels[i:])
+            if domain in self.rate_limits:
+                return self.rate_limits[domain]
+        return self.default_rate_limit
+
+    async def _request(self, method, str_or_url, *args, **kwargs):
+        host = URL(str(str_or_url)).host or ""
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate_limit(host), self.burst)
+        await self._buckets[host].acquire()
+        return await super()._request(method, str_or_url, *args, **kwargs)
+
+
+class HostThrottledScraper(Scraper):
+    """Scraper whose download scrapers share one HostThrottledClientSession."""
+
+    def __init__(self, *args, rate_limits: dict[str, float] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limits = rate_limits
+        self._host_session: HostThrottledClientSession | None = None
+
+    def host_session(self) -> HostThrottledClientSession:
+        if self._host_session is None or self._host_session.closed:
+            self._host_session = HostThrottledClientSession(
+                rate_limits=self.rate_limits, headers=get_header()
+            )
+        return self._host_session
+
+    def register_host_scraper(self, func, **kwargs) -> None:
+        """Register ``func(paper, path, session)`` with the shared session."""
+
+        @wraps(func)
+        async def scrape(paper, path) -> bool:
+            return await func(paper, path, self.host_session())
+
+        self.register_scraper(scrape, **kwargs)
+
+    async def close(self) -> None:
+        await super().close()
+        if self._host_session is not None:
+            await self._host_session.close()
+            self._host_session = None
+
+
 SEMANTIC_SCHOLAR_API_FIELDS: str = ",".join([
     "citationStyles",
     "externalIds",
@@ -641,6 +782,66 @@ class SematicScholarSearchType(IntEnum):
 # of 4/15/2024, but was determined by contacting SERP support
 GOOGLE_SEARCH_MAX_PAGE_SIZE = 20
 
+
+async def scrape_pages(
+    search_page: Callable[[int], Awaitable[tuple[list[dict[str, Any]], bool]]],
+    scrape: Callable[[list[dict[str, Any]], int], Awaitable[dict]],
+    paths: dict,
+    offset: int,
+    page_size: int,
+    limit: int,
+    prefetch: bool = True,
+    logger: logging.Logger | None = None,
+) -> dict:
+    """
+    Scrape result pages into ``paths`` until ``limit`` PDFs are found.
+
+    Args:
+        search_page: Coroutine function returning the papers at an offset and
+            whether more pages follow.
+        scrape: Coroutine function scraping papers, up to a number of PDFs.
+        paths: Scraped PDFs so far, updated in place.
+        offset: Offset of the first page.
+        page_size: Number of results per page.
+        limit: Number of PDFs wanted.
+        prefetch: Set True (default) to search the next page while the current
+            one is scraped, if it cannot fill what is still needed.
+        logger: Logger for failures past the first page.
+
+    Returns:
+        ``paths``.
+    """
+    logger = logger or logging.getLogger(__name__)
+    start = offset
+    next_page: asyncio.Future | None = asyncio.ensure_future(search_page(offset))
+    try:
+        while next_page is not None:
+            page, next_page = next_page, None
+            try:
+                papers, has_more_data = await page
+                if has_more_data and prefetch and len(papers) < limit - len(paths):
+                    # search the next page while this one is scraped
+                    next_page = asyncio.ensure_future(search_page(offset + page_size))
+                paths.update(await scrape(papers, limit - len(paths)))
+            except Exception as e:
+                # failures past the first page keep what was found so far
+                if offset == start:
+                    raise
+                logger.exception(f"An error occurred: {e}")
+                break
+            offset += page_size
+            if len(paths) >= limit or not has_more_data:
+                break
+            if next_page is None:
+                next_page = asyncio.ensure_future(search_page(offset))
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await next_page
+    return paths
+
+
 async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
     query: str,
     limit: int = 10,
@@ -656,6 +857,8 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
     scraper: Scraper | None = None,
     batch_size: int = 10,
     search_type: str = "google",#default google
+    rate_limits: dict[str, float] | None = None,
+    prefetch: bool = True,
 ) -> dict[str, dict[str, Any]]:
     """
     Asynchronously search for papers using Semantic Scholar, and scrape them.
@@ -664,15 +867,15 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
         query: Search input, its exact meaning depends on the search_type.
         limit: Target result count, we will try to give at least this many results.
             However, for cases when Semantic Scholar doesn't give enough results,
-            there will be less than this value.
+            there will be less than this value. Scraping stops once reached.
         pdir: Optional directory (created if it does not exist), that defaults to the
             current directory, passed to Scraper.batch_scrape's paper_file_dump_dir.
         semantic_scholar_api_key: Optional Semantic Scholar API key, otherwise
             attempt to pull it from the environment variable SEMANTIC_SCHOLAR_API_KEY.
-        _paths: Previous Scraper.batch_scrape, used internally for recursion.
+        _paths: Results to extend, keyed by path.
         _limit: Result limit to pass to the Semantic Scholar API, only relevant for
             some search_type.
-        _offset: Offset in the search results, used internally for recursion.
+        _offset: Offset in the search results of the first page.
         logger: Optional logger to use for logging. If left as default of None,
             a 'paper-scraper' logger at ERROR level will be used.
         year: Optional year string, either a single year (e.g. '2019')
@@ -682,6 +885,10 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
             the default scraper will be created.
         batch_size: Passed through to Scraper.batch_scrape's batch_size.
         search_type: Lowercase string corresponding with a SematicScholarSearchType key.
+        rate_limits: Requests per second by host for the default scraper,
+            overriding HOST_RATE_LIMITS.
+        prefetch: Set True (default) to search the next result page while the
+            current one is scraped, when it cannot fill the limit.
 
     Returns:
         Dict union of all Scraper.batch_scrape outputs.
@@ -703,9 +910,7 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
     if _limit > 100:  # noqa: PLR2004
         raise NotImplementedError("Didn't handle Semantic Scholar pagination ('next').")
     rate_limit: float = RateLimits.FALLBACK_SLOW.value
-    endpoint, params = SematicScholarSearchType[search_type.upper()].make_url_params(
-        params, query, _offset, _limit
-    )
+    google_params: dict[str, Any] = {}
     if search_type == "google":
         # SEE: https://serpapi.com/google-scholar-api
         google_endpoint = "https://serpapi.com/search.json"
@@ -714,7 +919,6 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
             "api_key": serp_api_key,
             "engine": "google_scholar",
             "num": GOOGLE_SEARCH_MAX_PAGE_SIZE,
-            "start": _offset,
             # TODO - add offset and limit here  # noqa: TD004
         }
         rate_limit = RateLimits.GOOGLE_SCHOLAR.value
@@ -755,10 +959,6 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
         if "as_ylo" not in google_params:
             logger.warning(f"Could not parse year {year}")
 
-    paths: dict[str, dict[str, Any]] = (
-        {str(k): v for k, v in _paths.items()} if _paths is not None else {}
-    )
-    scraper = scraper or default_scraper()
     ssheader = get_header()
     if semantic_scholar_api_key is not None:
         ssheader["x-api-key"] = semantic_scholar_api_key
@@ -768,109 +968,119 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
         with contextlib.suppress(KeyError):
             ssheader["x-api-key"] = os.environ["SEMANTIC_SCHOLAR_API_KEY"]
             rate_limit = RateLimits.SEMANTIC_SCHOLAR.value
-    async with ThrottledClientSession(
-        rate_limit=rate_limit, headers=ssheader
-    ) as ss_session:
-        async with ss_session.get(
-            url=google_endpoint if search_type == "google" else endpoint,
-            params=google_params if search_type == "google" else params,
-        ) as response:
-            try:
-                response.raise_for_status()
-            except ClientResponseError as exc:
-                if response.status == 404 and search_type == "doi":  # noqa: PLR2004
-                    raise DOINotFoundError(f"DOI {query} not found.") from exc
-                raise RuntimeError(
-                    f"Error searching papers given query {query}."
-                ) from exc
-            data = await response.json()
-        if search_type == "default":
-            has_more_data = _offset + _limit < data["total"]
-        elif search_type == "google":
-            if "organic_results" not in data:
-                return paths
-            has_more_data = "pagination" in data
-            papers = data["organic_results"]
-            titles = [p["title"] for p in papers]
-            years: list[str | None] = [None] * len(papers)
-            for i, p in enumerate(papers):
-                match = year_extract_pattern.findall(p["publication_info"]["summary"])
-                if len(match) > 0:
-                    years[i] = match[0]
-
-            # get PDF resources
-            google_pdf_links: list[str | None] = [None] * len(papers)
-            for i, p in enumerate(papers):
-                if "resources" in p:
-                    for res in p["resources"]:
-                        if res.get("file_format") == "PDF":
-                            google_pdf_links[i] = res["link"]
-
-            # want this separate, since ss is rate_limit for Google
-            async with ThrottledClientSession(
-                rate_limit=rate_limit, headers=ssheader
-            ) as ss_sub_session:
-                # Now we need to reconcile with S2 API these results
-                async def google2s2(
-                    title: str, year: str | None, pdf_link
-                ) -> dict[str, Any] | None:
-                    local_p = params.copy()
-                    local_p["query"] = title.replace("-", " ")
-                    if year is not None:
-                        local_p["year"] = year
-                    async with ss_sub_session.get(
-                        url=endpoint, params=local_p
-                    ) as response:
-                        if not response.ok:
-                            logger.warning(
-                                "Error correlating papers from google to semantic"
-                                f" scholar: status {response.status}, reason"
-                                f" {response.reason!r}, text {await response.text()!r}."
-                            )
-                            return None
-                        response_data = await response.json()
-                    if (
-                        "data" not in response_data
-                        and year is not None
-                        and response_data["total"] == 0
-                    ):
-                        logger.info(
-                            f"{title} | {year} not found. Now trying without year"
-                        )
-                        del local_p["year"]
+
+    async def search_page(offset: int) -> tuple[list[dict[str, Any]], bool]:
+        """Papers of the result page at ``offset``, and whether more follow."""
+        endpoint, page_params = SematicScholarSearchType[
+            search_type.upper()
+        ].make_url_params(dict(params), query, offset, _limit)
+        page_google_params = {**google_params, "start": offset}
+        has_more_data = False
+        async with ThrottledClientSession(
+            rate_limit=rate_limit, headers=ssheader
+        ) as ss_session:
+            async with ss_session.get(
+                url=google_endpoint if search_type == "google" else endpoint,
+                params=page_google_params if search_type == "google" else page_params,
+            ) as response:
+                try:
+                    response.raise_for_status()
+                except ClientResponseError as exc:
+                    if response.status == 404 and search_type == "doi":  # noqa: PLR2004
+                        raise DOINotFoundError(f"DOI {query} not found.") from exc
+                    raise RuntimeError(
+                        f"Error searching papers given query {query}."
+                    ) from exc
+                data = await response.json()
+            if search_type == "default":
+                has_more_data = offset + _limit < data["total"]
+            elif search_type == "google":
+                if "organic_results" not in data:
+                    return [], False
+                has_more_data = "pagination" in data
+                papers = data["organic_results"]
+                titles = [p["title"] for p in papers]
+                years: list[str | None] = [None] * len(papers)
+                for i, p in enumerate(papers):
+                    match = year_extract_pattern.findall(
+                        p["publication_info"]["summary"]
+                    )
+                    if len(match) > 0:
+                        years[i] = match[0]
+
+                # get PDF resources
+                google_pdf_links: list[str | None] = [None] * len(papers)
+                for i, p in enumerate(papers):
+                    if "resources" in p:
+                        for res in p["resources"]:
+                            if res.get("file_format") == "PDF":
+                                google_pdf_links[i] = res["link"]
+
+                # want this separate, since ss is rate_limit for Google
+                async with ThrottledClientSession(
+                    rate_limit=rate_limit, headers=ssheader
+                ) as ss_sub_session:
+                    # Now we need to reconcile with S2 API these results
+                    async def google2s2(
+                        title: str, year: str | None, pdf_link
+                    ) -> dict[str, Any] | None:
+                        local_p = page_params.copy()
+                        local_p["query"] = title.replace("-", " ")
+                        if year is not None:
+                            local_p["year"] = year
                         async with ss_sub_session.get(
                             url=endpoint, params=local_p
-                        ) as resp:
-                            if not resp.ok:
+                        ) as response:
+                            if not response.ok:
                                 logger.warning(
-                                    "Error correlating papers from google"
-                                    " to semantic scholar (no year):"
-                                    f" status {resp.status}, reason {resp.reason},"
-                                    f" text {await resp.text()!r}."
+                                    "Error correlating papers from google to semantic"
+                                    f" scholar: status {response.status}, reason"
+                                    f" {response.reason!r}, text {await response.text()!r}."
                                 )
-                            response_data = await resp.json()
-                    if "data" in response_data:
-                        if pdf_link is not None:
-                            # Google Scholar url takes precedence
-                            response_data["data"][0]["openAccessPdf"] = {
-                                "url": pdf_link
-                            }
-                        return response_data["data"][0]
-                    return None
-
-                responses = await asyncio.gather(*(
-                    google2s2(t, y, p)
-                    for t, y, p in zip(titles, years, google_pdf_links, strict=True)
-                ))
-            data = {"data": [r for r in responses if r is not None]}
-            data["total"] = len(data["data"])
+                                return None
+                            response_data = await response.json()
+                        if (
+                            "data" not in response_data
+                            and year is not None
+                            and response_data["total"] == 0
+                        ):
+                            logger.info(
+                                f"{title} | {year} not found. Now trying without year"
+                            )
+                            del local_p["year"]
+                            async with ss_sub_session.get(
+                                url=endpoint, params=local_p
+                            ) as resp:
+                                if not resp.ok:
+                                    logger.warning(
+                                        "Error correlating papers from google"
+                                        " to semantic scholar (no year):"
+                                        f" status {resp.status}, reason {resp.reason},"
+                                        f" text {await resp.text()!r}."
+                                    )
+                                response_data = await resp.json()
+                        if "data" in response_data:
+                            if pdf_link is not None:
+                                # Google Scholar url takes precedence
+                                response_data["data"][0]["openAccessPdf"] = {
+                                    "url": pdf_link
+                                }
+                            return response_data["data"][0]
+                        return None
+
+                    responses = await asyncio.gather(*(
+                        google2s2(t, y, p)
+                        for t, y, p in zip(titles, years, google_pdf_links, strict=True)
+                    ))
+                data = {"data": [r for r in responses if r is not None]}
+                data["total"] = len(data["data"])
         field = "data"
         if search_type == "paper_recommendations":
             field = "recommendedPapers"
         elif search_type == "doi":
             data = {"data": [data]}
         if field not in data:
-            return paths
+            return [], False
         papers = data[field]
         if search_type == "future_citations":
             papers = [p["citingPaper"] for p in papers]
@@ -881,46 +1091,35 @@ async def a_search_papers(  # noqa: C901, PLR0912, PLR0915
             papers.sort(key=lambda x: x["influentialCitationCount"], reverse=True)
         if search_type in ["default", "google"]:
             logger.info(
-                f"Found {data['total']} papers, analyzing {_offset} to"
-                f" {_offset + len(papers)}"
+                f"Found {data['total']} papers, analyzing {offset} to"
+                f" {offset + len(papers)}"
             )
+        return papers, search_type in ["default", "google"] and has_more_data
 
+    paths: dict[str, dict[str, Any]] = (
+        {str(k): v for k, v in _paths.items()} if _paths is not None else {}
+    )
+    scraper = scraper or default_scraper(rate_limits=rate_limits)
+    page_size = GOOGLE_SEARCH_MAX_PAGE_SIZE if search_type == "google" else _limit
+
+    async def scrape(papers: list[dict[str, Any]], remaining: int) -> dict:
         # batch them, since we may reach desired limit before all done
-        paths.update(
-            await scraper.batch_scrape(
-                papers,
-                paper_file_dump_dir=pdir,
-                paper_parser=parse_semantic_scholar_metadata,
-                batch_size=batch_size,
-                limit=limit,
-                logger=logger,
-            )
+        return await scraper.batch_scrape(
+            papers,
+            paper_file_dump_dir=pdir,
+            paper_parser=parse_semantic_scholar_metadata,
+            batch_size=batch_size,
+            limit=remaining,
+            logger=logger,
         )
-    if search_type in ["default", "google"] and len(paths) < limit and has_more_data:
-        try:
-            result = await a_search_papers(
-                query,
-                limit=limit,
-                pdir=pdir,
-                semantic_scholar_api_key=semantic_scholar_api_key,
-                serp_api_key=serp_api_key,
-                _paths=paths,  # type: ignore[arg-type]
-                _limit=_limit,
-                _offset=_offset + (GOOGLE_SEARCH_MAX_PAGE_SIZE if search_type == "google" else _limit),
-                logger=logger,
-                year=year,
-                verbose=verbose,
-                scraper=scraper,
-                batch_size=batch_size,
-                search_type=search_type,
-            )
-            paths.update(result)  # 更新 paths
-        except Exception as e:
-            if logger is not None:
-                logger.exception(f"An error occurred: {e}")
 
-    if _offset == 0:
-        await scraper.close()
+    try:
+        await scrape_pages(
+            search_page, scrape, paths, _offset, page_size, limit, prefetch, logger
+        )
+    finally:
+        if _offset == 0:
+            await scraper.close()
     return paths
 
 
@@ -937,6 +1136,8 @@ async def a_gsearch_papers(  # noqa: C901
     verbose: bool = False,
     scraper: Scraper | None = None,
     batch_size: int = 10,
+    rate_limits: dict[str, float] | None = None,
+    prefetch: bool = True,
 ) -> dict[str, dict[str, Any]]:
     pdir = Path(pdir)
     pdir.mkdir(exist_ok=True)
@@ -959,7 +1160,6 @@ async def a_gsearch_papers(  # noqa: C901
         "api_key": os.environ["SERPAPI_API_KEY"],
         "engine": "google_scholar",
         "num": _limit,
-        "start": _offset,
     }
 
     if year is not None:
@@ -984,62 +1184,56 @@ async def a_gsearch_papers(  # noqa: C901
     paths: dict[str, dict[str, Any]] = (
         {str(k): v for k, v in _paths.items()} if _paths is not None else {}
     )
-    scraper = scraper or default_scraper()
+    scraper = scraper or default_scraper(rate_limits=rate_limits)
 
     async with ThrottledClientSession(
         headers=get_header(),
         rate_limit=RateLimits.GOOGLE_SCHOLAR.value,  # Share rate limits between gs/crossref
     ) as session:
-        async with session.get(
-            url=endpoint,
-            params=params,
-        ) as response:
-            if not response.ok:
-                raise RuntimeError(
-                    "Error searching papers:"
-                    f" {response.status} {response.reason} {await response.text()}"
-                )
-            data = await response.json()
-
-        if "organic_results" not in data:
-            return paths
-        papers = data["organic_results"]
-        total_papers = data["search_information"].get("total_results", 1)
-        logger.info(
-            f"Found {total_papers} papers, analyzing {_offset} to"
-            f" {_offset + len(papers)}"
-        )
 
-        # batch them, since we may reach desired limit before all done
-        paths.update(
-            await scraper.batch_scrape(
-                # we only process papers that have a link and a DOI
-                await parallel_preprocess_google_scholar_metadata(
-                    papers, session, logger
-                ),
+        async def search_page(offset: int) -> tuple[list[dict[str, Any]], bool]:
+            """Preprocessed papers of the result page at ``offset``, and
+            whether more follow."""
+            async with session.get(
+                url=endpoint,
+                params={**params, "start": offset},
+            ) as response:
+                if not response.ok:
+                    raise RuntimeError(
+                        "Error searching papers:"
+                        f" {response.status} {response.reason} {await response.text()}"
+                    )
+                data = await response.json()
+
+            if "organic_results" not in data:
+                return [], False
+            papers = data["organic_results"]
+            total_papers = data["search_information"].get("total_results", 1)
+            logger.info(
+                f"Found {total_papers} papers, analyzing {offset} to"
+                f" {offset + len(papers)}"
+            )
+            # we only process papers that have a link and a DOI
+            papers = await parallel_preprocess_google_scholar_metadata(
+                papers, session, logger
+            )
+            return papers, offset + _limit < total_papers
+
+        async def scrape(papers: list[dict[str, Any]], remaining: int) -> dict:
+            # batch them, since we may reach desired limit before all done
+            return await scraper.batch_scrape(
+                papers,
                 paper_file_dump_dir=pdir,
                 paper_parser=partial(parse_google_scholar_metadata, session=session),
                 batch_size=batch_size,
-                limit=limit,
+                limit=remaining,
                 logger=logger,
             )
+
+        await scrape_pages(
+            search_page, scrape, paths, _offset, _limit, limit, prefetch, logger
         )
-    if len(paths) < limit and _offset + _limit < total_papers:
-        paths.update(
-            await a_gsearch_papers(
-                query,
-                limit=limit,
-                pdir=pdir,
-                _paths=paths,  # type: ignore[arg-type]
-                _offset=_offset + limit,
-                _limit=_limit,
-                logger=logger,
-                year=year,
-                verbose=verbose,
-                scraper=scraper,
-                batch_size=batch_size,
-            )
-        )
+
     await scraper.close()
     return paths
 
@@ -31,8 +31,9 @@ chem_agent = ChemCrow(
     temp = TEMPER, 
     streaming = True,
     openai_api_key = llm_api_key,
-    local_rxn = True
-).agent_executor
+    local_rxn = True,
+    warm_up = True
+)
 
 # translation
 translation_agent = googleTranslationAgent()
@@ -55,7 +56,7 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-tools = chem_agent.tools
+tools = chem_agent.agent_executor.tools
 
 tool_list = pd.Series(
     {f"✅ {t.name}":t.description for t in tools}
@@ -19,6 +19,7 @@ setup(
     install_requires=[
         "ipython==8.32.0",
         "python-dotenv",
+        "aiohttp",
         "rdkit",
         "synspace==0.3.0",
         "openai==0.27.8",
@@ -1,7 +1,8 @@
 import os
-import requests
 import logging
 
+from chemcrow import http_client
+
 class googleTranslationAgent:
     def __init__(self):
         """ 初始化 Google 翻译 API 的 URL 和 API 密钥。"""
@@ -16,7 +17,7 @@ class googleTranslationAgent:
             "key": self.api_key
         }
         try:
-            response = requests.post(self._detect_url, data=params, timeout=15)
+            response = http_client.post(self._detect_url, data=params, timeout=15)
             if response.status_code == 200:
                 result = response.json()
                 detected_language = result["data"]["detections"][0][0]["language"]
@@ -47,7 +48,7 @@ class googleTranslationAgent:
         }
         try:
             # 发送 POST 请求到 Google 翻译 API
-            response = requests.post(self._translate_url, data=params, timeout=15)
+            response = http_client.post(self._translate_url, data=params, timeout=15)
             
             # 检查是否成功响应
             if response.status_code == 200:
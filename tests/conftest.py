@@ -0,0 +1,30 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+
+class _Server(ThreadingHTTPServer):
+    # handlers blocked on a kept-alive connection must not hold up shutdown
+    daemon_threads = True
+
+
+@pytest.fixture
+def http_server():
+    """Serve a ``BaseHTTPRequestHandler`` class on localhost.
+
+    Call the fixture with the handler class to get the server's base URL;
+    servers are shut down after the test.
+    """
+    servers = []
+
+    def serve(handler) -> str:
+        server = _Server(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
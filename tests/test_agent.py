@@ -1,8 +1,14 @@
+import asyncio
 import os
+import time
 
 import pytest
+from langchain.tools import BaseTool
 
 import chemcrow
+from chemcrow.agents import preflight
+from chemcrow.agents.preflight import SafetyPreflight, extract_molecules
+from chemcrow.tools.safety import ControlChemCheck
 
 
 def test_version():
@@ -16,3 +22,77 @@ def test_agent_init():
     )
     out = chem_model.run("hello")
     assert isinstance(out, str)
+
+
+class StubCheck(BaseTool):
+    description = "stub"
+    result: str = ""
+
+    def _run(self, query: str) -> str:
+        raise NotImplementedError()
+
+    async def _arun(self, query: str) -> str:
+        await asyncio.sleep(0.2)
+        return self.result.format(query)
+
+
+CONTROLLED = "The molecule {} appears in a list of controlled chemicals."
+PATENT = "{{'{}': 'Novel'}}"
+
+
+def test_extract_molecules():
+    text = "Is CCO, or c1ccccc1 (CAS 71-43-2) explosive? I think CO is NOT."
+    assert extract_molecules(text) == ["CCO", "c1ccccc1", "71-43-2"]
+
+
+def test_preflight_runs_checks_concurrently():
+    tools = [
+        StubCheck(name="ControlChemCheck", result=CONTROLLED),
+        StubCheck(name="PatentCheck", result=PATENT),
+    ]
+    preflight = SafetyPreflight(tools)
+    start = time.perf_counter()
+    report = preflight.run("Plan a synthesis of CCO and CC(=O)O")
+    assert time.perf_counter() - start < 0.4
+    assert report == {
+        m: {"ControlChemCheck": CONTROLLED.format(m), "PatentCheck": PATENT.format(m)}
+        for m in ("CCO", "CC(=O)O")
+    }
+    prompt = preflight.augment("Plan a synthesis of CCO")
+    assert prompt.startswith("Plan a synthesis of CCO\n\nSafety preflight")
+    assert preflight.augment("hello") == "hello"
+
+
+def test_preflight_failed_lookup_not_reported():
+    # with PubChem unreachable the tools return messages, not verdicts
+    tools = [
+        StubCheck(name="ControlChemCheck", result="Error: connection refused"),
+        StubCheck(name="ExplosiveCheck", result="Molecule not found in Pubchem."),
+    ]
+    report = SafetyPreflight(tools).run("Is 118-96-7 safe?")
+    assert report == {
+        "118-96-7": {
+            "ControlChemCheck": "check unavailable",
+            "ExplosiveCheck": "check unavailable",
+        }
+    }
+
+
+def test_preflight_resolves_cas_in_one_batch(monkeypatch):
+    calls = []
+
+    def names2smiles(names):
+        calls.append(names)
+        return {"50-00-0": "C=O", "64-17-5": "CCO"}
+
+    monkeypatch.setattr(preflight, "pubchem_names2smiles", names2smiles)
+    tools = [StubCheck(name="PatentCheck", result=PATENT)]
+    report = SafetyPreflight(tools).run("Mix 50-00-0 and 64-17-5")
+    assert calls == [["50-00-0", "64-17-5"]]
+    assert report["64-17-5"]["PatentCheck"] == PATENT.format("CCO")
+
+
+def test_preflight_controlled_chemical():
+    preflight = SafetyPreflight([ControlChemCheck()])
+    report = preflight.run("What is 10025-87-3?")
+    assert "appears in a list" in report["10025-87-3"]["ControlChemCheck"]
@@ -0,0 +1,46 @@
+import molbloom
+import pytest
+
+from chemcrow import bloom_filters
+from chemcrow.bloom_filters import BloomFilterWarmup
+
+
+def test_warmup_loads_in_background():
+    warmup = BloomFilterWarmup(["zinc-instock-mini"]).start()
+    assert warmup.wait(timeout=60)
+    assert molbloom._filters["zinc-instock-mini"] is not None
+    status = warmup.status()
+    assert status["ready"]
+    assert status["catalogs"]["zinc-instock-mini"]["state"] == "ready"
+    assert status["filter_bytes"] > 1_000_000
+
+
+def test_warmup_failure_is_reported(monkeypatch):
+    def fail(*args, **kwargs):
+        raise OSError("download failed")
+
+    monkeypatch.setattr(molbloom, "buy", fail)
+    warmup = BloomFilterWarmup(["surechembl"]).start()
+    assert not warmup.wait(timeout=10)
+    status = warmup.status()["catalogs"]["surechembl"]
+    assert status["state"] == "failed"
+    assert "download failed" in status["error"]
+
+    # failed catalogs are retried when queued again
+    monkeypatch.setattr(molbloom, "buy", lambda *args, **kwargs: False)
+    warmup.add(["surechembl"])
+    warmup.start()
+    assert warmup.wait(timeout=10)
+
+
+def test_unknown_catalog():
+    with pytest.raises(ValueError):
+        BloomFilterWarmup(["not-a-catalog"])
+
+
+def test_warm_up_is_shared(monkeypatch):
+    monkeypatch.setattr(bloom_filters, "_warmup", None)
+    first = bloom_filters.warm_up(["zinc-instock-mini"])
+    assert bloom_filters.warm_up(["zinc-instock-mini"]) is first
+    assert bloom_filters.get_warmup() is first
+    assert first.wait(timeout=60)
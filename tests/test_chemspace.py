@@ -0,0 +1,146 @@
+import asyncio
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from chemcrow import http_client
+from chemcrow.tools import chemspace
+from chemcrow.tools.chemspace import ChemSpace, get_chemspace
+
+
+class FakeChemSpace(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    tokens = 0
+    searches = 0
+    # tokens the API accepts
+    valid = set()
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        FakeChemSpace.tokens += 1
+        token = f"token{FakeChemSpace.tokens}"
+        FakeChemSpace.valid = {token}
+        self._send(200, {"access_token": token, "expires_in": 3600})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        FakeChemSpace.searches += 1
+        token = self.headers["Authorization"].split()[-1]
+        if token not in FakeChemSpace.valid:
+            self._send(
+                401, {"message": "Your request was made with invalid credentials."}
+            )
+        else:
+            self._send(200, {"count": 1, "items": [{"smiles": "CCO"}]})
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(http_server, monkeypatch):
+    FakeChemSpace.tokens = FakeChemSpace.searches = 0
+    monkeypatch.setattr(ChemSpace, "url", http_server(FakeChemSpace))
+    monkeypatch.setattr(chemspace, "_clients", {})
+    return get_chemspace("key")
+
+
+def test_token_reused(client):
+    for _ in range(3):
+        assert client._convert_single("ethanol", "smiles") == "CCO"
+    # one token for all lookups, one request per lookup
+    assert FakeChemSpace.tokens == 1
+    assert FakeChemSpace.searches == 3
+    assert get_chemspace("key") is client
+
+
+def test_token_renewed_when_rejected(client):
+    client._convert_single("ethanol", "smiles")
+    FakeChemSpace.valid = set()
+    assert client._convert_single("ethanol", "smiles") == "CCO"
+    assert FakeChemSpace.tokens == 2
+    assert FakeChemSpace.searches == 3
+
+
+def test_token_renewed_when_expired(client):
+    client._convert_single("ethanol", "smiles")
+    client._token_expiry = 0.0
+    client._convert_single("ethanol", "smiles")
+    assert FakeChemSpace.tokens == 2
+    assert FakeChemSpace.searches == 2
+
+
+def offer(vendor, *prices):
+    return {
+        "vendorName": vendor,
+        "shipsWithin": 5,
+        "purity": 95,
+        "prices": [{"pack": p, "uom": u, "priceUsd": usd} for p, u, usd in prices],
+    }
+
+
+def test_cheapest_offer_per_gram():
+    data = {
+        "count": 1,
+        "items": [
+            {
+                "smiles": "CCO",
+                "offers": [
+                    offer("A", (100, "mg", 20), (1, "g", "Inquire")),
+                    offer("B", (1, "g", "150.5"), (5, "mL", 1)),
+                    offer("C", (1, "kg", 19999.99), (250, "mg", None)),
+                ],
+            }
+        ],
+    }
+    out = ChemSpace._cheapest_offer(data, True)
+    assert out == "1kg of this molecule cost 19999.99 USD and can be purchased at C."
+    lines = ChemSpace._cheapest_offer(data, True, top=4).split("\n")
+    assert lines == [
+        "1kg of this molecule cost 19999.99 USD and can be purchased at C.",
+        "1g of this molecule cost 150.5 USD and can be purchased at B.",
+        "100mg of this molecule cost 20 USD and can be purchased at A.",
+        # not comparable per gram
+        "5mL of this molecule cost 1 USD and can be purchased at B.",
+    ]
+
+
+def test_cheapest_offer_several_molecules():
+    data = {
+        "count": 2,
+        "items": [
+            {"smiles": "CCO", "offers": [offer("A", (1, "g", 10))]},
+            {"smiles": "CCN", "offers": [offer("B", (1, "g", 5))]},
+        ],
+    }
+    out = ChemSpace._cheapest_offer(data, True, top=2)
+    assert out.split("\n") == [
+        "1g of CCN cost 5 USD and can be purchased at B.",
+        "1g of CCO cost 10 USD and can be purchased at A.",
+    ]
+    data = {"count": 1, "items": [{"smiles": "CCO", "offers": []}]}
+    out = ChemSpace._cheapest_offer(data, True)
+    assert out == "Compound is purchasable, but price is unknown."
+
+
+def test_async_token_fetched_once(client):
+    async def lookups():
+        try:
+            return await asyncio.gather(
+                *(client._aconvert_single("ethanol", "smiles") for _ in range(5))
+            )
+        finally:
+            await http_client.get_async_http_client().close()
+
+    assert asyncio.run(lookups()) == ["CCO"] * 5
+    # concurrent requests on a cold client share one token
+    assert FakeChemSpace.tokens == 1
+    assert FakeChemSpace.searches == 5
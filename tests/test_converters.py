@@ -1,3 +1,4 @@
+import asyncio
 import os
 
 import pytest
@@ -96,3 +97,10 @@ def test_smiles2name():
     )
     assert "acetic acid" in smiles2name.run("CC(=O)O").lower()
     assert "Error:" in smiles2name.run("nonsense")
+
+
+def test_q2s_rejects_before_lookup(molset1):
+    tool = Query2SMILES()
+    assert tool._run(molset1).startswith("Multiple SMILES strings detected")
+    assert asyncio.run(tool._arun(molset1)) == tool._run(molset1)
+    assert asyncio.run(tool._arun("")) == tool._run("")
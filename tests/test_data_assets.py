@@ -0,0 +1,72 @@
+import gzip
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from chemcrow import data_assets
+from chemcrow.data_assets import DataAsset
+from chemcrow.tools.safety import ExplosiveCheck, MoleculeSafety
+
+CSV = gzip.compress(b"smiles,FDA_APPROVED,CT_TOX\nCCO,1,0\n")
+
+
+class FakeS3(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        FakeS3.hits += 1
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(CSV)))
+        self.end_headers()
+        self.wfile.write(CSV)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def asset(tmp_path, http_server):
+    FakeS3.hits = 0
+    return DataAsset(
+        "clintox", http_server(FakeS3) + "/clintox.csv.gz", cache_dir=tmp_path
+    )
+
+
+def test_load_once(asset):
+    df = asset.load()
+    assert list(df["smiles"]) == ["CCO"]
+    assert asset.load() is df
+    assert FakeS3.hits == 1
+
+
+def test_cached_copy_reused(asset, tmp_path):
+    asset.fetch()
+    other = DataAsset("clintox", asset.url, cache_dir=tmp_path)
+    assert other.is_cached()
+    other.load()
+    assert FakeS3.hits == 1
+
+
+def test_corrupted_copy_refetched(asset):
+    asset.fetch()
+    asset.path.write_bytes(b"garbage")
+    assert not asset.is_cached()
+    asset.fetch()
+    assert FakeS3.hits == 2
+    assert asset.is_cached()
+
+
+def test_checksum_mismatch(asset):
+    asset.sha256 = "0" * 64
+    with pytest.raises(ValueError):
+        asset.fetch()
+    assert not asset.path.exists()
+
+
+def test_tools_do_not_download(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("network access at construction")
+
+    monkeypatch.setattr(data_assets.http_client, "get", fail)
+    ExplosiveCheck()
+    MoleculeSafety()
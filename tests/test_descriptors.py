@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from chemcrow import descriptors
+from chemcrow.utils import tanimoto
+
+
+@pytest.fixture
+def library():
+    return ["CCO", "O=C1N(C)C(C2=C(N=CN2C)N1C)=O", "not a smiles", "c1ccccc1O"]
+
+
+def test_describe(library):
+    out = descriptors.describe(library)
+    assert list(out["valid"]) == [True, True, False, True]
+    assert list(out["formula"]) == ["C2H6O", "C8H10N4O2", None, "C6H6O"]
+    assert abs(out["exact_mass"][1] - 194.08) < 0.01
+    assert np.isnan(out["exact_mass"][2])
+
+
+def test_chunked_pool_matches_serial(library):
+    serial = descriptors.exact_mass(library * 10)
+    pooled = descriptors.exact_mass(library * 10, n_jobs=2, chunksize=7)
+    np.testing.assert_array_equal(serial, pooled)
+
+
+def test_tanimoto(library):
+    sims = descriptors.tanimoto_one_vs_many("CCO", library)
+    assert sims.shape == (4,)
+    assert sims[0] == 1.0
+    assert np.isnan(sims[2])
+    assert sims[3] == pytest.approx(tanimoto("CCO", "c1ccccc1O"))
+
+    matrix = descriptors.tanimoto_matrix(library)
+    assert matrix.shape == (4, 4)
+    np.testing.assert_allclose(matrix[0], sims)
+    assert np.isnan(matrix[2]).all()
+
+    with pytest.raises(ValueError):
+        descriptors.tanimoto_one_vs_many("not a smiles", library)
+
+
+def test_fingerprint_array(library):
+    arr = descriptors.fingerprint_array(descriptors.fingerprints(library))
+    assert arr.shape == (4, descriptors.N_BITS)
+    assert arr[0].any() and not arr[2].any()
@@ -0,0 +1,61 @@
+import pytest
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+
+from chemcrow.fingerprints import FingerprintService
+from chemcrow.utils import tanimoto
+
+
+@pytest.fixture
+def service():
+    return FingerprintService("morgan")
+
+
+def test_keyed_by_canonical_smiles(service):
+    fp = service.fingerprint("CCO")
+    assert service.fingerprint("OCC") is fp
+    assert service.stats()["hits"] == 1
+    assert service.fingerprint("not a smiles") is None
+    assert len(service) == 1
+
+
+def test_matches_legacy_morgan():
+    smi = "O=C1N(C)C(C2=C(N=CN2C)N1C)=O"
+    legacy = AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles(smi), 2, 2048)
+    assert FingerprintService("morgan").fingerprint(smi) == legacy
+    assert tanimoto(smi, "CCO") == DataStructs.TanimotoSimilarity(
+        legacy,
+        AllChem.GetMorganFingerprintAsBitVect(Chem.MolFromSmiles("CCO"), 2, 2048),
+    )
+
+
+@pytest.mark.parametrize(
+    "kind, n_bits", [("rdkit", 2048), ("atompair", 2048), ("maccs", 167)]
+)
+def test_kinds(kind, n_bits):
+    service = FingerprintService(kind)
+    assert service.fingerprint("c1ccccc1O").GetNumBits() == n_bits
+    assert 0 < service.similarity("c1ccccc1O", "c1ccccc1N") < 1
+
+
+def test_size_eviction():
+    service = FingerprintService("morgan", max_bytes=1000)
+    for smi in ["C", "CC", "CCC", "CCCC"]:
+        service.fingerprint(smi)
+    assert len(service) == 2
+    assert service.stats()["bytes"] <= 1000
+
+
+def test_save_load(service, tmp_path):
+    smiles = ["CCO", "c1ccccc1O", "CC(=O)O"]
+    fps = service.fingerprints(smiles)
+    path = tmp_path / "fps.npz"
+    service.save(path)
+
+    other = FingerprintService("morgan")
+    assert other.load(path) == 3
+    assert other.fingerprints(smiles) == fps
+    assert other.stats()["misses"] == 0
+
+    with pytest.raises(ValueError):
+        FingerprintService("morgan", radius=3).load(path)
@@ -0,0 +1,52 @@
+import time
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+from chemcrow import http_client
+from chemcrow.http_client import HTTPClient
+
+
+class FakeServer(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = 0
+
+    def do_GET(self):
+        FakeServer.hits += 1
+        if self.path == "/slow":
+            time.sleep(0.5)
+        if self.path == "/flaky" and FakeServer.hits < 3:
+            status = 503
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server_url(http_server):
+    FakeServer.hits = 0
+    return http_server(FakeServer)
+
+
+def test_shared_client():
+    assert http_client.get_http_client() is http_client.get_http_client()
+
+
+def test_default_timeout(server_url):
+    client = HTTPClient(read_timeout=0.1, retries=0)
+    with pytest.raises(requests.exceptions.RequestException):
+        client.get(f"{server_url}/slow")
+
+
+def test_retry_with_backoff(server_url):
+    client = HTTPClient(retries=3, backoff_factor=0.01)
+    r = client.get(f"{server_url}/flaky")
+    assert r.status_code == 200
+    assert FakeServer.hits == 3
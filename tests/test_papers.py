@@ -0,0 +1,199 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+import paperqa
+import pytest
+from langchain.embeddings.base import Embeddings
+from langchain.llms.fake import FakeListLLM
+
+from chemcrow import papers as papers_module
+from chemcrow.cache import SQLiteCache
+from chemcrow.papers import PDFCache, ingest, paper_ids
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic local embeddings, recording each request."""
+
+    def __init__(self):
+        self.batches = []
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        return [b / 255 for b in digest[:16]]
+
+    def embed_documents(self, texts):
+        self.batches.append(len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def make_pdf(path, text):
+    """Write a one-page PDF showing ``text``."""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    path.write_bytes(out)
+    return str(path)
+
+
+TEXT = "Norhalichondrin B inhibits the growth of cancer cells in mammals. " * 3
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    store = SQLiteCache(tmp_path / "papers.sqlite", ttl=None)
+    monkeypatch.setattr(papers_module, "_store", store)
+    monkeypatch.setattr(papers_module, "_store_set", True)
+    return store
+
+
+@pytest.fixture
+def docs():
+    llm = FakeListLLM(responses=["answer"])
+    return paperqa.Docs(llm=llm, summary_llm=llm, embeddings=FakeEmbeddings())
+
+
+@pytest.fixture
+def papers(tmp_path):
+    return {
+        make_pdf(tmp_path / "a.pdf", "A " + TEXT): {
+            "citation": "Smith, J. Paper A. 2020",
+            "doi": "10.1/a",
+        },
+        # same file under another name
+        make_pdf(tmp_path / "a2.pdf", "A " + TEXT): {
+            "citation": "Smith, J. Paper A. 2020",
+            "doi": None,
+        },
+        # same DOI, other version of the file
+        make_pdf(tmp_path / "a3.pdf", "A' " + TEXT): {
+            "citation": "Smith, J. Paper A. 2020",
+            "doi": "10.1/A",
+        },
+        make_pdf(tmp_path / "b.pdf", "B " + TEXT): {
+            "citation": "Smith, K. Paper B. 2020",
+            "doi": "10.1/b",
+        },
+        make_pdf(tmp_path / "c.pdf", "C " + TEXT): {
+            "citation": "Jones, L. Paper C. 2021",
+            "doi": "10.1/c",
+        },
+        str(tmp_path / "missing.pdf"): {"citation": "Doe, J. 2022", "doi": None},
+    }
+
+
+def test_ingest(docs, papers, tmp_path):
+    not_loaded = ingest(docs, papers, n_jobs=2, batch_size=2)
+    assert not_loaded == 1
+    assert sorted(doc["key"] for doc in docs.docs.values()) == [
+        "Jones2021",
+        "Smith2020",
+        "Smith2020a",
+    ]
+    # embedded in batches once, not again when searching
+    assert docs.embeddings.batches == [2, 1]
+    assert docs._faiss_index.index.ntotal == 3
+    result = docs._faiss_index.similarity_search("C " + TEXT, k=1)
+    assert result[0].metadata["dockey"] == "Jones2021"
+
+    # papers already in docs are skipped
+    d = make_pdf(tmp_path / "d.pdf", "D " + TEXT)
+    papers[d] = {"citation": "Brown, M. 2019", "doi": "10.1/d"}
+    assert ingest(docs, papers, n_jobs=1) == 1
+    assert docs.embeddings.batches == [2, 1, 1]
+    assert docs._faiss_index.index.ntotal == 4
+
+
+def test_ingest_not_text(docs, tmp_path):
+    path = make_pdf(tmp_path / "x.pdf", "x")
+    assert ingest(docs, {path: {"citation": "Doe, J. 2022"}}) == 1
+    assert docs.docs == {}
+
+
+def test_store_reused(docs, papers, store, monkeypatch):
+    ingest(docs, papers, n_jobs=1)
+    assert len(store) == 3
+
+    def parse_pdf(*args):
+        raise AssertionError("parsed again")
+
+    # a new session finds every paper in the store
+    monkeypatch.setattr(papers_module, "parse_pdf", parse_pdf)
+    llm = FakeListLLM(responses=["answer"])
+    again = paperqa.Docs(llm=llm, summary_llm=llm, embeddings=FakeEmbeddings())
+    assert ingest(again, papers, n_jobs=1) == 1
+    assert again.embeddings.batches == []
+    assert sorted(d["key"] for d in again.docs.values()) == sorted(
+        d["key"] for d in docs.docs.values()
+    )
+    query = again.embeddings.embed_query("C " + TEXT)
+    result = again._faiss_index.similarity_search_by_vector(query, k=1)
+    assert result[0].metadata["dockey"] == "Jones2021"
+    assert result[0].metadata["key"] == "Jones2021 pages 1-1"
+
+
+def test_paper_ids():
+    paper = {"externalIds": {"DOI": "10.48550/arXiv.2305.10379"}}
+    assert paper_ids(paper) == ["doi:10.48550/arxiv.2305.10379", "arxiv:2305.10379"]
+    assert paper_ids({"doi": "10.1/A", "paperId": "x"}) == ["doi:10.1/a"]
+    assert paper_ids({"externalIds": {"ArXiv": "2101.1"}}) == ["arxiv:2101.1"]
+    assert paper_ids({"externalIds": {}}) == []
+
+
+def test_pdf_cache(tmp_path):
+    cache = PDFCache(tmp_path / "pdfs", max_bytes=10_000)
+    a = make_pdf(tmp_path / "a.pdf", "A " + TEXT)
+    assert cache.put(["doi:10.1/a"], a) is not None
+    # the same content under another ID is stored once
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(Path(a).read_bytes())
+    cache.put(["arxiv:2101.1"], copy)
+    assert cache.stats()["files"] == 1
+
+    target = tmp_path / "query" / "x.pdf"
+    target.parent.mkdir()
+    assert cache.copy_to(["doi:10.9/none", "arxiv:2101.1"], target)
+    assert target.read_bytes() == Path(a).read_bytes()
+    assert not cache.copy_to(["doi:10.9/none"], tmp_path / "y.pdf")
+
+    # not a PDF
+    html = tmp_path / "page.pdf"
+    html.write_text("<html></html>")
+    assert cache.put(["doi:10.1/html"], html) is None
+
+
+def test_pdf_cache_quota(tmp_path):
+    pdfs = [make_pdf(tmp_path / f"{i}.pdf", f"{i} " + TEXT) for i in range(3)]
+    size = Path(pdfs[0]).stat().st_size
+    cache = PDFCache(tmp_path / "pdfs", max_bytes=2 * size + 10)
+    cache.put(["doi:0"], pdfs[0])
+    cache.put(["doi:1"], pdfs[1])
+    old = time.time() - 60
+    for blob in cache.blobs.glob("*.pdf"):
+        os.utime(blob, (old, old))
+    # used recently, so it stays
+    assert cache.get(["doi:0"]) is not None
+    cache.put(["doi:2"], pdfs[2])
+    assert cache.stats()["files"] == 2
+    assert cache.get(["doi:1"]) is None
+    assert cache.get(["doi:0"]) is not None
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs
+
+import pytest
+
+from chemcrow import http_client, pubchem
+from chemcrow.cache import SQLiteCache
+from chemcrow.pubchem import PubChemClient, normalize_query
+from chemcrow.utils import (
+    apubchem_query2smiles,
+    pubchem_names2smiles,
+    pubchem_query2smiles,
+)
+
+
+class FakePubChem(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        FakePubChem.requests.append(self.path)
+        if "/cids/" in self.path:
+            name = self.path.split("/")[-3]
+            if name == "nomol":
+                status, body = 404, {"Fault": {"Code": "PUGREST.NotFound"}}
+            else:
+                status, body = 200, {"IdentifierList": {"CID": [len(name)]}}
+        elif "pug_view" in self.path:
+            status = 200
+            body = {"Record": {"Section": [{"TOCHeading": self.path}]}}
+        elif "caffeine" in self.path.lower():
+            status = 200
+            body = {
+                "PropertyTable": {
+                    "Properties": [{"IsomericSMILES": "CN1C=NC2=C1C(=O)N(C(=O)N2C)C"}]
+                }
+            }
+        else:
+            status = 404
+            body = {"Fault": {"Code": "PUGREST.NotFound"}}
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        FakePubChem.requests.append(self.path)
+        length = int(self.headers["Content-Length"])
+        cids = parse_qs(self.rfile.read(length).decode())["cid"][0].split(",")
+        body = {
+            "PropertyTable": {
+                "Properties": [
+                    {"CID": int(c), "IsomericSMILES": "C" * int(c)} for c in cids
+                ]
+            }
+        }
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_pubchem(http_server):
+    FakePubChem.requests = []
+    return http_server(FakePubChem) + "/compound/name/{}/{}"
+
+
+@pytest.fixture
+def fake_base_url(fake_pubchem, monkeypatch):
+    base = fake_pubchem.split("/compound")[0]
+    monkeypatch.setattr(pubchem, "PUG_URL", base + "/pug")
+    monkeypatch.setattr(pubchem, "PUG_VIEW_URL", base + "/pug_view")
+    return base
+
+
+@pytest.fixture
+def client(tmp_path):
+    old = pubchem._client
+    client = PubChemClient(cache=SQLiteCache(tmp_path / "pubchem.sqlite"))
+    pubchem.set_client(client)
+    yield client
+    pubchem.set_client(old)
+
+
+def test_normalize_query():
+    assert normalize_query("  Caffeine ") == "caffeine"
+    assert normalize_query("OCC", "smiles") == normalize_query("C(O)C", "smiles")
+
+
+def test_cache_hit(fake_pubchem, client):
+    smi = pubchem_query2smiles("caffeine", fake_pubchem)
+    assert smi == "Cn1c(=O)c2c(ncn2C)n(C)c1=O"
+    assert len(FakePubChem.requests) == 1
+    # equivalent queries are answered from the cache
+    assert pubchem_query2smiles("Caffeine ", fake_pubchem) == smi
+    assert len(FakePubChem.requests) == 1
+    assert client.cache.stats()["hits"] == 1
+
+
+def test_cache_shared_across_clients(fake_pubchem, client, tmp_path):
+    pubchem_query2smiles("caffeine", fake_pubchem)
+    pubchem.set_client(PubChemClient(cache=SQLiteCache(tmp_path / "pubchem.sqlite")))
+    pubchem_query2smiles("caffeine", fake_pubchem)
+    assert len(FakePubChem.requests) == 1
+
+
+def test_errors_not_cached(fake_pubchem, client):
+    out = pubchem_query2smiles("nomol", fake_pubchem)
+    assert out.startswith("Could not find a molecule")
+    pubchem_query2smiles("nomol", fake_pubchem)
+    assert len(FakePubChem.requests) == 2
+    assert len(client.cache) == 0
+
+
+def test_cache_ttl(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", ttl=0.1)
+    cache.set("a", {"x": 1})
+    assert cache.get("a") == {"x": 1}
+    time.sleep(0.2)
+    assert cache.get("a") is None
+
+
+def test_cache_eviction(tmp_path):
+    cache = SQLiteCache(tmp_path / "cache.sqlite", max_bytes=100)
+    cache.set("a", "x" * 40)
+    cache.set("b", "x" * 40)
+    cache.get("a")
+    cache.set("c", "x" * 40)
+    # least recently used entry goes first
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_pug_view_heading(fake_base_url, client):
+    data = client.pug_view_sections(4, ["Safety and Hazards", "Toxicity"])
+    sections = [s["TOCHeading"] for s in data["Record"]["Section"]]
+    assert sections == [
+        "/pug_view/data/compound/4/JSON?heading=Safety+and+Hazards",
+        "/pug_view/data/compound/4/JSON?heading=Toxicity",
+    ]
+    client.pug_view(4, "Toxicity")
+    assert len(FakePubChem.requests) == 2
+
+
+def test_batch_cids_and_properties(fake_base_url, client):
+    cids = client.cids(["ab", "abc", "nomol", "ab"])
+    assert cids == {"ab": 2, "abc": 3, "nomol": None}
+    assert len(FakePubChem.requests) == 3
+    props = client.properties([2, 3])
+    assert props == {2: {"IsomericSMILES": "CC"}, 3: {"IsomericSMILES": "CCC"}}
+    assert len(FakePubChem.requests) == 4
+    # cached CIDs are not posted again
+    client.properties([2, 3, 4])
+    assert len(FakePubChem.requests) == 5
+
+
+def test_names2smiles(fake_base_url, client):
+    smiles = pubchem_names2smiles(["ab", "abc", "nomol"])
+    assert smiles == {"ab": "CC", "abc": "CCC", "nomol": None}
+    # one CID lookup per name, one POST for all SMILES
+    assert sum(r.startswith("/pug/compound/cid/") for r in FakePubChem.requests) == 1
+    assert len(FakePubChem.requests) == 4
+
+
+def run_async(coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await http_client.get_async_http_client().close()
+
+    return asyncio.run(run())
+
+
+def test_async_query_shares_cache(fake_pubchem, client):
+    smi = run_async(apubchem_query2smiles("caffeine", fake_pubchem))
+    assert smi == pubchem_query2smiles("Caffeine", fake_pubchem)
+    assert len(FakePubChem.requests) == 1
+
+
+def test_async_pug_view_sections(fake_base_url, client):
+    async def both():
+        return await asyncio.gather(
+            client.apug_view_sections(4, ["Safety and Hazards", "Toxicity"]),
+            client.acid("abc"),
+        )
+
+    data, cid = run_async(both())
+    assert len(data["Record"]["Section"]) == 2
+    assert cid == 3
+    assert data == client.pug_view_sections(4, ["Safety and Hazards", "Toxicity"])
+    assert len(FakePubChem.requests) == 3
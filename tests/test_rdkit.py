@@ -1,6 +1,18 @@
 import pytest
 
-from chemcrow.tools.rdkit import FuncGroups, MolSimilarity, SMILES2Weight
+from chemcrow.tools.rdkit import (
+    FuncGroups,
+    MolSimilarity,
+    SMILES2Weight,
+    functional_groups,
+)
+from chemcrow.utils import (
+    canonical_smiles,
+    clear_memos,
+    is_smiles,
+    memo_stats,
+    tanimoto,
+)
 
 
 @pytest.fixture
@@ -86,3 +98,31 @@ def test_fg_iupac(single_iupac):
     tool = FuncGroups()
     out = tool(single_iupac)
     assert out == "Wrong argument. Please input a valid molecular SMILES."
+
+
+def test_fg_batch(singlemol, single_iupac):
+    tool = FuncGroups()
+    smiles = [singlemol, single_iupac, "CC(=O)Oc1ccccc1C(=O)O"]
+    out = tool.run_batch(smiles)
+    assert "ketones" in out[0]
+    assert out[1] is None
+    assert out[2] == functional_groups(smiles[2])
+    assert "esters" in out[2] and "carboxylic acids" in out[2]
+    assert tool.run_batch(smiles, n_jobs=2, chunksize=1) == out
+
+
+# SMILES memo
+
+
+def test_smiles_memo(singlemol):
+    clear_memos()
+    assert is_smiles(singlemol)
+    assert canonical_smiles(singlemol) == canonical_smiles(singlemol)
+    assert tanimoto(singlemol, singlemol) == 1.0
+    stats = memo_stats()
+    assert stats["mol"]["misses"] == 2  # unsanitized for is_smiles, sanitized
+    assert stats["canonical"]["hits"] >= 1
+    assert stats["fingerprint"]["hits"] == 1
+    assert 0 < stats["mol"]["hit_rate"] < 1
+    assert canonical_smiles("xyz") == "Invalid SMILES string"
+    assert tanimoto(singlemol, "xyz") == "Error: Not a valid SMILES string"
@@ -0,0 +1,136 @@
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+
+from chemcrow import reaction_cache
+from chemcrow.cache import SQLiteCache
+from chemcrow.reaction_cache import reaction_key
+from chemcrow.tools.reactions import RXNPredictLocal, RXNRetrosynthesisLocal
+
+
+class FakeService(BaseHTTPRequestHandler):
+    """Batch endpoints of the reaction services, echoing inputs back."""
+
+    protocol_version = "HTTP/1.1"
+    retro = False
+    batches = []
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakeService.batches.append(data["smiles"])
+        status = 200
+        if "CCCl" in data["smiles"]:
+            status, body = 500, {"error": "worker died"}
+        elif FakeService.retro:
+            body = {
+                "results": [
+                    {"target": s, "routes": [{"smiles": s, "children": []}]}
+                    if s != "c1ccccc1"
+                    else {"target": s, "error": "no routes"}
+                    for s in data["smiles"]
+                ]
+            }
+        else:
+            body = {
+                "results": [
+                    {"smiles": s, "status": "SUCCESS", "product": [s + ".O"]}
+                    for s in data["smiles"]
+                ]
+            }
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    cache = SQLiteCache(tmp_path / "reactions.sqlite")
+    monkeypatch.setattr(reaction_cache, "_cache", cache)
+    monkeypatch.setattr(reaction_cache, "_cache_set", True)
+    return cache
+
+
+@pytest.fixture
+def service_url(http_server):
+    FakeService.batches = []
+    FakeService.retro = False
+    return http_server(FakeService)
+
+
+def test_predict_reactions_batch(service_url):
+    tool = RXNPredictLocal(url=service_url, batch_size=2)
+    products = tool.predict_reactions(["CCO", "nothing", "CC(=O)O", "CCN"])
+    assert products == ["CCO.O", "Incorrect input.", "CC(=O)O.O", "CCN.O"]
+    # invalid input is never sent, valid input in chunks of batch_size
+    assert FakeService.batches == [["CCO", "CC(=O)O"], ["CCN"]]
+
+
+def test_retrosyntheses_batch(service_url):
+    FakeService.retro = True
+    tool = RXNRetrosynthesisLocal(url=service_url, batch_size=2)
+    routes = tool.retrosyntheses(["CCO", "nothing", "c1ccccc1", "CCCl", "CCN"])
+    assert routes == [
+        [{"smiles": "CCO", "children": []}],
+        "Incorrect input.",
+        "Error in retrosynthesis.",
+        # its batch failed as a whole
+        "Error in retrosynthesis.",
+        "Error in retrosynthesis.",
+    ]
+    assert FakeService.batches == [["CCO", "c1ccccc1"], ["CCCl", "CCN"]]
+
+
+def test_reaction_key():
+    assert reaction_key("predict", "OCC.CC", "m") == reaction_key(
+        "predict", "CC.CCO", "m"
+    )
+    assert reaction_key("predict", "CCO", "m", n_best=5, beam_size=10) == reaction_key(
+        "predict", "CCO", "m", beam_size=10, n_best=5
+    )
+    assert reaction_key("predict", "CCO", "m") != reaction_key("predict", "CCO", "m2")
+
+
+def test_predictions_cached(service_url, cache):
+    tool = RXNPredictLocal(url=service_url)
+    assert tool.predict_reactions(["CCO", "CCN"]) == ["CCO.O", "CCN.O"]
+    # equivalent SMILES are answered from the cache
+    assert tool.predict_reactions(["OCC", "CCN", "CCC"]) == ["CCO.O", "CCN.O", "CCC.O"]
+    assert FakeService.batches == [["CCO", "CCN"], ["CCC"]]
+    assert RXNPredictLocal(url=service_url, model="other").predict_reactions(["CCO"])
+    assert len(FakeService.batches) == 3
+
+
+def test_failures_not_cached(service_url, cache):
+    FakeService.retro = True
+    tool = RXNRetrosynthesisLocal(url=service_url)
+    tool.retrosyntheses(["c1ccccc1", "CCO"])
+    tool.retrosyntheses(["c1ccccc1", "CCO"])
+    assert FakeService.batches == [["c1ccccc1", "CCO"], ["c1ccccc1"]]
+    assert len(cache) == 1
+
+
+def test_no_routes_not_cached(http_server, cache):
+    class NoRoutes(FakeService):
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            FakeService.batches.append(self.path)
+            payload = b"[]"
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    FakeService.batches = []
+    tool = RXNRetrosynthesisLocal(url=http_server(NoRoutes))
+    assert tool._run("CCO") == "No synthesis route found."
+    assert tool._run("CCO") == "No synthesis route found."
+    assert len(FakeService.batches) == 2
+    assert len(cache) == 0
@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+from chemcrow.tools import rxn4chem
+from chemcrow.tools.rxn4chem import RetryLater, RXN4Chem, RXNRetrosynthesis
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(rxn4chem, "sleep", sleeps.append)
+    return sleeps
+
+
+def test_retry_backoff(sleeps):
+    calls = []
+
+    @RXN4Chem.retry(5, KeyError, sleep_time=1)
+    def flaky():
+        calls.append(len(sleeps))
+        if len(calls) == 1:
+            raise KeyError
+        if len(calls) == 2:
+            raise RetryLater(10)
+        return "ok"
+
+    assert flaky() == "ok"
+    # first attempt is immediate, then jittered backoff or the requested delay
+    assert calls == [0, 1, 2]
+    assert 0.5 <= sleeps[0] <= 1
+    assert sleeps[1] == 10
+
+
+def test_retry_gives_up(sleeps):
+    @RXN4Chem.retry(3, KeyError, sleep_time=1, max_sleep=2)
+    def failing():
+        raise KeyError
+
+    with pytest.raises(KeyError):
+        failing()
+    assert len(sleeps) == 3
+    assert max(sleeps) <= 2
+
+
+class FakeRXN:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def create_synthesis_from_sequence(self, sequence_id):
+        return {"synthesis_id": "s"}
+
+    def get_node_ids(self, synthesis_id):
+        return ["a", "b", "c", "d"]
+
+    def get_reaction_settings(self, synthesis_id, node_id):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.1)
+        with self.lock:
+            self.active -= 1
+        if node_id == "c":
+            return {"response": {"payload": {}}}
+        return {"actions": [node_id], "product": node_id.upper()}
+
+
+def test_node_settings_fetched_concurrently(monkeypatch):
+    tool = RXNRetrosynthesis("rxn-key", "openai-key")
+    tool.requests_per_second = 100
+    tool.rxn4chem = FakeRXN()
+    monkeypatch.setattr(RXNRetrosynthesis, "_summary_gpt", lambda self, j: j)
+    actions = tool.get_action_sequence({"sequenceId": "q"})
+    assert actions["number_of_steps"] == 3
+    # node order is kept
+    assert [actions[f"Step_{i}"]["product"] for i in range(3)] == ["A", "B", "D"]
+    assert tool.rxn4chem.max_active > 1
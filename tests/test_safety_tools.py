@@ -2,7 +2,14 @@ import pytest
 from dotenv import load_dotenv
 from langchain.chat_models import ChatOpenAI
 
-from chemcrow.tools.safety import ControlChemCheck, ExplosiveCheck, SafetySummary
+from chemcrow.tools.safety import (
+    ControlChemCheck,
+    ControlChemFingerprints,
+    ControlChemLookup,
+    ExplosiveCheck,
+    SafetySummary,
+    SimilarControlChemCheck,
+)
 
 load_dotenv()
 
@@ -19,6 +26,18 @@ def test_controlchemcheck_controlled(controlledchemcheck):
     assert "appears in a list" in ans_smi
 
 
+def test_controlchemlookup():
+    lookup = ControlChemLookup.get()
+    assert lookup is ControlChemLookup.get()
+    # CAS with or without brackets, and alternative SMILES spellings
+    assert lookup.find("10025-87-3")["smiles"] == "O=P(Cl)(Cl)Cl"
+    assert lookup.find("(10025-87-3)") is not None
+    assert lookup.find("ClP(Cl)(Cl)=O") is not None
+    assert lookup.find("OCCSCCO") is not None
+    assert lookup.find("CC(=O)C") is None
+    assert lookup.find("67-64-1") is None
+
+
 def test_controlchemcheck_notsimilar(controlledchemcheck):
     acetone_smi = "CC(=O)C"
     acetone_cas = "67-64-1"
@@ -33,6 +52,23 @@ def test_controlchemcheck_notsimilar(controlledchemcheck):
     assert "is similar to" not in ans_smi
 
 
+def test_similarcontrolchemcheck():
+    tool = SimilarControlChemCheck()
+    assert "high similarity" in tool._run("O=P(Cl)(Cl)Cl")
+    assert "low similarity" in tool._run("CN1C=NC2=C1C(=O)N(C)C(=O)N2C")
+
+
+def test_controlchem_fingerprints_shared():
+    index = ControlChemFingerprints.get()
+    assert index is ControlChemFingerprints.get()
+    assert index.max_similarity("O=P(Cl)(Cl)Cl") == 1.0
+    assert index.max_similarity("nomol") == 0.0
+    stats = index.stats()
+    assert stats["entries"] > 0
+    assert stats["build_time"] > 0
+    assert stats["n_queries"] >= 2
+
+
 @pytest.mark.skip(reason="This requires an api call")
 def test_safety_summary():
     llm = ChatOpenAI()
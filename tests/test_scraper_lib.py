@@ -0,0 +1,247 @@
+"""Tests of fix_package/lib.py, the patched paperscraper lib.
+
+paperscraper itself is not needed: the module is loaded as ``lib`` of a
+package whose sibling modules are the minimal doubles below.
+"""
+
+import asyncio
+import importlib.util
+import sys
+import time
+import types
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+import aiohttp
+import pytest
+
+LIB = Path(__file__).parents[1] / "fix_package" / "lib.py"
+
+
+class Scraper:
+    """Stand-in for paperscraper.scraper.Scraper."""
+
+    def __init__(self, **kwargs):
+        self.scrapers = []
+        self.closed = False
+
+    def register_scraper(self, func, attach_session=False, priority=10, **kwargs):
+        self.scrapers.append((priority, func))
+
+    async def batch_scrape(self, papers, paper_file_dump_dir, paper_parser, **kwargs):
+        return {}
+
+    async def close(self):
+        self.closed = True
+
+
+class ThrottledClientSession(aiohttp.ClientSession):
+    def __init__(self, *args, rate_limit=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+
+def _package(name: str) -> dict:
+    """Modules of a fake paperscraper package called ``name``."""
+    modules = {name: types.ModuleType(name)}
+    modules[name].__path__ = []
+    siblings = {
+        "exceptions": {
+            "CitationConversionError": type(
+                "CitationConversionError", (Exception,), {}
+            ),
+            "DOINotFoundError": type("DOINotFoundError", (Exception,), {}),
+            "NoPDFLinkError": type("NoPDFLinkError", (Exception,), {}),
+        },
+        "headers": {"get_header": lambda: {}},
+        "log_formatter": {"CustomFormatter": object},
+        "scraper": {"Scraper": Scraper},
+        "utils": {
+            "ThrottledClientSession": ThrottledClientSession,
+            "crossref_headers": lambda: {},
+            "encode_id": str,
+            "find_doi": lambda link: None,
+            "get_scheme_hostname": lambda url: url,
+            "search_pdf_link": lambda text, epdf=False: None,
+        },
+    }
+    for sibling, attrs in siblings.items():
+        module = types.ModuleType(f"{name}.{sibling}")
+        module.__dict__.update(attrs)
+        modules[module.__name__] = module
+    return modules
+
+
+@pytest.fixture
+def load_lib(monkeypatch):
+    def load():
+        for name, module in _package("fake_paperscraper").items():
+            monkeypatch.setitem(sys.modules, name, module)
+        spec = importlib.util.spec_from_file_location("fake_paperscraper.lib", LIB)
+        lib = importlib.util.module_from_spec(spec)
+        monkeypatch.setitem(sys.modules, spec.name, lib)
+        spec.loader.exec_module(lib)
+        return lib
+
+    return load
+
+
+def test_imports_without_chemcrow(load_lib, monkeypatch, tmp_path):
+    # importing chemcrow.papers fails
+    monkeypatch.setitem(sys.modules, "chemcrow.papers", None)
+    lib = load_lib()
+    assert lib._pdf_cache() == (None, None)
+    scraper = lib.default_scraper()
+    assert len(scraper.scrapers) == 9
+
+
+class Clock(BaseHTTPRequestHandler):
+    """Record the host and time of each request."""
+
+    protocol_version = "HTTP/1.1"
+    hits = []
+
+    def do_GET(self):
+        self.hits.append((self.headers["Host"].split(":")[0], time.monotonic()))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_host_spacing(load_lib, http_server, monkeypatch):
+    monkeypatch.setattr(Clock, "hits", [])
+    lib = load_lib()
+    url = http_server(Clock)
+
+    async def run():
+        async with lib.HostThrottledClientSession(
+            rate_limits={"127.0.0.1": 5.0}, default_rate_limit=1000.0
+        ) as session:
+
+            async def get(url):
+                async with session.get(url) as response:
+                    response.raise_for_status()
+
+            await asyncio.gather(
+                *(get(url) for _ in range(3)),
+                *(get(url.replace("127.0.0.1", "localhost")) for _ in range(3)),
+            )
+
+    asyncio.run(run())
+    slow = [t for host, t in Clock.hits if host == "127.0.0.1"]
+    fast = [t for host, t in Clock.hits if host == "localhost"]
+    assert len(slow) == len(fast) == 3
+    # 5 requests/sec on 127.0.0.1
+    assert all(b - a > 0.15 for a, b in zip(slow, slow[1:]))
+    # localhost has its own bucket
+    assert fast[-1] - fast[0] < 0.15
+
+
+def test_rate_limit(load_lib):
+    lib = load_lib()
+
+    async def run():
+        async with lib.HostThrottledClientSession(rate_limits={"doi.org": 5.0}) as s:
+            return [
+                s.rate_limit(host)
+                for host in ["export.arxiv.org", "doi.org", "notarxiv.org"]
+            ]
+
+    assert asyncio.run(run()) == [1 / 3, 5.0, lib.RateLimits.SCRAPER.value]
+
+
+class Pages:
+    """Pages of ``size`` papers, ``pages`` of them in total."""
+
+    def __init__(self, pages=10, size=5):
+        self.pages = pages
+        self.size = size
+        self.searched = []
+
+    async def search_page(self, offset):
+        self.searched.append(offset)
+        papers = [{"id": offset + i} for i in range(self.size)]
+        return papers, offset + self.size < self.pages * self.size
+
+    async def scrape(self, papers, remaining):
+        return {str(p["id"]): p for p in papers[:remaining]}
+
+
+def scrape_pages(lib, pages, limit, **kwargs):
+    paths = {}
+    coro = lib.scrape_pages(
+        pages.search_page, pages.scrape, paths, 0, pages.size, limit, **kwargs
+    )
+    asyncio.run(coro)
+    return paths
+
+
+def test_scrape_pages_stops_at_limit(load_lib):
+    lib = load_lib()
+    pages = Pages()
+    assert len(scrape_pages(lib, pages, 12)) == 12
+    assert pages.searched == [0, 5, 10]
+    # the first page is enough
+    pages = Pages()
+    assert len(scrape_pages(lib, pages, 3)) == 3
+    assert pages.searched == [0]
+    pages = Pages(pages=2)
+    assert len(scrape_pages(lib, pages, 20, prefetch=False)) == 10
+    assert pages.searched == [0, 5]
+
+
+def test_scrape_pages_cancels_prefetch(load_lib):
+    lib = load_lib()
+    pages = Pages()
+    cancelled = []
+    search_page = pages.search_page
+
+    async def slow_search_page(offset):
+        if offset == 0:
+            return await search_page(offset)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(offset)
+            raise
+
+    async def scrape(papers, remaining):
+        # let the prefetched search start
+        await asyncio.sleep(0.01)
+        raise RuntimeError("scraper failed")
+
+    pages.search_page = slow_search_page
+    pages.scrape = scrape
+    with pytest.raises(RuntimeError, match="scraper failed"):
+        scrape_pages(lib, pages, 12)
+    assert cancelled == [5]
+
+
+def test_scrape_pages_later_failure(load_lib):
+    lib = load_lib()
+    pages = Pages()
+    search_page = pages.search_page
+
+    async def failing_search_page(offset):
+        if offset == 10:
+            raise RuntimeError("search failed")
+        return await search_page(offset)
+
+    pages.search_page = failing_search_page
+    paths = scrape_pages(lib, pages, 20)
+    # the first two pages are kept
+    assert sorted(map(int, paths)) == list(range(10))
+
+
+def test_scrape_pages_first_failure(load_lib):
+    lib = load_lib()
+    pages = Pages()
+
+    async def failing_search_page(offset):
+        raise RuntimeError("search failed")
+
+    pages.search_page = failing_search_page
+    with pytest.raises(RuntimeError, match="search failed"):
+        scrape_pages(lib, pages, 20)
@@ -5,7 +5,7 @@ import pytest
 from dotenv import load_dotenv
 from langchain.chat_models import ChatOpenAI
 
-from chemcrow.tools.search import PatentCheck, Scholar2ResultLLM
+from chemcrow.tools.search import PatentCheck, Scholar2ResultLLM, patent_check
 from chemcrow.utils import split_smiles
 
 load_dotenv()
@@ -85,3 +85,20 @@ def test_patentcheck_not(choline, patentcheck):
     patented = ast.literal_eval(patented)
     assert len(patented) == 1
     assert patented[choline] == "Novel"
+
+
+def test_patent_check_batch(singlemol, tmp_path):
+    smiles = [singlemol, "xyz", singlemol]
+    results = patent_check(smiles, catalog="zinc-instock-mini")
+    assert [r["smiles"] for r in results] == smiles
+    assert results[0]["status"] == "Patented"
+    assert results[1] == {
+        "smiles": "xyz",
+        "canonical": None,
+        "status": "Invalid SMILES",
+    }
+    assert results[2] == results[0]
+
+    path = tmp_path / "library.csv"
+    path.write_text("smiles,id\n" + "".join(f"{s},{i}\n" for i, s in enumerate(smiles)))
+    assert patent_check(str(path), catalog="zinc-instock-mini") == results